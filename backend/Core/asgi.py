@@ -0,0 +1,17 @@
+"""
+ASGI config for Core project.
+
+Serve with an ASGI server, e.g. ``uvicorn Core.asgi:application``. Async
+views (Meal/meal_async.py) then wait on the event loop without holding a
+thread; the DRF views run in a thread per request as under WSGI. Streaming
+responses must have async iterators to stay constant-memory here (Django
+reads a sync one whole first), which the exports switch to under ASGI.
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Core.settings')
+
+application = get_asgi_application()
@@ -29,6 +29,7 @@ INSTALLED_APPS = [
     # Third party apps
     'rest_framework',
     'rest_framework_simplejwt',
+    'rest_framework_simplejwt.token_blacklist',
     'corsheaders',
     
     # Local apps
@@ -36,6 +37,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so its timings include every other middleware
+    'Meal.meal_metrics.RequestMetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -65,15 +68,86 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'Core.wsgi.application'
+ASGI_APPLICATION = 'Core.asgi.application'
 
 # Database
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Keep connections open between requests (seconds), checking them
+        # before reuse
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Pragmas run on every new SQLite connection (see Meal/meal_db.py), by
+# profile; SQLITE_PRAGMA_PROFILE picks one, None runs none. WAL lets readers
+# run alongside the single writer.
+SQLITE_PRAGMA_PROFILES = {
+    'default': {},  # SQLite's own settings
+    'production': {
+        'journal_mode': 'wal',
+        'synchronous': 'normal',
+        'cache_size': -20000,  # KiB
+        'mmap_size': 268435456,
+        'temp_store': 'memory',
+    },
+}
+SQLITE_PRAGMA_PROFILE = 'production'
+
+# Milliseconds a writer waits for the lock before SQLite reports the
+# database as locked. Kept short so WriteRetryMixin's backoff, not one long
+# stall, handles contention; None leaves the driver's 5 second default.
+SQLITE_BUSY_TIMEOUT = 1000
+
+# Times a write request that still hit a locked database is run again,
+# with exponential backoff from SQLITE_WRITE_RETRY_DELAY seconds
+SQLITE_WRITE_RETRIES = 3
+SQLITE_WRITE_RETRY_DELAY = 0.05
+SQLITE_WRITE_RETRY_MAX_DELAY = 1.0
+
+# Cache
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'meal-planner',
+    },
+    # API response cache. Local memory is per process; to share entries and
+    # hit/miss counters between workers use a file cache instead:
+    #   'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+    #   'LOCATION': BASE_DIR / 'cache' / 'responses',
+    'responses': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'meal-planner-responses',
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+}
+
+# Seconds the dashboard stats snapshot is served from cache
+DASHBOARD_STATS_CACHE_TIMEOUT = 60
+
+# Longest a long-polling dashboard request (dashboard/stats/live/?wait=N)
+# is held, and seconds between its checks for changes
+DASHBOARD_LONG_POLL_MAX_SECONDS = 30
+DASHBOARD_LONG_POLL_INTERVAL = 1
+
+# Cache alias and lifetime (seconds) of cached API responses, for viewsets
+# with response_cache = True
+MEAL_RESPONSE_CACHE_ALIAS = 'responses'
+MEAL_RESPONSE_CACHE_TIMEOUT = 300
+
+# Cache alias and lifetime (seconds) of authenticated users and their
+# Member. Saves evict entries in this process; with the per-process local
+# memory cache, other workers may accept a deactivated user or changed
+# password for up to this long, so keep it short or use a shared cache.
+AUTH_PRINCIPAL_CACHE_ALIAS = 'default'
+AUTH_PRINCIPAL_CACHE_TIMEOUT = 60
+
+# Clients allowed to scrape the Prometheus /metrics endpoint
+METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -110,13 +184,21 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # REST Framework configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'Meal.auth_authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    # orjson-backed JSON with the same output as DRF's JSONRenderer/JSONParser
+    # (stdlib json when orjson is not installed); list the rest_framework
+    # classes instead to switch back
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'Meal.meal_json.FastJSONRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'Meal.meal_json.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20
@@ -128,8 +210,16 @@ SIMPLE_JWT = {
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
     'ROTATE_REFRESH_TOKENS': True,
     'BLACKLIST_AFTER_ROTATION': True,
+    'TOKEN_REFRESH_SERIALIZER': 'Meal.auth_tokens.IndexedTokenRefreshSerializer',
 }
 
+# In-memory refresh-token blacklist index (see Meal.auth_tokens): seconds
+# between pickups of tokens blacklisted by other processes, and how many
+# tokens it is sized for before it is rebuilt. Run prune_tokens daily to
+# delete expired tokens.
+TOKEN_BLACKLIST_INDEX_SYNC_SECONDS = 5
+TOKEN_BLACKLIST_INDEX_CAPACITY = 100000
+
 # CORS settings for Next.js frontend
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
@@ -5,11 +5,13 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from Meal.meal_metrics import metrics_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/auth/', include('Meal.auth_urls')),
     path('api/meal/', include('Meal.meal_urls')),
+    path('metrics', metrics_view, name='metrics'),
 ]
 
 # Serve media files during development
@@ -2,7 +2,8 @@ from django.contrib import admin
 
 # Register your models here.
 from django.contrib import admin
-from .models import Member, Meal, Ingredient, ShoppingList, ShoppingItem, Expense, Budget
+from .models import (Member, Meal, Ingredient, ShoppingList, ShoppingItem, Expense, Budget, MemberMonthlySummary,
+                     MonthlyStatement)
 
 
 @admin.register(Member)
@@ -50,3 +51,18 @@ class BudgetAdmin(admin.ModelAdmin):
     list_display = ['name', 'total_amount', 'spent_amount', 'remaining_amount', 'start_date', 'end_date']
     list_filter = ['start_date', 'end_date', 'created_by']
     search_fields = ['name']
+
+
+@admin.register(MemberMonthlySummary)
+class MemberMonthlySummaryAdmin(admin.ModelAdmin):
+    list_display = ['member', 'month', 'total_meals', 'total_cost', 'paid_amount', 'unpaid_amount', 'deposit_amount']
+    list_filter = ['month']
+    search_fields = ['member__user__username', 'member__user__first_name', 'member__user__last_name']
+
+
+@admin.register(MonthlyStatement)
+class MonthlyStatementAdmin(admin.ModelAdmin):
+    list_display = ['member', 'month', 'opening_balance', 'deposits', 'meal_charges', 'paid_amount',
+                    'unpaid_amount', 'closing_balance']
+    list_filter = ['month']
+    search_fields = ['member__user__username', 'member__user__first_name', 'member__user__last_name']
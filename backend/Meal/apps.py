@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class MealConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'Meal'
+
+    def ready(self):
+        from . import meal_db, meal_metrics, meal_signals  # noqa: F401
@@ -0,0 +1,88 @@
+# auth_authentication.py:
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+from .meal_cache import incr_counter
+
+
+PRINCIPAL_CACHE_KEY_PREFIX = 'meal:auth-principal'
+PRINCIPAL_GENERATION_KEY = 'meal:auth-principal:generation'
+
+
+def principal_cache():
+    return caches[getattr(settings, 'AUTH_PRINCIPAL_CACHE_ALIAS', 'default')]
+
+
+def _principal_key(store, user_id):
+    # Bumping the generation drops every cached principal at once
+    return f'{PRINCIPAL_CACHE_KEY_PREFIX}:{store.get(PRINCIPAL_GENERATION_KEY, 0)}:{user_id}'
+
+
+def get_principal(user_id):
+    """
+    The User with ``user_id`` and its Member (loaded together), from the
+    principal cache or one query. None when there is no such user.
+    """
+    store = principal_cache()
+    key = _principal_key(store, user_id)
+    user = store.get(key)
+    if user is None:
+        user = User.objects.select_related('member').filter(
+            **{api_settings.USER_ID_FIELD: user_id}
+        ).first()
+        if user is None:
+            return None
+        store.set(key, user, getattr(settings, 'AUTH_PRINCIPAL_CACHE_TIMEOUT', 60))
+    return user
+
+
+def invalidate_principal(user_id):
+    store = principal_cache()
+    store.delete(_principal_key(store, user_id))
+
+
+def invalidate_all_principals():
+    incr_counter(principal_cache(), PRINCIPAL_GENERATION_KEY)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication resolving the token's user together with its Member
+    and caching both for ``AUTH_PRINCIPAL_CACHE_TIMEOUT`` seconds, so an
+    authenticated request that reads ``request.user.member`` usually costs
+    no query for either.
+
+    Saving or deleting the User or Member (status, role, password...)
+    evicts its entry, and bulk updates of either table drop every entry
+    (see meal_signals). Each request works on its own unpickled copy.
+    The active-user and revoked-password checks run on every request, as
+    in JWTAuthentication.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        user = get_principal(user_id)
+        if user is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(
+                api_settings.REVOKE_TOKEN_CLAIM
+            ) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(
+                    _("The user's password has been changed."), code="password_changed"
+                )
+
+        return user
@@ -5,16 +5,17 @@ from django.contrib.auth.models import User
 from django.contrib.auth import authenticate
 from django.contrib.auth.password_validation import validate_password
 from .models import Member
+from .meal_fieldsets import SparseFieldsetMixin
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['id', 'username', 'email', 'first_name', 'last_name', 'date_joined']
         read_only_fields = ['id', 'date_joined']
 
 
-class MemberSerializer(serializers.ModelSerializer):
+class MemberSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     full_name = serializers.SerializerMethodField()
     
@@ -23,6 +24,7 @@ class MemberSerializer(serializers.ModelSerializer):
         fields = ['id', 'user', 'full_name', 'phone', 'role', 'status', 
                  'dietary_restrictions', 'join_date', 'avatar']
         read_only_fields = ['id', 'join_date']
+        field_relations = {'full_name': ['user']}
     
     def get_full_name(self, obj):
         if isinstance(obj, Member):  # normal case
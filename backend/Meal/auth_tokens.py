@@ -0,0 +1,149 @@
+# auth_tokens.py:
+import hashlib
+import math
+import threading
+import time
+from django.conf import settings
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import aware_utcnow, datetime_from_epoch
+
+
+PRUNE_BATCH_SIZE = 1000
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter of strings with ``error_rate`` false positives at ``capacity`` items"""
+
+    def __init__(self, capacity, error_rate=0.01):
+        self.capacity = capacity
+        self.size = max(64, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, value):
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.size for i in range(self.hash_count)]
+
+    def add(self, value):
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, value):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+
+class BlacklistIndex:
+    """
+    Per-process membership index of blacklisted refresh-token jtis.
+
+    A negative answer is definite for every blacklisting this process has
+    seen, so only possible hits are checked against the database. The
+    index is loaded on first use and picks up rows blacklisted by other
+    processes (new BlacklistedToken ids) at most every
+    ``TOKEN_BLACKLIST_INDEX_SYNC_SECONDS``; in between, ``blacklist()`` on
+    IndexedRefreshToken still rejects such tokens when refreshing or
+    logging out, because it finds the existing blacklist row.
+    It is rebuilt from the table, which drops pruned tokens, once more
+    tokens were added than it was sized for.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._filter = None
+            self._last_id = 0
+            self._synced_at = 0
+
+    def _sync(self):
+        now = time.monotonic()
+        interval = getattr(settings, 'TOKEN_BLACKLIST_INDEX_SYNC_SECONDS', 5)
+        if self._filter is not None and self._filter.count <= self._filter.capacity:
+            if now - self._synced_at < interval:
+                return
+            rows = BlacklistedToken.objects.filter(id__gt=self._last_id)
+        else:
+            rows = BlacklistedToken.objects.all()
+            capacity = getattr(settings, 'TOKEN_BLACKLIST_INDEX_CAPACITY', 100000)
+            self._filter = BloomFilter(max(capacity, rows.count() * 2))
+        for row_id, jti in rows.order_by('id').values_list('id', 'token__jti').iterator():
+            self._filter.add(jti)
+            self._last_id = max(self._last_id, row_id)
+        self._synced_at = now
+
+    def might_contain(self, jti):
+        with self._lock:
+            self._sync()
+            return jti in self._filter
+
+    def add(self, jti):
+        with self._lock:
+            if self._filter is not None:
+                self._filter.add(jti)
+
+
+blacklist_index = BlacklistIndex()
+
+
+class IndexedRefreshToken(RefreshToken):
+    """
+    RefreshToken whose blacklist check asks the in-memory index first and
+    only queries the database on a possible hit. ``blacklist()`` rejects a
+    token that is already blacklisted, so two refreshes racing with the
+    same token cannot both rotate it.
+    """
+
+    def check_blacklist(self):
+        if blacklist_index.might_contain(self.payload[api_settings.JTI_CLAIM]):
+            super().check_blacklist()
+
+    def blacklist(self):
+        jti = self.payload[api_settings.JTI_CLAIM]
+        token, _created = OutstandingToken.objects.get_or_create(
+            jti=jti,
+            defaults={
+                'token': str(self),
+                'expires_at': datetime_from_epoch(self.payload['exp']),
+            },
+        )
+        blacklisted, created = BlacklistedToken.objects.get_or_create(token=token)
+        blacklist_index.add(jti)
+        if not created:
+            raise TokenError(_("Token is blacklisted"))
+        return blacklisted, created
+
+
+class IndexedTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = IndexedRefreshToken
+
+
+def prune_expired_tokens(batch_size=PRUNE_BATCH_SIZE):
+    """
+    Delete outstanding and blacklisted tokens whose expiry has passed, in
+    transactions of ``batch_size`` tokens. An expired token is rejected
+    before its blacklist entry is ever consulted, so nothing is lost.
+    Returns ``(outstanding, blacklisted)`` deleted counts.
+    """
+    expired = OutstandingToken.objects.filter(expires_at__lte=aware_utcnow())
+    outstanding = blacklisted = 0
+    while True:
+        ids = list(expired.order_by('id').values_list('id', flat=True)[:batch_size])
+        if not ids:
+            break
+        with transaction.atomic():
+            blacklisted += BlacklistedToken.objects.filter(token_id__in=ids).delete()[0]
+            outstanding += OutstandingToken.objects.filter(id__in=ids).delete()[0]
+    if blacklisted:
+        blacklist_index.reset()
+    return outstanding, blacklisted
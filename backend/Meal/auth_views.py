@@ -3,10 +3,9 @@ from rest_framework import status, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework_simplejwt.tokens import RefreshToken
-from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
 from django.contrib.auth.models import User
 from django.contrib.auth import authenticate
+from .auth_tokens import IndexedRefreshToken
 from .auth_serializers import (
     RegisterSerializer,
     LoginSerializer,
@@ -26,7 +25,7 @@ class RegisterView(APIView):
             user = serializer.save()
             
             # Generate tokens
-            refresh = RefreshToken.for_user(user)
+            refresh = IndexedRefreshToken.for_user(user)
             access_token = refresh.access_token
             
             # Get member data
@@ -53,7 +52,7 @@ class LoginView(APIView):
             user = serializer.validated_data['user']
             
             # Generate tokens
-            refresh = RefreshToken.for_user(user)
+            refresh = IndexedRefreshToken.for_user(user)
             access_token = refresh.access_token
             
             # Get member data
@@ -78,7 +77,7 @@ class LogoutView(APIView):
         try:
             refresh_token = request.data.get('refresh_token')
             if refresh_token:
-                token = RefreshToken(refresh_token)
+                token = IndexedRefreshToken(refresh_token)
                 token.blacklist()
             
             return Response({
@@ -0,0 +1,51 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from Meal.meal_benchmarks import run_concurrency_benchmark
+
+
+class Command(BaseCommand):
+    help = ('Measure sustained mixed read/write throughput from concurrent clients against a seeded office, '
+            'with SQLite defaults and with the production database profile, each in a throwaway database file')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--members', type=int, default=50, help='Members of the seeded office (default 50)')
+        parser.add_argument('--days', type=int, default=30, help='Days of seeded history (default 30)')
+        parser.add_argument('--threads', type=int, default=8, help='Concurrent clients (default 8)')
+        parser.add_argument('--seconds', type=float, default=10, help='Load duration per profile (default 10)')
+        parser.add_argument(
+            '--write-ratio', type=float, default=0.2, help='Share of requests that write (default 0.2)'
+        )
+        parser.add_argument('--seed', type=int, default=0, help='Random seed of the generated data and load')
+        parser.add_argument('--output', metavar='PATH', help='Write the JSON report to PATH')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('The concurrency benchmark compares SQLite profiles; the database is '
+                               f'{connection.vendor}')
+        if options['threads'] < 1 or options['seconds'] <= 0:
+            raise CommandError('--threads and --seconds must be positive')
+        if not 0 <= options['write_ratio'] <= 1:
+            raise CommandError('--write-ratio must be between 0 and 1')
+
+        report = run_concurrency_benchmark(
+            options['members'], options['days'], threads=options['threads'], seconds=options['seconds'],
+            write_ratio=options['write_ratio'], seed=options['seed'], progress=self.stdout.write
+        )
+
+        self.stdout.write(
+            f"{'profile':<12} {'ops/s':>8} {'read p50':>9} {'read p95':>9} {'write p50':>10} "
+            f"{'write p95':>10} {'locked':>7} {'4xx':>5}"
+        )
+        for name, result in report['profiles'].items():
+            reads, writes = result['reads'], result['writes']
+            self.stdout.write(
+                f"{name:<12} {result['ops_per_second']:>8.1f} {reads.get('p50_ms', 0):>7.1f}ms "
+                f"{reads.get('p95_ms', 0):>7.1f}ms {writes.get('p50_ms', 0):>8.1f}ms "
+                f"{writes.get('p95_ms', 0):>8.1f}ms {result['locked_errors']:>7} {result['client_errors']:>5}"
+            )
+
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump(report, file, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Report written to {options['output']}"))
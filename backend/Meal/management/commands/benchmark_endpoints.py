@@ -0,0 +1,84 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from Meal.meal_benchmarks import BENCHMARK_SIZES, run_benchmarks, throwaway_database
+
+
+def parse_size(value):
+    try:
+        members, days = (int(part) for part in value.lower().split('x'))
+    except ValueError:
+        raise CommandError(f'Invalid --size {value!r}, expected MEMBERSxDAYS such as 100x90')
+    if members < 1 or days < 1:
+        raise CommandError(f'Invalid --size {value!r}, members and days must be at least 1')
+    return members, days
+
+
+class Command(BaseCommand):
+    help = ('Benchmark every meal API endpoint and the heavy actions against seeded offices of several '
+            'sizes in a throwaway test database, reporting latency percentiles, queries and peak memory')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--size', action='append', dest='sizes', metavar='MEMBERSxDAYS',
+            help=('Office size to seed and measure (repeatable). Defaults to '
+                  + ', '.join(f'{members}x{days}' for members, days in BENCHMARK_SIZES) + '.')
+        )
+        parser.add_argument('--iterations', type=int, default=20, help='Timed requests per endpoint (default 20)')
+        parser.add_argument('--warm', action='store_true', help='Keep caches between requests')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed of the generated data')
+        parser.add_argument('--output', metavar='PATH', help='Write the JSON report to PATH')
+        parser.add_argument(
+            '--compare', metavar='PATH',
+            help='JSON report of an earlier run (e.g. the last release) to compare against'
+        )
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError('--iterations must be at least 1')
+        sizes = [parse_size(size) for size in options['sizes']] if options['sizes'] else BENCHMARK_SIZES
+        baseline = None
+        if options['compare']:
+            try:
+                with open(options['compare']) as file:
+                    baseline = json.load(file)
+            except (OSError, ValueError) as exc:
+                raise CommandError(f"Cannot read {options['compare']}: {exc}")
+
+        with throwaway_database():
+            report = run_benchmarks(
+                sizes, iterations=options['iterations'], warm=options['warm'], seed=options['seed'],
+                progress=self.stdout.write
+            )
+
+        for size in report['sizes']:
+            self.write_size(size, self.baseline_results(baseline, size))
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump(report, file, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Report written to {options['output']}"))
+
+    def baseline_results(self, baseline, size):
+        for old in (baseline or {}).get('sizes', []):
+            if (old['members'], old['days']) == (size['members'], size['days']):
+                return old['results']
+        return {}
+
+    def write_size(self, size, baseline):
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"\n{size['members']} members x {size['days']} days "
+            f"({size['rows'].get('tracking', 0)} tracking rows)"
+        ))
+        header = f"{'endpoint':<40} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'queries':>8} {'peak KiB':>9}"
+        if baseline:
+            header += f" {'p50 vs base':>12} {'queries':>8}"
+        self.stdout.write(header)
+        for name, result in size['results'].items():
+            line = (f"{name:<40} {result['p50_ms']:>9.2f} {result['p95_ms']:>9.2f} {result['p99_ms']:>9.2f} "
+                    f"{result['queries']:>8} {result['peak_kib']:>9.1f}")
+            if result['status'] >= 400:
+                line += f"  (HTTP {result['status']})"
+            old = baseline.get(name)
+            if old:
+                change = (result['p50_ms'] / old['p50_ms'] - 1) * 100 if old['p50_ms'] else 0
+                line += f" {change:>+11.1f}% {result['queries'] - old['queries']:>+8}"
+            self.stdout.write(line)
@@ -0,0 +1,50 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from Meal.meal_benchmarks import run_json_benchmarks, throwaway_database
+
+
+class Command(BaseCommand):
+    help = ('Compare the stock and fast JSON renderers and parsers on large meal tracking pages and the '
+            'dashboard stats of a seeded office, in a throwaway test database')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--members', type=int, default=200, help='Members of the seeded office (default 200)')
+        parser.add_argument('--days', type=int, default=60, help='Days of seeded history (default 60)')
+        parser.add_argument(
+            '--rows', action='append', type=int, dest='page_sizes', metavar='N',
+            help='Tracking rows per page (repeatable). Defaults to 100, 1000 and 5000.'
+        )
+        parser.add_argument('--iterations', type=int, default=20, help='Timed calls per codec (default 20)')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed of the generated data')
+        parser.add_argument('--output', metavar='PATH', help='Write the JSON report to PATH')
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError('--iterations must be at least 1')
+        page_sizes = options['page_sizes'] or [100, 1000, 5000]
+
+        with throwaway_database():
+            report = run_json_benchmarks(
+                options['members'], options['days'], page_sizes,
+                iterations=options['iterations'], seed=options['seed']
+            )
+
+        if report['accelerated'] is None:
+            self.stdout.write(self.style.WARNING('orjson is not installed; both codecs use the stdlib json module'))
+        self.stdout.write(
+            f"{'payload':<28} {'KiB':>8} {'step':<7} {'stock p50':>10} {'fast p50':>10} {'speedup':>8}"
+        )
+        for name, result in report['payloads'].items():
+            for step in ('render', 'parse'):
+                stock = result[step]['stock']['p50_ms']
+                fast = result[step]['fast']['p50_ms']
+                line = (f"{name:<28} {result['bytes'] / 1024:>8.1f} {step:<7} {stock:>8.2f}ms {fast:>8.2f}ms "
+                        f"{stock / fast if fast else 0:>7.1f}x")
+                if step == 'render' and not result['identical']:
+                    line += self.style.ERROR('  output differs from the stock renderer')
+                self.stdout.write(line)
+
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump(report, file, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Report written to {options['output']}"))
@@ -0,0 +1,60 @@
+from datetime import date, timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from Meal.meal_statements import STATEMENT_CHUNK_SIZE, close_month
+from Meal.meal_summaries import month_of
+
+
+def parse_month(value):
+    try:
+        year, month = (int(part) for part in value.split('-'))
+        return date(year, month, 1)
+    except ValueError:
+        raise CommandError(f'Invalid --month {value!r}, expected YYYY-MM such as 2024-03')
+
+
+class Command(BaseCommand):
+    help = ('Close a month: write a MonthlyStatement (opening balance, deposits, lunch and dinner charges, '
+            'paid and unpaid amounts, closing balance) for every member. Safe to re-run; members that '
+            'already have a statement for the month are skipped.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--month', metavar='YYYY-MM', help='Month to close (default: last month)')
+        parser.add_argument(
+            '--workers', type=int, help='Processes computing statements (default: one per CPU, 1 to run inline)'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=STATEMENT_CHUNK_SIZE,
+            help=f'Members per chunk (default {STATEMENT_CHUNK_SIZE})'
+        )
+        parser.add_argument('--force', action='store_true', help="Recompute the month's existing statements")
+
+    def handle(self, *args, **options):
+        this_month = month_of(timezone.localdate())
+        if options['month']:
+            month = parse_month(options['month'])
+        else:
+            month = month_of(this_month - timedelta(days=1))
+        if month >= this_month:
+            raise CommandError(f"{month:%Y-%m} is not over yet")
+        if options['workers'] is not None and options['workers'] < 1:
+            raise CommandError('--workers must be at least 1')
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be at least 1')
+
+        result = close_month(
+            month, workers=options['workers'], chunk_size=options['chunk_size'], force=options['force'],
+            progress=lambda message: self.stdout.write(message) if options['verbosity'] > 1 else None
+        )
+
+        seconds = result['seconds']
+        self.stdout.write(
+            f"{result['members']} members: {result['created']} statements written, "
+            f"{result['skipped']} already closed" + (f", {result['replaced']} replaced" if result['replaced'] else '')
+        )
+        self.stdout.write(
+            f"{result['chunks']} chunks on {result['workers']} worker(s): "
+            f"compute {seconds['compute']:.2f}s (summed over workers), write {seconds['write']:.2f}s, "
+            f"total {seconds['total']:.2f}s"
+        )
+        self.stdout.write(self.style.SUCCESS(f"Closed {month:%B %Y}"))
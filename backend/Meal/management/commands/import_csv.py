@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+from Meal.meal_imports import IMPORTERS, ImportFormatError, import_csv
+
+
+class Command(BaseCommand):
+    help = 'Import monthly deposits or meal tracking from a CSV file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(IMPORTERS), help='What the file contains')
+        parser.add_argument('path', help='CSV file with a header line')
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Validate the file and report errors without writing anything.'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['path'], encoding='utf-8-sig', newline='') as file:
+                result = import_csv(options['kind'], file, dry_run=options['dry_run'])
+        except OSError as exc:
+            raise CommandError(f"Cannot read {options['path']}: {exc}")
+        except ImportFormatError as exc:
+            raise CommandError(str(exc))
+
+        for error in result['errors']:
+            details = '; '.join(
+                f"{field}: {' '.join(str(message) for message in messages)}"
+                for field, messages in error['errors'].items()
+            )
+            self.stderr.write(f"line {error['line']}: {details}")
+
+        if result['dry_run']:
+            summary = f"Validated {result['valid_rows']} of {result['total_rows']} rows"
+        else:
+            summary = (f"Imported {result['valid_rows']} of {result['total_rows']} rows "
+                       f"({result.get('created_count', 0)} created, "
+                       f"{result.get('updated_count', 0)} updated)")
+        style = self.style.WARNING if result['errors'] else self.style.SUCCESS
+        self.stdout.write(style(f"{summary}, {result['error_count']} with errors"))
@@ -0,0 +1,28 @@
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+from Meal.meal_summaries import refresh_monthly_summaries
+
+
+class Command(BaseCommand):
+    help = 'Rebuild MemberMonthlySummary rows from meal tracking and deposits'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--month', action='append', dest='months', metavar='YYYY-MM',
+            help='Only rebuild this month (repeatable). Defaults to every month.'
+        )
+        parser.add_argument(
+            '--member', action='append', dest='member_ids', type=int, metavar='ID',
+            help='Only rebuild this member (repeatable). Defaults to every member.'
+        )
+
+    def handle(self, *args, **options):
+        months = None
+        if options['months']:
+            try:
+                months = [datetime.strptime(month, '%Y-%m').date() for month in options['months']]
+            except ValueError as exc:
+                raise CommandError(f'Invalid --month, expected YYYY-MM: {exc}')
+
+        written = refresh_monthly_summaries(months=months, member_ids=options['member_ids'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {written} monthly summary rows'))
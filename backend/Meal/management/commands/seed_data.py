@@ -0,0 +1,44 @@
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+from Meal.meal_seed import SEED_USERNAME_PREFIX, seed_office
+
+
+class Command(BaseCommand):
+    help = 'Seed a synthetic office: members, meal tracking, deposits, meals, shopping lists and expenses'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--members', type=int, default=50, help='Number of members (default 50)')
+        parser.add_argument('--days', type=int, default=30, help='Number of days of history (default 30)')
+        parser.add_argument(
+            '--end-date', metavar='YYYY-MM-DD',
+            help='Last day of the generated history. Defaults to today.'
+        )
+        parser.add_argument('--seed', type=int, default=0, help='Random seed; the same seed gives the same data')
+        parser.add_argument(
+            '--prefix', default=SEED_USERNAME_PREFIX,
+            help=f'Username prefix of the generated users (default "{SEED_USERNAME_PREFIX}")'
+        )
+
+    def handle(self, *args, **options):
+        if options['members'] < 1 or options['days'] < 1:
+            raise CommandError('--members and --days must be at least 1')
+        end_date = None
+        if options['end_date']:
+            try:
+                end_date = datetime.strptime(options['end_date'], '%Y-%m-%d').date()
+            except ValueError as exc:
+                raise CommandError(f'Invalid --end-date, expected YYYY-MM-DD: {exc}')
+
+        try:
+            counts = seed_office(
+                options['members'], options['days'], end_date=end_date,
+                seed=options['seed'], prefix=options['prefix']
+            )
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        for table, count in counts.items():
+            self.stdout.write(f'{table}: {count}')
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {options['members']} members over {options['days']} days"
+        ))
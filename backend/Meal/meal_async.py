@@ -0,0 +1,141 @@
+# meal_async.py:
+import asyncio
+import functools
+import hashlib
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
+from rest_framework import exceptions
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from .meal_cache import aget_dashboard_stats
+from .meal_dashboard import dashboard_queries, dashboard_stats
+from .meal_json import FastJSONRenderer
+from .meal_signals import DASHBOARD_MODELS
+from .meal_versions import get_versions
+
+
+def _closing_connection(func):
+    def run():
+        try:
+            return func()
+        finally:
+            # Worker threads outlive the request; keep or drop their
+            # connection per CONN_MAX_AGE like at the end of a request
+            close_old_connections()
+    return run
+
+
+async def run_concurrently(funcs):
+    """
+    Run the blocking ``funcs`` at the same time, each in a worker thread with
+    its own database connection, and return their results in order. The
+    event loop is free while they run.
+    """
+    return await asyncio.gather(*(
+        sync_to_async(_closing_connection(func), thread_sensitive=False)() for func in funcs
+    ))
+
+
+def json_response(data, status=200):
+    return HttpResponse(FastJSONRenderer().render(data), status=status, content_type='application/json')
+
+
+def _authenticate(request):
+    authenticators = [auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+    drf_request = Request(request, authenticators=authenticators)
+    if not (drf_request.user and drf_request.user.is_authenticated):
+        raise exceptions.NotAuthenticated()
+    return drf_request.user
+
+
+def _authenticate_header(request):
+    classes = api_settings.DEFAULT_AUTHENTICATION_CLASSES
+    return classes[0]().authenticate_header(request) if classes else None
+
+
+def async_api_view(view):
+    """
+    Make the async function ``view(request, user, ...)`` a read-only
+    endpoint authenticated like the DRF views with IsAuthenticated (same
+    authentication classes, forced test users included). APIExceptions
+    become JSON error responses with DRF's status codes.
+    """
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        try:
+            user = await sync_to_async(_authenticate)(request)
+            if request.method not in ('GET', 'HEAD'):
+                raise exceptions.MethodNotAllowed(request.method)
+            return await view(request, user, *args, **kwargs)
+        except exceptions.APIException as exc:
+            status_code, header = exc.status_code, None
+            if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+                # As in APIView.permission_denied: 401 only with a challenge to send
+                header = _authenticate_header(request)
+                status_code = 401 if header else 403
+            detail = exc.detail if isinstance(exc.detail, dict) else {'detail': exc.detail}
+            response = json_response(detail, status_code)
+            if header:
+                response['WWW-Authenticate'] = header
+            return response
+    return wrapper
+
+
+async def dashboard_etag(today):
+    """ETag of the dashboard stats: the change counters of every table they read, and the day"""
+    versions, = await run_concurrently([lambda: get_versions(DASHBOARD_MODELS)])
+    key = '|'.join([today.isoformat()] + [
+        f'{name}:{version}' for name, (version, _) in sorted(versions.items())
+    ])
+    return '"%s"' % hashlib.md5(key.encode()).hexdigest()
+
+
+def _wait_seconds(request):
+    try:
+        wait = float(request.GET.get('wait', 0))
+    except ValueError:
+        raise exceptions.ValidationError({'wait': ['A number of seconds is required.']})
+    return min(max(wait, 0), getattr(settings, 'DASHBOARD_LONG_POLL_MAX_SECONDS', 30))
+
+
+@async_api_view
+async def dashboard_stats_view(request, user):
+    """
+    The dashboard stats of DashboardStatsView, with their independent
+    queries run concurrently.
+
+    Supports long polling: a request with ``If-None-Match`` set to the last
+    ETag and ``?wait=N`` is held for up to N seconds (at most
+    ``DASHBOARD_LONG_POLL_MAX_SECONDS``) until one of the tables behind the
+    stats changes, and answered with the new stats, or 304 Not Modified if
+    nothing changed. A waiting client costs a change-counter lookup every
+    ``DASHBOARD_LONG_POLL_INTERVAL`` seconds and no thread.
+    """
+    today = timezone.now().date()
+    wait = _wait_seconds(request)
+    known = parse_etags(request.headers.get('If-None-Match', ''))
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + wait
+
+    etag = await dashboard_etag(today)
+    while etag in known and loop.time() < deadline:
+        await asyncio.sleep(min(getattr(settings, 'DASHBOARD_LONG_POLL_INTERVAL', 1), deadline - loop.time()))
+        etag = await dashboard_etag(today)
+
+    if etag in known or '*' in known:
+        response = HttpResponseNotModified()
+    else:
+        async def compute():
+            results = await run_concurrently(dashboard_queries(today))
+            # Serializing may still touch the database, which the loop must not
+            data, = await run_concurrently([lambda: dashboard_stats(results)])
+            return data
+        response = json_response(await aget_dashboard_stats(today, compute, version=etag))
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
@@ -0,0 +1,472 @@
+# meal_benchmarks.py:
+import gc
+import io
+import logging
+import math
+import os
+import platform
+import random
+import tempfile
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+import django
+from django.conf import settings
+from django.core.cache import cache
+from django.db import OperationalError, close_old_connections, connection, connections, transaction
+from django.test.utils import (CaptureQueriesContext, override_settings, setup_databases,
+                               setup_test_environment, teardown_databases, teardown_test_environment)
+from django.utils import timezone
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from .models import Member, Meal, ShoppingList, MemberMealTracking, MonthlyDeposit
+from .meal_cache import response_cache
+from .meal_db import is_locked_error, sqlite_pragmas
+from .meal_exports import StreamingExportMixin
+from .meal_json import FastJSONParser, FastJSONRenderer, orjson
+from .meal_pricing import rate_resolver
+from .meal_seed import seed_office
+from .meal_serializers import MemberMealTrackingSerializer
+from .meal_urls import router
+from .meal_views import DashboardStatsView, MemberMealTrackingViewSet
+
+
+API_PREFIX = '/api/meal/'
+# (members, days) offices benchmarked by default
+BENCHMARK_SIZES = [(20, 30), (100, 90), (300, 180)]
+BENCHMARK_PERCENTILES = (50, 95, 99)
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of ``samples``"""
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def timing_summary(timings):
+    result = {
+        'mean_ms': round(sum(timings) / len(timings), 3),
+        'max_ms': round(max(timings), 3),
+    }
+    for pct in BENCHMARK_PERCENTILES:
+        result[f'p{pct}_ms'] = round(percentile(timings, pct), 3)
+    return result
+
+
+def time_calls(func, iterations):
+    func()  # Warm up
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+@contextmanager
+def throwaway_database(name=None):
+    """
+    Run the block against fresh, migrated test databases instead of the
+    configured ones. ``name`` sets the default test database's name, e.g. a
+    file path, since SQLite test databases are otherwise kept in memory.
+    """
+    test_settings = settings.DATABASES['default'].setdefault('TEST', {})
+    old_name = test_settings.get('NAME')
+    if name is not None:
+        test_settings['NAME'] = name
+    setup_test_environment()
+    try:
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            yield
+        finally:
+            teardown_databases(old_config, verbosity=0)
+    finally:
+        teardown_test_environment()
+        test_settings['NAME'] = old_name
+
+
+class BenchmarkCase:
+    """One request to time; ``write`` cases run in a rolled-back savepoint"""
+
+    def __init__(self, name, url, method='get', data=None, write=False):
+        self.name = name
+        self.url = url
+        self.method = method
+        self.data = data
+        self.write = write
+
+
+def benchmark_cases():
+    """
+    Every endpoint of meal_urls against the data in the database: the list
+    and first detail of each router registration, the exports, the stats
+    views and the heavy write actions.
+    """
+    cases = []
+    for prefix, viewset, _ in router.registry:
+        cases.append(BenchmarkCase(f'{prefix} list', f'{API_PREFIX}{prefix}/'))
+        pk = viewset.queryset.model.objects.order_by('pk').values_list('pk', flat=True).first()
+        if pk is not None:
+            cases.append(BenchmarkCase(f'{prefix} detail', f'{API_PREFIX}{prefix}/{pk}/'))
+        if issubclass(viewset, StreamingExportMixin):
+            cases.append(BenchmarkCase(f'{prefix} export', f'{API_PREFIX}{prefix}/export/'))
+    cases.append(BenchmarkCase('dashboard stats', f'{API_PREFIX}dashboard/stats/'))
+
+    last_day = MemberMealTracking.objects.order_by('-date').values_list('date', flat=True).first()
+    if last_day is not None:
+        first_day = MemberMealTracking.objects.order_by('date').values_list('date', flat=True).first()
+        member_ids = Member.objects.filter(status='active').values_list('id', flat=True)
+        cases.append(BenchmarkCase(
+            'meal-tracking bulk_update', f'{API_PREFIX}meal-tracking/bulk_update/', 'post', {
+                'date': last_day.isoformat(),
+                'member_tracking': [
+                    {'member_id': member_id, 'lunch_count': 1, 'dinner_count': 0}
+                    for member_id in member_ids
+                ],
+            }, write=True
+        ))
+        cases.append(BenchmarkCase(
+            'meal-tracking process_payments', f'{API_PREFIX}meal-tracking/process_payments/', 'post',
+            {'start_date': first_day.isoformat(), 'end_date': last_day.isoformat()}, write=True
+        ))
+    shopping_list_id = ShoppingList.objects.order_by('pk').values_list('pk', flat=True).first()
+    meal_dates = Meal.objects.order_by('date').values_list('date', flat=True)
+    if shopping_list_id is not None and meal_dates.exists():
+        cases.append(BenchmarkCase(
+            'shopping-lists generate_from_meals',
+            f'{API_PREFIX}shopping-lists/{shopping_list_id}/generate_from_meals/', 'post', {
+                'start_date': meal_dates.first().isoformat(),
+                'end_date': meal_dates.last().isoformat(),
+            }, write=True
+        ))
+    return cases
+
+
+class EndpointBenchmark:
+    """
+    Times each case ``iterations`` times through the full request stack
+    (middleware, authentication, rendering, streamed bodies read to the end)
+    as ``user``. Caches are cleared before every request unless ``warm`` is
+    set, so cold numbers are comparable between runs. Query counts and peak
+    Python memory come from one extra run under CaptureQueriesContext and
+    tracemalloc, which would otherwise distort the timings.
+    """
+
+    def __init__(self, user, iterations=20, warm=False):
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+        self.iterations = iterations
+        self.warm = warm
+
+    def request(self, case):
+        if not self.warm:
+            cache.clear()
+            response_cache().clear()
+            rate_resolver.clear()
+        if not case.write:
+            response = getattr(self.client, case.method)(case.url, case.data, format='json')
+            if response.streaming:
+                for _ in response.streaming_content:
+                    pass
+            return response
+        with transaction.atomic():
+            response = getattr(self.client, case.method)(case.url, case.data, format='json')
+            transaction.set_rollback(True)
+        rate_resolver.clear()
+        return response
+
+    def measure(self, case):
+        self.request(case)  # Warm imports and connection state
+        timings = []
+        for _ in range(self.iterations):
+            started = time.perf_counter()
+            response = self.request(case)
+            timings.append((time.perf_counter() - started) * 1000)
+
+        gc.collect()
+        tracemalloc.start()
+        try:
+            with CaptureQueriesContext(connection) as queries:
+                self.request(case)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        return {
+            'status': response.status_code,
+            'queries': len(queries),
+            'peak_kib': round(peak / 1024, 1),
+            **timing_summary(timings),
+        }
+
+    def run(self, cases=None):
+        return {case.name: self.measure(case) for case in (cases or benchmark_cases())}
+
+
+def run_benchmarks(sizes=BENCHMARK_SIZES, iterations=20, warm=False, seed=0, progress=None):
+    """
+    Seed an office of each ``(members, days)`` size and benchmark every
+    endpoint against it. Each size is seeded and measured in a transaction
+    that is rolled back, so sizes never see each other's rows. Returns a
+    JSON-serializable report.
+    """
+    report = {
+        'created_at': timezone.now().isoformat(),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': connection.vendor,
+        'iterations': iterations,
+        'warm': warm,
+        'sizes': [],
+    }
+    for members, days in sizes:
+        with transaction.atomic():
+            started = time.perf_counter()
+            counts = seed_office(members, days, end_date=timezone.now().date() - timedelta(days=1), seed=seed)
+            seed_seconds = time.perf_counter() - started
+            admin = Member.objects.filter(role='admin').select_related('user').first().user
+            if progress:
+                progress(f'{members} members x {days} days seeded in {seed_seconds:.1f}s')
+            results = EndpointBenchmark(admin, iterations=iterations, warm=warm).run()
+            transaction.set_rollback(True)
+        report['sizes'].append({
+            'members': members, 'days': days, 'rows': counts,
+            'seed_seconds': round(seed_seconds, 3), 'results': results,
+        })
+    rate_resolver.clear()
+    return report
+
+
+def json_payloads(page_sizes):
+    """Tracking list pages of each size and the dashboard stats, as views render them"""
+    tracking = MemberMealTrackingViewSet.queryset.order_by('-date', 'id')
+    payloads = {
+        f'tracking page ({size} rows)': MemberMealTrackingSerializer(tracking[:size], many=True).data
+        for size in page_sizes
+    }
+    payloads['dashboard stats'] = DashboardStatsView().compute_stats(timezone.now().date())
+    return payloads
+
+
+def benchmark_json(payloads, iterations=20):
+    """
+    Time the stock and fast JSON renderers and parsers on each payload and
+    check that both renderers produce the same bytes. Returns
+    ``{payload: {'bytes', 'identical', 'render': {...}, 'parse': {...}}}``.
+    """
+    codecs = {
+        'render': [('stock', JSONRenderer()), ('fast', FastJSONRenderer())],
+        'parse': [('stock', JSONParser()), ('fast', FastJSONParser())],
+    }
+    report = {}
+    for name, data in payloads.items():
+        body = JSONRenderer().render(data)
+        result = report[name] = {
+            'bytes': len(body),
+            'identical': FastJSONRenderer().render(data) == body,
+            'render': {}, 'parse': {},
+        }
+        for label, renderer in codecs['render']:
+            result['render'][label] = timing_summary(time_calls(lambda: renderer.render(data), iterations))
+        for label, parser in codecs['parse']:
+            result['parse'][label] = timing_summary(
+                time_calls(lambda: parser.parse(io.BytesIO(body)), iterations)
+            )
+    return report
+
+
+def run_json_benchmarks(members, days, page_sizes, iterations=20, seed=0):
+    """Seed one office and benchmark JSON rendering and parsing of its payloads"""
+    with transaction.atomic():
+        seed_office(members, days, end_date=timezone.now().date() - timedelta(days=1), seed=seed)
+        payloads = json_payloads(page_sizes)
+        transaction.set_rollback(True)
+    return {
+        'accelerated': orjson.__name__ if orjson is not None else None,
+        'payloads': benchmark_json(payloads, iterations),
+    }
+
+
+def concurrency_profiles():
+    """
+    Database setups compared by the concurrency benchmark: SQLite's own
+    defaults (rollback journal, the driver's busy timeout, a connection per
+    request, no retries) against the configured pragma profile, busy
+    timeout, CONN_MAX_AGE and SQLITE_WRITE_RETRIES.
+    """
+    return {
+        'baseline': {
+            'pragmas': {'journal_mode': 'delete', 'synchronous': 'full'},
+            'conn_max_age': 0,
+            'retries': 0,
+        },
+        'production': {
+            'pragmas': sqlite_pragmas(),
+            'conn_max_age': settings.DATABASES['default'].get('CONN_MAX_AGE', 0),
+            'retries': getattr(settings, 'SQLITE_WRITE_RETRIES', 0),
+        },
+    }
+
+
+class MixedLoad:
+    """
+    Random mix of the office's everyday requests: tracking, member and
+    dashboard reads, and tracking updates, expense submissions and deposit
+    corrections as writes (``write_ratio`` of the requests).
+    """
+
+    reads = [
+        BenchmarkCase('meal-tracking list', f'{API_PREFIX}meal-tracking/'),
+        BenchmarkCase('members list', f'{API_PREFIX}members/'),
+        BenchmarkCase('dashboard stats', f'{API_PREFIX}dashboard/stats/'),
+    ]
+
+    def __init__(self, write_ratio=0.2):
+        self.write_ratio = write_ratio
+        self.member_ids = list(Member.objects.filter(status='active').values_list('id', flat=True))
+        self.days = list(
+            MemberMealTracking.objects.order_by('-date').values_list('date', flat=True).distinct()[:14]
+        )
+        self.deposit_ids = list(MonthlyDeposit.objects.values_list('id', flat=True))
+        self.writes = [self.track_meals, self.submit_expense]
+        if self.deposit_ids:
+            self.writes.append(self.correct_deposit)
+
+    def track_meals(self, rng):
+        day = rng.choice(self.days) if self.days else timezone.now().date()
+        members = rng.sample(self.member_ids, min(10, len(self.member_ids)))
+        return BenchmarkCase('meal-tracking bulk_update', f'{API_PREFIX}meal-tracking/bulk_update/', 'post', {
+            'date': day.isoformat(),
+            'member_tracking': [
+                {'member_id': member_id, 'lunch_count': rng.randint(0, 1), 'dinner_count': rng.randint(0, 1)}
+                for member_id in members
+            ],
+        }, write=True)
+
+    def submit_expense(self, rng):
+        return BenchmarkCase('expenses create', f'{API_PREFIX}expenses/', 'post', {
+            'title': 'Groceries run',
+            'amount': f'{rng.randint(100, 50000) / 100:.2f}',
+            'category': rng.choice(['groceries', 'supplies', 'utilities']),
+            'date': timezone.now().date().isoformat(),
+        }, write=True)
+
+    def correct_deposit(self, rng):
+        return BenchmarkCase(
+            'deposits update', f'{API_PREFIX}deposits/{rng.choice(self.deposit_ids)}/', 'patch',
+            {'amount': f'{rng.randint(500, 5000)}.00'}, write=True
+        )
+
+    def next_case(self, rng):
+        if rng.random() < self.write_ratio:
+            return rng.choice(self.writes)(rng)
+        return rng.choice(self.reads)
+
+
+def run_mixed_load(user, load, threads=8, seconds=10, seed=0):
+    """
+    Send ``load`` requests as ``user`` from ``threads`` threads for
+    ``seconds``, each thread with its own client and database connection.
+    Connections are closed or kept after each request per CONN_MAX_AGE, as
+    at the end of a real request. Writes that still fail with a locked
+    database are counted rather than raised.
+    """
+    deadline = time.perf_counter() + seconds
+    samples = []
+    lock = threading.Lock()
+
+    def worker(index):
+        rng = random.Random(seed + index)
+        client = APIClient()
+        client.force_authenticate(user)
+        own = []
+        try:
+            while time.perf_counter() < deadline:
+                case = load.next_case(rng)
+                started = time.perf_counter()
+                try:
+                    response = getattr(client, case.method)(case.url, case.data, format='json')
+                    status = response.status_code
+                except OperationalError as exc:
+                    if not is_locked_error(exc):
+                        raise
+                    status = None
+                finally:
+                    close_old_connections()
+                own.append((case.write, (time.perf_counter() - started) * 1000, status))
+        finally:
+            connections.close_all()
+            with lock:
+                samples.extend(own)
+
+    # Locked requests are counted; keep their tracebacks out of the report
+    request_logger = logging.getLogger('django.request')
+    old_level = request_logger.level
+    request_logger.setLevel(logging.CRITICAL)
+    try:
+        with ThreadPoolExecutor(threads) as pool:
+            for future in [pool.submit(worker, index) for index in range(threads)]:
+                future.result()
+    finally:
+        request_logger.setLevel(old_level)
+    return summarize_mixed_load(samples, seconds)
+
+
+def summarize_mixed_load(samples, seconds):
+    result = {
+        'requests': len(samples),
+        'ops_per_second': round(len(samples) / seconds, 1),
+        'locked_errors': sum(status is None for _, _, status in samples),
+        'client_errors': sum(status is not None and status >= 400 for _, _, status in samples),
+    }
+    for kind, write in (('reads', False), ('writes', True)):
+        timings = [ms for is_write, ms, _ in samples if is_write is write]
+        result[kind] = {'count': len(timings), **(timing_summary(timings) if timings else {})}
+    return result
+
+
+def run_concurrency_benchmark(members, days, threads=8, seconds=10, write_ratio=0.2, seed=0, progress=None):
+    """
+    Seed an office into a fresh SQLite file for each of
+    concurrency_profiles() and measure sustained mixed read/write
+    throughput against it. Returns a JSON-serializable report.
+    """
+    report = {
+        'created_at': timezone.now().isoformat(),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'members': members, 'days': days, 'threads': threads, 'seconds': seconds,
+        'write_ratio': write_ratio,
+        'profiles': {},
+    }
+    database = settings.DATABASES['default']
+    old_max_age = database.get('CONN_MAX_AGE', 0)
+    for name, profile in concurrency_profiles().items():
+        database['CONN_MAX_AGE'] = profile['conn_max_age']
+        try:
+            with tempfile.TemporaryDirectory() as directory, override_settings(
+                SQLITE_PRAGMA_PROFILES={name: profile['pragmas']}, SQLITE_PRAGMA_PROFILE=name,
+                SQLITE_BUSY_TIMEOUT=None, SQLITE_WRITE_RETRIES=profile['retries']
+            ), throwaway_database(os.path.join(directory, f'{name}.sqlite3')):
+                seed_office(members, days, end_date=timezone.now().date() - timedelta(days=1), seed=seed)
+                admin = Member.objects.filter(role='admin').select_related('user').first().user
+                load = MixedLoad(write_ratio)
+                with connection.cursor() as cursor:
+                    cursor.execute('PRAGMA journal_mode')
+                    journal_mode = cursor.fetchone()[0]
+                connection.close()
+                if progress:
+                    progress(f'{name}: journal_mode={journal_mode}, {threads} threads for {seconds}s')
+                result = run_mixed_load(admin, load, threads=threads, seconds=seconds, seed=seed)
+        finally:
+            database['CONN_MAX_AGE'] = old_max_age
+        cache.clear()
+        response_cache().clear()
+        rate_resolver.clear()
+        report['profiles'][name] = {**profile, 'journal_mode': journal_mode, **result}
+    return report
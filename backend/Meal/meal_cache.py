@@ -0,0 +1,99 @@
+# meal_cache.py:
+from django.conf import settings
+from django.core.cache import cache, caches
+
+
+DASHBOARD_STATS_CACHE_KEY = 'meal:dashboard-stats'
+RESPONSE_CACHE_KEY_PREFIX = 'meal:response'
+RESPONSE_CACHE_HITS_KEY = 'meal:response-cache:hits'
+RESPONSE_CACHE_MISSES_KEY = 'meal:response-cache:misses'
+
+
+def _snapshot_is_fresh(snapshot, today, version):
+    # A snapshot stored without a version satisfies no versioned lookup
+    return (snapshot is not None and snapshot['date'] == today
+            and (version is None or snapshot.get('version') == version))
+
+
+def get_dashboard_stats(today, compute, version=None):
+    """
+    Return the cached dashboard snapshot for ``today``, calling ``compute()``
+    to rebuild it when it is missing, expired or from another day. With a
+    ``version`` (the change counters the caller saw), a snapshot built at
+    another version is rebuilt too.
+    """
+    snapshot = cache.get(DASHBOARD_STATS_CACHE_KEY)
+    if not _snapshot_is_fresh(snapshot, today, version):
+        snapshot = {'date': today, 'version': version, 'data': compute()}
+        cache.set(
+            DASHBOARD_STATS_CACHE_KEY, snapshot,
+            getattr(settings, 'DASHBOARD_STATS_CACHE_TIMEOUT', 60)
+        )
+    return snapshot['data']
+
+
+async def aget_dashboard_stats(today, compute, version=None):
+    """get_dashboard_stats() with an async ``compute``"""
+    snapshot = await cache.aget(DASHBOARD_STATS_CACHE_KEY)
+    if not _snapshot_is_fresh(snapshot, today, version):
+        snapshot = {'date': today, 'version': version, 'data': await compute()}
+        await cache.aset(
+            DASHBOARD_STATS_CACHE_KEY, snapshot,
+            getattr(settings, 'DASHBOARD_STATS_CACHE_TIMEOUT', 60)
+        )
+    return snapshot['data']
+
+
+def invalidate_dashboard_stats():
+    cache.delete(DASHBOARD_STATS_CACHE_KEY)
+
+
+def response_cache():
+    return caches[getattr(settings, 'MEAL_RESPONSE_CACHE_ALIAS', 'default')]
+
+
+def response_cache_key(user_id, etag):
+    """
+    Cached responses are keyed by user and ETag. The ETag already covers the
+    path with its query string (filters, page, cursor), the format and the
+    change counters of every table the response reads. A save or delete
+    bumps a counter, so stale entries are never looked up again and simply
+    expire.
+    """
+    return '{}:{}:{}'.format(RESPONSE_CACHE_KEY_PREFIX, user_id, etag.strip('"'))
+
+
+def incr_counter(store, key):
+    """Add one to the never-expiring counter ``key`` of cache ``store``, starting it at 1"""
+    store.add(key, 0, None)
+    try:
+        store.incr(key)
+    except ValueError:
+        # Evicted between add() and incr()
+        store.set(key, 1, None)
+
+
+def _count(key):
+    incr_counter(response_cache(), key)
+
+
+def get_cached_response(key):
+    """Return the cached response data for ``key`` (or None), counting hits and misses"""
+    data = response_cache().get(key)
+    _count(RESPONSE_CACHE_HITS_KEY if data is not None else RESPONSE_CACHE_MISSES_KEY)
+    return data
+
+
+def cache_response(key, data):
+    response_cache().set(key, data, getattr(settings, 'MEAL_RESPONSE_CACHE_TIMEOUT', 300))
+
+
+def response_cache_stats():
+    counters = response_cache().get_many([RESPONSE_CACHE_HITS_KEY, RESPONSE_CACHE_MISSES_KEY])
+    hits = counters.get(RESPONSE_CACHE_HITS_KEY, 0)
+    misses = counters.get(RESPONSE_CACHE_MISSES_KEY, 0)
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / (hits + misses), 4) if hits + misses else None,
+    }
@@ -0,0 +1,94 @@
+# meal_dashboard.py:
+from datetime import timedelta
+from django.db.models import Q, Count, Sum
+from django.utils import timezone
+from .models import Member, Meal, Expense, Budget, MonthlyDeposit, MemberMealTracking
+from .meal_serializers import DashboardStatsSerializer
+
+
+def dashboard_queries(today):
+    """
+    The independent queries behind the dashboard stats for ``today``, as
+    callables that each return a dict of stats. They share no state, so
+    they can run in any order or at the same time (see meal_async).
+    """
+    week_start = today - timedelta(days=today.weekday())
+    month_start = today.replace(day=1)
+    # A range on month (not month__year/__month) so deposit_month_idx applies
+    next_month_start = (month_start + timedelta(days=32)).replace(day=1)
+
+    def member_stats():
+        return Member.objects.aggregate(
+            total_members=Count('id'),
+            active_members=Count('id', filter=Q(status='active')),
+            employee_members=Count('id', filter=Q(member_type='employee')),
+            guest_members=Count('id', filter=Q(member_type='guest')),
+        )
+
+    def meal_stats():
+        return Meal.objects.filter(
+            date__gte=min(week_start, month_start),
+            date__lte=today
+        ).aggregate(
+            total_meals_this_week=Count('id', filter=Q(date__gte=week_start)),
+            total_meals_this_month=Count('id', filter=Q(date__gte=month_start)),
+        )
+
+    def expense_stats():
+        return {'pending_expenses': Expense.objects.filter(status='pending').count()}
+
+    def budget_stats():
+        totals = Budget.objects.filter(
+            start_date__lte=today,
+            end_date__gte=today
+        ).aggregate(total_budget=Sum('total_amount'), spent_budget=Sum('spent_amount'))
+        return {name: value or 0 for name, value in totals.items()}
+
+    def deposit_stats():
+        total = MonthlyDeposit.objects.filter(
+            month__gte=month_start,
+            month__lt=next_month_start
+        ).aggregate(Sum('amount'))['amount__sum']
+        return {'total_deposits_this_month': total or 0}
+
+    def meal_cost_stats():
+        total = MemberMealTracking.objects.filter(
+            date__gte=month_start,
+            date__lte=today
+        ).aggregate(Sum('total_cost'))['total_cost__sum']
+        return {'total_meal_costs_this_month': total or 0}
+
+    def recent_meals():
+        return {'recent_meals': list(Meal.objects.order_by('-created_at')[:5])}
+
+    def recent_expenses():
+        return {'recent_expenses': list(
+            Expense.objects.select_related('submitted_by__user').order_by('-created_at')[:5]
+        )}
+
+    def recent_meal_tracking():
+        return {'recent_meal_tracking': list(
+            MemberMealTracking.objects.select_related('member__user').order_by('-date')[:5]
+        )}
+
+    return [member_stats, meal_stats, expense_stats, budget_stats, deposit_stats, meal_cost_stats,
+            recent_meals, recent_expenses, recent_meal_tracking]
+
+
+def dashboard_stats(results):
+    """Serialized dashboard stats from the dicts returned by dashboard_queries()"""
+    stats_data = {}
+    for result in results:
+        stats_data.update(result)
+
+    total_budget = stats_data['total_budget']
+    stats_data['budget_utilization'] = (
+        (stats_data['spent_budget'] / total_budget) * 100 if total_budget > 0 else 0
+    )
+    stats_data['computed_at'] = timezone.now()
+    return dict(DashboardStatsSerializer(stats_data).data)
+
+
+def compute_dashboard_stats(today):
+    """Run the dashboard queries one after the other"""
+    return dashboard_stats([query() for query in dashboard_queries(today)])
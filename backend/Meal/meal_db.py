@@ -0,0 +1,102 @@
+# meal_db.py:
+import random
+import time
+from contextlib import contextmanager
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import OperationalError, connection, transaction
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from rest_framework.permissions import SAFE_METHODS
+
+
+LOCKED_ERRORS = ('database is locked', 'database table is locked')
+
+
+def sqlite_pragmas():
+    """
+    The pragmas of the ``SQLITE_PRAGMA_PROFILE`` profile of
+    ``SQLITE_PRAGMA_PROFILES`` (none when it is None), with ``busy_timeout``
+    set from ``SQLITE_BUSY_TIMEOUT``.
+    """
+    profile = getattr(settings, 'SQLITE_PRAGMA_PROFILE', None)
+    profiles = getattr(settings, 'SQLITE_PRAGMA_PROFILES', {})
+    if profile is not None and profile not in profiles:
+        raise ImproperlyConfigured(
+            f"SQLITE_PRAGMA_PROFILE {profile!r} is not one of SQLITE_PRAGMA_PROFILES: {', '.join(profiles)}"
+        )
+    pragmas = dict(profiles[profile]) if profile is not None else {}
+    busy_timeout = getattr(settings, 'SQLITE_BUSY_TIMEOUT', None)
+    if busy_timeout is not None:
+        pragmas['busy_timeout'] = int(busy_timeout)
+    return pragmas
+
+
+@receiver(connection_created)
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    """Run sqlite_pragmas() on every new SQLite connection"""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in sqlite_pragmas().items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def is_locked_error(exc):
+    return isinstance(exc, OperationalError) and any(message in str(exc) for message in LOCKED_ERRORS)
+
+
+def retry_delay(attempt):
+    """Exponential backoff with jitter, capped at ``SQLITE_WRITE_RETRY_MAX_DELAY`` seconds"""
+    base = getattr(settings, 'SQLITE_WRITE_RETRY_DELAY', 0.05)
+    cap = getattr(settings, 'SQLITE_WRITE_RETRY_MAX_DELAY', 1.0)
+    return min(cap, base * 2 ** attempt) * random.uniform(0.5, 1.0)
+
+
+@contextmanager
+def write_transaction():
+    """
+    transaction.atomic() that takes SQLite's write lock when it starts
+    (BEGIN IMMEDIATE), so a request that reads before writing waits for
+    other writers through busy_timeout instead of failing when its read
+    snapshot turns out to be stale. Inside a transaction already begun it is
+    a plain savepoint, and the outer transaction's locking applies.
+    """
+    outermost = not connection.in_atomic_block
+    with transaction.atomic():
+        if outermost and connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                # atomic() issued a plain BEGIN, which has not locked anything yet
+                cursor.execute('ROLLBACK')
+                cursor.execute('BEGIN IMMEDIATE')
+        yield
+
+
+class WriteRetryMixin:
+    """
+    Runs each write request (any method but GET/HEAD/OPTIONS) in one
+    write_transaction() and, when SQLite still reports the database as
+    locked after ``SQLITE_BUSY_TIMEOUT``, rolls it back and runs the whole request again, up to
+    ``SQLITE_WRITE_RETRIES`` times with exponential backoff. A request is
+    retried as a whole, so views that write in several steps never apply a
+    step twice. ``SQLITE_WRITE_RETRIES = 0`` turns the wrapper off.
+
+    Requests already inside a transaction (ATOMIC_REQUESTS, tests) and
+    multipart uploads, whose body is not kept in memory, run once as usual.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        retries = getattr(settings, 'SQLITE_WRITE_RETRIES', 0)
+        if (retries <= 0 or request.method in SAFE_METHODS or connection.in_atomic_block
+                or request.content_type.startswith('multipart/')):
+            return super().dispatch(request, *args, **kwargs)
+
+        request.body  # Read the body once so every attempt can parse it
+        for attempt in range(retries + 1):
+            try:
+                with write_transaction():
+                    return super().dispatch(request, *args, **kwargs)
+            except OperationalError as exc:
+                if attempt == retries or not is_locked_error(exc):
+                    raise
+            time.sleep(retry_delay(attempt))
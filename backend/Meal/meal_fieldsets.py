@@ -0,0 +1,156 @@
+# meal_fieldsets.py:
+from rest_framework import serializers
+
+
+FIELDS_QUERY_PARAM = 'fields'
+EXPAND_QUERY_PARAM = 'expand'
+
+
+def parse_field_paths(paths):
+    """Turn ``['id', 'member.user.username']`` into a nested dict tree"""
+    if isinstance(paths, str):
+        paths = paths.split(',')
+    tree = {}
+    for path in paths:
+        node = tree
+        for part in path.strip().split('.'):
+            if part:
+                node = node.setdefault(part, {})
+    return tree
+
+
+class SparseFieldsetMixin:
+    """
+    Lets clients pick the fields of a response with ``?fields=`` and which
+    nested objects to render with ``?expand=``.
+
+    * ``?fields=id,date,member_name`` keeps only those fields. Dotted names
+      select inside nested objects: ``?fields=id,member.full_name``. A nested
+      object named without a dot is rendered in full.
+    * Once either parameter is given, nested objects (fields that are
+      serializers themselves) are left out unless named in ``fields`` or
+      ``expand``; ``?expand=member,member.user`` renders them without
+      restricting the plain fields.
+    * Without either parameter the response is unchanged.
+
+    Unknown names are ignored. The query parameters only apply to reads and
+    to the serializer the view builds; code can pass ``fields=``/``expand=``
+    to the constructor instead. ``Meta.field_relations`` lists the relations
+    method fields read, so views can load only what the kept fields need
+    (see ``fieldset_relations``).
+    """
+
+    def __init__(self, *args, **kwargs):
+        self._requested_fields = kwargs.pop('fields', None)
+        self._requested_expand = kwargs.pop('expand', None)
+        super().__init__(*args, **kwargs)
+
+    @property
+    def fieldset_spec(self):
+        """``(fields tree or None, expand tree)``, or None to render everything"""
+        if not hasattr(self, '_fieldset_spec'):
+            self._fieldset_spec = self._build_fieldset_spec()
+        return self._fieldset_spec
+
+    def _build_fieldset_spec(self):
+        # Nested ``many=True`` serializers are bound through their ListSerializer
+        holder = self.parent if isinstance(self.parent, serializers.ListSerializer) else self
+        parent = holder.parent
+        if parent is None:
+            return self._root_fieldset_spec()
+        if not isinstance(parent, SparseFieldsetMixin) or parent.fieldset_spec is None:
+            return None
+
+        fields, expand = parent.fieldset_spec
+        name = holder.field_name
+        selected = fields.get(name) if fields is not None else None
+        if name in expand:
+            return selected or None, expand[name]
+        if selected:
+            return selected, {}
+        return None
+
+    def _root_fieldset_spec(self):
+        fields, expand = self._requested_fields, self._requested_expand
+        request = self.context.get('request')
+        if fields is None and expand is None and request is not None and request.method in ('GET', 'HEAD'):
+            fields = request.query_params.get(FIELDS_QUERY_PARAM) or None
+            expand = request.query_params.get(EXPAND_QUERY_PARAM) or None
+        if fields is None and expand is None:
+            return None
+        return (
+            parse_field_paths(fields) if fields is not None else None,
+            parse_field_paths(expand) if expand is not None else {},
+        )
+
+    def get_fields(self):
+        fields = super().get_fields()
+        spec = self.fieldset_spec
+        if spec is None:
+            return fields
+        selected, expand = spec
+        return {
+            name: field for name, field in fields.items()
+            if name in expand
+            or (selected is not None and name in selected)
+            or (selected is None and not _is_nested(field))
+        }
+
+    def fieldset_relations(self, prefix=''):
+        """Relation paths the kept fields read, for select/prefetch_related"""
+        field_relations = getattr(getattr(self, 'Meta', None), 'field_relations', {})
+        relations = set()
+        for name, field in self.fields.items():
+            relations.update(prefix + path for path in field_relations.get(name, ()))
+            if not _is_nested(field) or field.source == '*':
+                continue
+            path = prefix + field.source.replace('.', '__')
+            relations.add(path)
+            nested = field.child if isinstance(field, serializers.ListSerializer) else field
+            if isinstance(nested, SparseFieldsetMixin):
+                relations.update(nested.fieldset_relations(path + '__'))
+        return relations
+
+
+def _is_nested(field):
+    return isinstance(field, serializers.BaseSerializer)
+
+
+def load_relations(queryset, relations):
+    """
+    Replace the select/prefetch_related of ``queryset`` with ``relations``,
+    joining single-valued paths and prefetching those crossing a to-many.
+    """
+    select, prefetch = [], []
+    for path in sorted(relations):
+        model, many = queryset.model, False
+        for part in path.split('__'):
+            field = model._meta.get_field(part)
+            many = many or field.many_to_many or field.one_to_many
+            model = field.related_model
+        (prefetch if many else select).append(path)
+
+    queryset = queryset.select_related(None).prefetch_related(None)
+    if select:
+        queryset = queryset.select_related(*select)
+    return queryset.prefetch_related(*prefetch)
+
+
+class SparseFieldsetViewMixin:
+    """
+    Viewset side of SparseFieldsetMixin: when a read asks for ``?fields=`` or
+    ``?expand=``, the queryset only joins or prefetches the relations the
+    kept fields need instead of the viewset's defaults.
+    """
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        params = self.request.query_params
+        if self.request.method not in ('GET', 'HEAD') or not (
+            params.get(FIELDS_QUERY_PARAM) or params.get(EXPAND_QUERY_PARAM)
+        ):
+            return queryset
+        serializer = self.get_serializer()
+        if not isinstance(serializer, SparseFieldsetMixin):
+            return queryset
+        return load_relations(queryset, serializer.fieldset_relations())
@@ -0,0 +1,235 @@
+# meal_imports.py:
+import csv
+import io
+from itertools import islice
+from django.db import transaction
+from django.db.models import Q
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.parsers import FormParser, MultiPartParser
+from rest_framework.response import Response
+from .models import Member, MonthlyDeposit
+from .meal_db import write_transaction
+from .meal_serializers import DepositImportRowSerializer, TrackingImportRowSerializer
+from .meal_services import import_deposit_rows, import_tracking_rows
+
+
+IMPORT_BATCH_SIZE = 500
+
+
+class ImportFormatError(ValueError):
+    """The file itself is unusable (not CSV, or required columns missing)"""
+
+
+class CSVImporter:
+    """
+    Validates a CSV file in batches of ``IMPORT_BATCH_SIZE`` lines and writes
+    the valid rows, all in one transaction holding the write lock from the
+    start (see write_transaction), so rows another request inserts cannot
+    slip in between the checks and the write.
+
+    Each batch is checked field by field with ``row_serializer``, then its
+    members are resolved with one query and the rows checked against the
+    rest of the file and the database with one more. Every problem is
+    reported with its line number; lines with problems are skipped and the
+    rest are written, unless ``dry_run`` is set.
+    """
+    row_serializer = None
+    required_columns = []
+    key_field = None
+    kind = None
+
+    def __init__(self, dry_run=False):
+        self.dry_run = dry_run
+        self.errors = []
+        self.rows = []
+        self.total_rows = 0
+        self.columns = set()
+        self._seen = {}
+
+    def run(self, stream):
+        reader = csv.DictReader(stream)
+        self.columns = set(reader.fieldnames or [])
+        missing = [column for column in self.required_columns if column not in self.columns]
+        if not {'member_id', 'username'} & self.columns:
+            missing.append('member_id or username')
+        if missing:
+            raise ImportFormatError(f"Missing CSV columns: {', '.join(missing)}")
+
+        with transaction.atomic() if self.dry_run else write_transaction():
+            # Data starts on line 2, after the header
+            lines = enumerate(reader, start=2)
+            while True:
+                batch = list(islice(lines, IMPORT_BATCH_SIZE))
+                if not batch:
+                    break
+                self.total_rows += len(batch)
+                self.validate_batch(batch)
+
+            written = self.write(self.rows) if self.rows and not self.dry_run else {}
+        self.errors.sort(key=lambda error: error['line'])
+        return {
+            'total_rows': self.total_rows,
+            'valid_rows': len(self.rows),
+            'error_count': len(self.errors),
+            'errors': self.errors,
+            'dry_run': self.dry_run,
+            **written,
+        }
+
+    def error(self, line, errors):
+        self.errors.append({'line': line, 'errors': errors})
+
+    def validate_batch(self, batch):
+        parsed = []
+        for line, values in batch:
+            serializer = self.row_serializer(data=values)
+            if serializer.is_valid():
+                parsed.append((line, dict(serializer.validated_data)))
+            else:
+                self.error(line, serializer.errors)
+
+        members = self.resolve_members([row for _, row in parsed])
+        candidates = []
+        for line, row in parsed:
+            member_id, member_error = self.match_member(row, members)
+            if member_error:
+                self.error(line, member_error)
+                continue
+            row.pop('username', None)
+            row['member_id'] = member_id
+            key = (member_id, row[self.key_field])
+            if key in self._seen:
+                self.error(line, {self.key_field: [f'Duplicate of line {self._seen[key]}']})
+                continue
+            self._seen[key] = line
+            candidates.append((line, row))
+
+        conflicts = self.existing_keys({(row['member_id'], row[self.key_field]) for _, row in candidates})
+        for line, row in candidates:
+            if (row['member_id'], row[self.key_field]) in conflicts:
+                self.error(line, {self.key_field: [f'A {self.kind} for this member already exists']})
+            else:
+                self.rows.append(row)
+
+    def match_member(self, row, members):
+        """
+        ``(member_id, None)`` for the member a row names, or ``(None, errors)``.
+        A ``member_id`` must exist and agree with ``username`` when both are
+        given; the username is only looked up on its own when there is no id.
+        """
+        username = row.get('username')
+        if not row.get('member_id'):
+            member_id = members.get(('username', username))
+            return (member_id, None) if member_id else (None, {'username': ['Unknown member']})
+        member_id = members.get(('id', row['member_id']))
+        if member_id is None:
+            return None, {'member_id': ['Unknown member']}
+        if username and members.get(('username', username)) != member_id:
+            return None, {'username': ['Does not match member_id']}
+        return member_id, None
+
+    def resolve_members(self, rows):
+        """``{('id', id) | ('username', name): member_id}`` in one query"""
+        ids = {row['member_id'] for row in rows if row.get('member_id')}
+        usernames = {row['username'] for row in rows if row.get('username')}
+        if not ids and not usernames:
+            return {}
+        members = {}
+        for member_id, username in Member.objects.filter(
+            Q(id__in=ids) | Q(user__username__in=usernames)
+        ).values_list('id', 'user__username'):
+            members[('id', member_id)] = member_id
+            members[('username', username)] = member_id
+        return members
+
+    def existing_keys(self, keys):
+        """Keys that must not be written again; none by default (upsert)"""
+        return set()
+
+    def write(self, rows):
+        raise NotImplementedError
+
+
+class DepositImporter(CSVImporter):
+    row_serializer = DepositImportRowSerializer
+    required_columns = ['amount', 'month']
+    key_field = 'month'
+    kind = 'deposit'
+
+    def existing_keys(self, keys):
+        if not keys:
+            return set()
+        return {
+            key for key in MonthlyDeposit.objects.filter(
+                member_id__in={member_id for member_id, _ in keys},
+                month__in={month for _, month in keys},
+            ).values_list('member_id', 'month')
+            if key in keys
+        }
+
+    def write(self, rows):
+        return {'created_count': import_deposit_rows(rows), 'updated_count': 0}
+
+
+class TrackingImporter(CSVImporter):
+    """
+    Existing tracking rows are updated, like bulk_update does; their notes
+    only when the file has a notes column.
+    """
+    row_serializer = TrackingImportRowSerializer
+    required_columns = ['date', 'lunch_count', 'dinner_count']
+    key_field = 'date'
+    kind = 'tracking row'
+
+    def write(self, rows):
+        result = import_tracking_rows(rows, update_notes='notes' in self.columns)
+        return {'created_count': result['created'], 'updated_count': result['updated']}
+
+
+IMPORTERS = {
+    'deposits': DepositImporter,
+    'tracking': TrackingImporter,
+}
+
+
+def import_csv(kind, file, dry_run=False):
+    """
+    Import the CSV ``file`` (a binary or text file object) as ``kind``, one
+    of ``IMPORTERS``. Raises ImportFormatError when the file is unusable.
+    """
+    stream = file
+    if not isinstance(file, io.TextIOBase):
+        stream = io.TextIOWrapper(file, encoding='utf-8-sig', newline='')
+    try:
+        return IMPORTERS[kind](dry_run=dry_run).run(stream)
+    except (UnicodeDecodeError, csv.Error) as exc:
+        raise ImportFormatError(f'Unreadable CSV file: {exc}')
+
+
+class CSVImportMixin:
+    """
+    Adds ``POST <list>/import/`` taking a multipart ``file`` in the CSV
+    format of ``import_kind`` and an optional ``dry_run`` flag.
+    """
+    import_kind = None
+
+    @action(detail=False, methods=['post'], url_path='import',
+            parser_classes=[MultiPartParser, FormParser])
+    def import_rows(self, request):
+        file = request.FILES.get('file')
+        if file is None:
+            return Response({'error': 'A CSV file is required'}, status=status.HTTP_400_BAD_REQUEST)
+        dry_run = str(request.data.get('dry_run', '')).lower() in ('1', 'true', 'yes')
+
+        try:
+            result = import_csv(self.import_kind, file, dry_run=dry_run)
+        except ImportFormatError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        verb = 'Validated' if dry_run else 'Imported'
+        return Response({
+            'message': (f"{verb} {result['valid_rows']} of {result['total_rows']} rows "
+                        f"({result['error_count']} with errors)"),
+            **result
+        })
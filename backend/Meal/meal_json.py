@@ -0,0 +1,87 @@
+# meal_json.py:
+import io
+import math
+from decimal import Decimal
+from django.conf import settings
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:  # Optional; the stdlib json module is used instead
+    orjson = None
+
+
+if orjson is not None:
+    # Dates, times and dataclasses go through DRF's encoder like the stock
+    # renderer (e.g. a "Z" suffix for UTC datetimes), as do the types orjson
+    # does not know (Decimal, lazy strings, querysets...)
+    ORJSON_OPTIONS = (orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+                      | orjson.OPT_NON_STR_KEYS)
+
+_drf_encoder = encoders.JSONEncoder()
+
+
+def _default(obj):
+    value = _drf_encoder.default(obj)
+    if isinstance(obj, Decimal) and (not math.isfinite(value) or 'e' in repr(value)):
+        # orjson writes these differently (null, 1e25); let the stock renderer do it
+        raise TypeError(f'{obj!r} needs the stock renderer')
+    return value
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer encoding with orjson when it is installed.
+
+    Output matches JSONRenderer for compact UTF-8 JSON (DRF's defaults):
+    Decimals become numbers, dates and datetimes ISO 8601 strings, and
+    U+2028/U+2029 are escaped. Indented output (the browsable API,
+    ``; indent=N``), the non-default ``UNICODE_JSON`` and ``COMPACT_JSON``
+    settings, anything orjson refuses (such as integers wider than 64 bits)
+    and Decimals that are not finite or print in exponent form are handed to
+    the stock renderer.
+
+    Python floats are the exception: orjson writes exponents without a sign
+    or zero padding (``1e20``, not ``1e+20``), small ones in positional form
+    (``0.00001``, not ``1e-05``), and NaN and Infinity as ``null`` where the
+    stock renderer raises ValueError. Both forms parse to the same value; the
+    serializers here produce Decimals, not floats, for every amount.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if (orjson is None or self.ensure_ascii or not self.compact
+                or self.get_indent(accepted_media_type, renderer_context or {}) is not None):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=_default, option=ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+class FastJSONParser(JSONParser):
+    """
+    JSONParser decoding with orjson when it is installed. Bodies orjson
+    rejects are parsed again by the stock parser, so error messages are
+    unchanged. Unlike the stdlib, orjson reads integers wider than 64 bits
+    as floats; no field of this API holds such values, and checking every
+    body for them would cost as much as the parse itself.
+    """
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None:
+            return super().parse(stream, media_type, parser_context)
+        encoding = (parser_context or {}).get('encoding', settings.DEFAULT_CHARSET)
+        body = stream.read()
+        try:
+            return orjson.loads(body if encoding.lower() in ('utf-8', 'utf8') else body.decode(encoding))
+        except (orjson.JSONDecodeError, UnicodeDecodeError, LookupError):
+            pass
+        return super().parse(io.BytesIO(body), media_type, parser_context)
@@ -0,0 +1,236 @@
+# meal_metrics.py:
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpResponse, HttpResponseForbidden
+
+
+# Upper bounds of the histogram buckets; +Inf is implied
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+UNMATCHED_ROUTE = 'unmatched'
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus layout"""
+    __slots__ = ('buckets', 'counts', 'count', 'sum')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def samples(self):
+        """``(le, cumulative count)`` for each bucket, ending with +Inf"""
+        total = 0
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            total += count
+            yield bound, total
+
+
+METRICS = [
+    # name, help, buckets, key of the observation
+    ('meal_http_request_duration_seconds', 'Wall time of the request in Django', DURATION_BUCKETS, 'duration'),
+    ('meal_http_request_db_duration_seconds', 'Time spent in database queries', DURATION_BUCKETS, 'db_duration'),
+    ('meal_http_request_queries', 'Database queries per request', QUERY_COUNT_BUCKETS, 'queries'),
+    ('meal_http_response_size_bytes', 'Size of non-streaming response bodies', SIZE_BUCKETS, 'size'),
+]
+
+
+class MetricsRegistry:
+    """
+    In-process request metrics keyed by ``(route, action, method)``, plus a
+    request counter that also carries the status code. Each worker process
+    keeps its own registry; Prometheus adds them up across scrape targets.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._histograms = {}
+            self._requests = {}
+
+    def observe(self, labels, status, **values):
+        with self._lock:
+            histograms = self._histograms.get(labels)
+            if histograms is None:
+                histograms = self._histograms[labels] = {
+                    key: Histogram(buckets) for _, _, buckets, key in METRICS
+                }
+            for key, value in values.items():
+                if value is not None:
+                    histograms[key].observe(value)
+            counter_key = labels + (str(status),)
+            self._requests[counter_key] = self._requests.get(counter_key, 0) + 1
+
+    def render(self):
+        """The metrics in the Prometheus text exposition format (0.0.4)"""
+        with self._lock:
+            lines = [
+                '# HELP meal_http_requests_total Requests handled, by route, action, method and status',
+                '# TYPE meal_http_requests_total counter',
+            ]
+            for labels, count in sorted(self._requests.items()):
+                lines.append(f"meal_http_requests_total{_labels(labels, 'status')} {count}")
+            for name, help_text, _, key in METRICS:
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} histogram')
+                for labels, histograms in sorted(self._histograms.items()):
+                    histogram = histograms[key]
+                    if not histogram.count:
+                        continue
+                    for bound, count in histogram.samples():
+                        lines.append(f"{name}_bucket{_labels(labels + (str(bound),), 'le')} {count}")
+                    lines.append(f'{name}_sum{_labels(labels)} {_number(histogram.sum)}')
+                    lines.append(f'{name}_count{_labels(labels)} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(values, *extra):
+    names = ('route', 'action', 'method') + extra
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + '}'
+
+
+def _number(value):
+    return repr(round(value, 6)) if isinstance(value, float) else str(value)
+
+
+metrics_registry = MetricsRegistry()
+
+
+class QueryTimer:
+    """
+    ``connection.execute_wrapper`` hook adding up query count and time.
+    Queries that run concurrently in worker threads (async views) all
+    count, so the time can exceed the wall time of the request.
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.duration = 0.0
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.duration += elapsed
+                self.queries += 1
+
+
+# Timer of the request being handled. Context variables follow a request
+# into the threads sync_to_async() runs its queries in, which a wrapper on
+# the request thread's own connection would miss.
+current_query_timer = ContextVar('current_query_timer', default=None)
+
+
+def timed_execute(execute, sql, params, many, context):
+    timer = current_query_timer.get()
+    if timer is None:
+        return execute(sql, params, many, context)
+    return timer(execute, sql, params, many, context)
+
+
+@receiver(connection_created)
+def install_query_timer(sender, connection, **kwargs):
+    if timed_execute not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, timed_execute)
+
+
+def route_labels(request):
+    """``(route, action, method)``: the URL pattern, not the path, keeps label values bounded"""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return UNMATCHED_ROUTE, '', request.method
+    route = match.route.replace('^', '').replace('$', '')
+    # Router-generated viewset views map HTTP methods to actions
+    actions = getattr(match.func, 'actions', None) or {}
+    action = actions.get(request.method.lower(), match.url_name or '')
+    return route, action, request.method
+
+
+class RequestMetricsMiddleware:
+    """
+    Records wall time, database time, query count and response size of
+    every request, labelled with the resolved route and viewset action, and
+    reports the breakdown in a ``Server-Timing`` header for browser
+    devtools. Streaming responses are timed up to their first byte and have
+    no size. Works in both WSGI and ASGI stacks.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timer = QueryTimer()
+        started = time.perf_counter()
+        token = current_query_timer.set(timer)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_query_timer.reset(token)
+        return self.record(request, response, timer, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        timer = QueryTimer()
+        started = time.perf_counter()
+        token = current_query_timer.set(timer)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_query_timer.reset(token)
+        return self.record(request, response, timer, time.perf_counter() - started)
+
+    def record(self, request, response, timer, duration):
+        size = None if response.streaming else len(response.content)
+        metrics_registry.observe(
+            route_labels(request), response.status_code,
+            duration=duration, db_duration=timer.duration, queries=timer.queries, size=size,
+        )
+
+        response['Server-Timing'] = (
+            f'db;dur={timer.duration * 1000:.2f};desc="{timer.queries} queries", '
+            f'app;dur={max(duration - timer.duration, 0) * 1000:.2f}, '
+            f'total;dur={duration * 1000:.2f}'
+        )
+        # Cross-origin pages (the Next.js frontend) only see the timings with this
+        origin = request.headers.get('Origin')
+        if origin and origin in getattr(settings, 'CORS_ALLOWED_ORIGINS', []):
+            response['Timing-Allow-Origin'] = origin
+        return response
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint, limited to ``METRICS_ALLOWED_IPS``"""
+    if request.META.get('REMOTE_ADDR') not in getattr(settings, 'METRICS_ALLOWED_IPS', ()):
+        return HttpResponseForbidden()
+    return HttpResponse(metrics_registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,220 @@
+# meal_pricing.py:
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from datetime import date as date_cls, timedelta
+from decimal import Decimal
+from django.conf import settings
+from django.db import transaction
+
+
+CENT = Decimal('0.01')
+ZERO = Decimal('0.00')
+
+
+def per_person(cost, participants):
+    """The one rule turning a day's meal cost and participants into a rate"""
+    return cost / participants if participants > 0 else Decimal(0)
+
+
+def meal_cost(per_person_rate, count):
+    """Cost of ``count`` meals at ``per_person_rate``, rounded to cents"""
+    return (Decimal(per_person_rate) * count).quantize(CENT)
+
+
+class MealRate(namedtuple('MealRate', [
+    'pk', 'date', 'lunch_cost', 'dinner_cost', 'lunch_participants', 'dinner_participants',
+])):
+    """Immutable snapshot of a DailyMealCost row (``pk`` is None when missing)"""
+    __slots__ = ()
+
+    @classmethod
+    def from_daily_cost(cls, daily_cost):
+        return cls(
+            daily_cost.pk, daily_cost.date, daily_cost.lunch_cost, daily_cost.dinner_cost,
+            daily_cost.lunch_participants, daily_cost.dinner_participants,
+        )
+
+    @classmethod
+    def missing(cls, date):
+        return cls(None, date, ZERO, ZERO, 0, 0)
+
+    @property
+    def exists(self):
+        return self.pk is not None
+
+    @property
+    def lunch_per_person(self):
+        return per_person(self.lunch_cost, self.lunch_participants)
+
+    @property
+    def dinner_per_person(self):
+        return per_person(self.dinner_cost, self.dinner_participants)
+
+    def price(self, lunch_count, dinner_count):
+        """Return ``(lunch_cost, dinner_cost, total_cost)`` for one member"""
+        lunch = meal_cost(self.lunch_per_person, lunch_count)
+        dinner = meal_cost(self.dinner_per_person, dinner_count)
+        return lunch, dinner, lunch + dinner
+
+    def to_daily_cost(self):
+        """Fresh, unsaved DailyMealCost carrying this snapshot, or None"""
+        if not self.exists:
+            return None
+        from .models import DailyMealCost
+        return DailyMealCost(
+            id=self.pk, date=self.date, lunch_cost=self.lunch_cost, dinner_cost=self.dinner_cost,
+            lunch_participants=self.lunch_participants, dinner_participants=self.dinner_participants,
+        )
+
+
+def _as_date(value):
+    return date_cls.fromisoformat(value) if isinstance(value, str) else value
+
+
+class MealRateResolver:
+    """
+    Per-process LRU cache of MealRate snapshots keyed by date.
+
+    Entries are evicted beyond ``MEAL_RATE_CACHE_SIZE`` dates and expire after
+    ``MEAL_RATE_CACHE_TIMEOUT`` seconds. Within a process, DailyMealCost
+    save/delete signals invalidate the affected date (see meal_signals).
+    Changes made by other processes are picked up through the shared
+    DailyMealCost change counter, read at most once every
+    ``MEAL_RATE_VERSION_INTERVAL`` seconds, so a cache hit usually costs no
+    query. When the counter has moved, the cached dates are read again
+    together with the lookup's misses in one query. Rows read inside a
+    transaction are only cached once it commits, so rolled back data never
+    lands here.
+    """
+
+    def __init__(self, max_size=None, timeout=None):
+        self._max_size = max_size
+        self._timeout = timeout
+        self._entries = OrderedDict()
+        self._version = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def max_size(self):
+        return self._max_size or getattr(settings, 'MEAL_RATE_CACHE_SIZE', 400)
+
+    @property
+    def timeout(self):
+        return self._timeout or getattr(settings, 'MEAL_RATE_CACHE_TIMEOUT', 300)
+
+    @property
+    def version_interval(self):
+        return getattr(settings, 'MEAL_RATE_VERSION_INTERVAL', 1)
+
+    def get(self, date):
+        date = _as_date(date)
+        return self.get_many([date])[date]
+
+    def get_many(self, dates):
+        """Return ``{date: MealRate}``, fetching all misses in one query"""
+        dates = {_as_date(date) for date in dates}
+        version, stale = self._sync_version()
+        rates, misses = self._lookup(dates)
+        if misses:
+            from .models import DailyMealCost
+            # Dates dropped for a counter change are read again in the same query
+            reload = set(misses) | stale
+            fetched = {
+                cost.date: MealRate.from_daily_cost(cost)
+                for cost in DailyMealCost.objects.filter(date__in=reload)
+            }
+            fetched.update(
+                (date, MealRate.missing(date)) for date in reload if date not in fetched
+            )
+            rates.update((date, fetched[date]) for date in misses)
+            self._store(fetched, version)
+        return rates
+
+    def get_range(self, start_date, end_date):
+        """Return the rates of every date from ``start_date`` to ``end_date``"""
+        start_date, end_date = _as_date(start_date), _as_date(end_date)
+        days = (end_date - start_date).days + 1
+        if days <= 0:
+            return {}
+        dates = [start_date + timedelta(days=offset) for offset in range(days)]
+        if days <= self.max_size:
+            return self.get_many(dates)
+
+        # Too wide to cache usefully: read the range straight from the table
+        from .models import DailyMealCost
+        rates = {date: MealRate.missing(date) for date in dates}
+        for cost in DailyMealCost.objects.filter(date__range=[start_date, end_date]):
+            rates[cost.date] = MealRate.from_daily_cost(cost)
+        return rates
+
+    def invalidate(self, date=None, pk=None):
+        """Drop the entry for ``date`` and any entry of DailyMealCost ``pk``"""
+        date = _as_date(date)
+        with self._lock:
+            stale = [
+                key for key, (_, rate) in self._entries.items()
+                if key == date or (pk is not None and rate.pk == pk)
+            ]
+            for key in stale:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._version = None
+
+    def _sync_version(self):
+        """
+        ``(version, stale dates)``: the shared DailyMealCost counter, read
+        again once ``version_interval`` has passed. When it moved, every entry
+        is dropped and its date returned for reloading.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if self._version is not None and now < self._checked_at + self.version_interval:
+                return self._version, set()
+
+        from .models import CollectionVersion, DailyMealCost
+        version = CollectionVersion.objects.filter(
+            name=DailyMealCost._meta.label
+        ).values_list('version', flat=True).first() or 0
+        with self._lock:
+            self._checked_at = now
+            if version == self._version:
+                return version, set()
+            stale = set(self._entries)
+            self._entries.clear()
+            self._version = version
+        return version, stale
+
+    def _lookup(self, dates):
+        now = time.monotonic()
+        rates, misses = {}, []
+        with self._lock:
+            for date in dates:
+                entry = self._entries.get(date)
+                if entry is None or entry[0] < now:
+                    misses.append(date)
+                    continue
+                self._entries.move_to_end(date)
+                rates[date] = entry[1]
+        return rates, misses
+
+    def _store(self, rates, version):
+        def store():
+            expires_at = time.monotonic() + self.timeout
+            with self._lock:
+                if version != self._version:
+                    return  # Read before a change to the table another lookup saw
+                for date, rate in rates.items():
+                    self._entries[date] = (expires_at, rate)
+                    self._entries.move_to_end(date)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+
+        transaction.on_commit(store)
+
+
+rate_resolver = MealRateResolver()
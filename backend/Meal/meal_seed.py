@@ -0,0 +1,277 @@
+# meal_seed.py:
+import random
+from datetime import date, time, timedelta
+from decimal import Decimal
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from .models import (Member, Meal, Ingredient, ShoppingList, ShoppingItem, Expense, Budget,
+                     DailyMealCost, MemberMealTracking)
+from .meal_services import BULK_BATCH_SIZE, import_deposit_rows, recount_participants, reprice_tracking
+from .meal_signals import bulk_changed
+
+
+SEED_USERNAME_PREFIX = 'seed'
+
+FIRST_NAMES = ['Amina', 'Rafi', 'Nadia', 'Tanvir', 'Sadia', 'Imran', 'Farah', 'Karim', 'Leila',
+               'Omar', 'Priya', 'Jamal', 'Sara', 'Hasan', 'Mina', 'Arif', 'Zara', 'Nabil']
+LAST_NAMES = ['Rahman', 'Hossain', 'Ahmed', 'Khan', 'Chowdhury', 'Islam', 'Das', 'Sarkar',
+              'Karim', 'Uddin', 'Begum', 'Roy']
+
+DISHES = {
+    'lunch': ['Chicken Biryani', 'Beef Curry and Rice', 'Vegetable Khichuri', 'Fish Curry',
+              'Dal and Rice', 'Chicken Roast', 'Mixed Vegetable Curry', 'Egg Curry'],
+    'dinner': ['Chicken Soup', 'Fried Rice', 'Chapati and Dal', 'Vegetable Noodles',
+               'Mutton Curry', 'Grilled Fish'],
+}
+
+# name, unit, (min, max) quantity per meal, cost per unit
+PANTRY = [
+    ('Rice', 'kg', (3, 8), Decimal('1.20')),
+    ('Chicken', 'kg', (2, 6), Decimal('4.50')),
+    ('Beef', 'kg', (2, 5), Decimal('7.00')),
+    ('Fish', 'kg', (2, 5), Decimal('6.00')),
+    ('Lentils', 'kg', (1, 3), Decimal('1.80')),
+    ('Onion', 'kg', (1, 3), Decimal('0.90')),
+    ('Potato', 'kg', (2, 5), Decimal('0.60')),
+    ('Eggs', 'pcs', (20, 60), Decimal('0.15')),
+    ('Cooking Oil', 'l', (1, 2), Decimal('2.40')),
+    ('Milk', 'l', (2, 6), Decimal('1.10')),
+    ('Spices', 'g', (100, 400), Decimal('0.02')),
+]
+
+EXPENSE_TITLES = {
+    'groceries': 'Weekly grocery run',
+    'supplies': 'Plates and napkins',
+    'equipment': 'Kitchen equipment',
+    'utilities': 'Gas bill',
+    'other': 'Miscellaneous',
+}
+
+
+def _money(value):
+    return Decimal(value).quantize(Decimal('0.01'))
+
+
+def _month_starts(start_date, end_date):
+    month = start_date.replace(day=1)
+    while month <= end_date:
+        yield month
+        month = (month + timedelta(days=32)).replace(day=1)
+
+
+class OfficeSeeder:
+    """
+    Generates a synthetic office with ``members`` members over the ``days``
+    days ending on ``end_date`` with batched INSERTs.
+
+    Distributions follow a typical office canteen: about one member in ten
+    is a guest and a few are inactive; on weekdays active members take lunch
+    with a probability of 80% (guests 40%) and dinner with 20%, sometimes
+    bringing a guest; daily costs scale with participants around a per-head
+    rate. Every member deposits once a month. Meals with ingredients,
+    weekly shopping lists, expenses and monthly budgets are created to
+    match. The same ``seed`` always produces the same data.
+    """
+
+    def __init__(self, members, days, end_date=None, seed=0, prefix=SEED_USERNAME_PREFIX):
+        self.member_count = members
+        self.days = days
+        self.end_date = end_date or date.today()
+        self.start_date = self.end_date - timedelta(days=days - 1)
+        self.prefix = prefix
+        self.random = random.Random(seed)
+        self.counts = {}
+
+    def run(self):
+        if User.objects.filter(username__startswith=f'{self.prefix}-').exists():
+            raise ValueError(f"Users named '{self.prefix}-*' already exist; use another prefix")
+        with transaction.atomic():
+            members = self.create_members()
+            self.create_tracking(members)
+            self.create_deposits(members)
+            self.create_meals(members)
+            self.create_shopping_lists(members)
+            self.create_expenses(members)
+            self.create_budgets(members)
+        bulk_changed(User, Member, Meal, Ingredient, ShoppingList, ShoppingItem, Expense, Budget)
+        return self.counts
+
+    def weekdays(self):
+        day = self.start_date
+        while day <= self.end_date:
+            if day.weekday() < 5:
+                yield day
+            day += timedelta(days=1)
+
+    def staff(self, members):
+        return [member for member in members if member.role in ('admin', 'manager')]
+
+    def create_members(self):
+        # Every seeded user shares one hash; hashing per user would dominate the run
+        password = make_password(None)
+        users = User.objects.bulk_create([
+            User(
+                username=f'{self.prefix}-{index:05d}', password=password,
+                first_name=self.random.choice(FIRST_NAMES), last_name=self.random.choice(LAST_NAMES),
+                email=f'{self.prefix}-{index:05d}@example.com',
+            )
+            for index in range(self.member_count)
+        ], batch_size=BULK_BATCH_SIZE)
+
+        managers = max(1, self.member_count // 20)
+        members = []
+        for index, user in enumerate(users):
+            role = 'admin' if index == 0 else 'manager' if index <= managers else 'member'
+            roll = self.random.random()
+            members.append(Member(
+                user=user, role=role,
+                member_type='guest' if role == 'member' and roll < 0.1 else 'employee',
+                status='inactive' if role == 'member' and 0.1 <= roll < 0.15 else 'active',
+                monthly_deposit=_money(self.random.choice([2000, 2500, 3000, 3500])),
+            ))
+        members = Member.objects.bulk_create(members, batch_size=BULK_BATCH_SIZE)
+        self.counts.update(users=len(users), members=len(members))
+        return members
+
+    def create_tracking(self, members):
+        active = [member for member in members if member.status == 'active']
+        rows, costs = [], []
+        for day in self.weekdays():
+            lunch = dinner = 0
+            for member in active:
+                lunch_chance = 0.4 if member.member_type == 'guest' else 0.8
+                lunch_count = (2 if self.random.random() < 0.05 else 1) if self.random.random() < lunch_chance else 0
+                dinner_count = 1 if self.random.random() < 0.2 else 0
+                if lunch_count or dinner_count:
+                    rows.append(MemberMealTracking(
+                        member=member, date=day, lunch_count=lunch_count, dinner_count=dinner_count,
+                        notes='Brought a guest' if lunch_count == 2 else '',
+                    ))
+                lunch += lunch_count
+                dinner += dinner_count
+            costs.append(DailyMealCost(
+                date=day,
+                lunch_cost=_money(lunch * self.random.gauss(95, 10)) if lunch else 0,
+                dinner_cost=_money(dinner * self.random.gauss(80, 10)) if dinner else 0,
+            ))
+        DailyMealCost.objects.bulk_create(costs, batch_size=BULK_BATCH_SIZE)
+        MemberMealTracking.objects.bulk_create(rows, batch_size=BULK_BATCH_SIZE)
+        # Participants and prices come from the same code paths as the API
+        recount_participants([cost.date for cost in costs])
+        reprice_tracking(self.start_date, self.end_date)
+        self.counts.update(daily_costs=len(costs), tracking=len(rows))
+
+    def create_deposits(self, members):
+        rows = [
+            {
+                'member_id': member.id, 'month': month, 'notes': '',
+                'amount': _money(member.monthly_deposit * Decimal(self.random.choice([1, 1, 1, 0.5]))),
+            }
+            for month in _month_starts(self.start_date, self.end_date)
+            for member in members
+            if member.status == 'active' or self.random.random() < 0.3
+        ]
+        self.counts['deposits'] = import_deposit_rows(rows)
+
+    def create_meals(self, members):
+        staff = self.staff(members)
+        meals = []
+        for day in self.weekdays():
+            for meal_type in ('lunch', 'dinner'):
+                if meal_type == 'dinner' and self.random.random() < 0.5:
+                    continue
+                status = 'approved' if day <= self.end_date - timedelta(days=2) else self.random.choice(
+                    ['planned', 'approved']
+                )
+                meals.append(Meal(
+                    name=self.random.choice(DISHES[meal_type]), meal_type=meal_type, date=day,
+                    time=time(13, 0) if meal_type == 'lunch' else time(20, 0), status=status,
+                    estimated_cost=0, created_by=self.random.choice(staff),
+                ))
+        meals = Meal.objects.bulk_create(meals, batch_size=BULK_BATCH_SIZE)
+
+        ingredients = []
+        for meal in meals:
+            total = Decimal(0)
+            for name, unit, (low, high), unit_cost in self.random.sample(PANTRY, self.random.randint(3, 6)):
+                quantity = _money(self.random.uniform(low, high))
+                cost = max(_money(quantity * unit_cost), Decimal('0.01'))
+                total += cost
+                ingredients.append(Ingredient(
+                    meal=meal, name=name, quantity=quantity, unit=unit, estimated_cost=cost
+                ))
+            meal.estimated_cost = total
+            if meal.status == 'approved' and meal.date < self.end_date:
+                meal.actual_cost = _money(total * Decimal(self.random.uniform(0.9, 1.15)))
+        Ingredient.objects.bulk_create(ingredients, batch_size=BULK_BATCH_SIZE)
+        Meal.objects.bulk_update(meals, ['estimated_cost', 'actual_cost'], batch_size=BULK_BATCH_SIZE)
+        self.counts.update(meals=len(meals), ingredients=len(ingredients))
+
+    def create_shopping_lists(self, members):
+        staff = self.staff(members)
+        week_starts = [day for day in self.weekdays() if day.weekday() == 0] or [self.start_date]
+        lists = ShoppingList.objects.bulk_create([
+            ShoppingList(
+                name=f'Week of {week_start:%d %b %Y}', date_needed=week_start,
+                created_by=self.random.choice(staff),
+                status='completed' if week_start < self.end_date - timedelta(days=7) else 'pending',
+            )
+            for week_start in week_starts
+        ], batch_size=BULK_BATCH_SIZE)
+
+        items = []
+        for shopping_list in lists:
+            estimated = actual = Decimal(0)
+            for name, unit, (low, high), unit_cost in self.random.sample(PANTRY, self.random.randint(5, 10)):
+                quantity = _money(self.random.uniform(low, high) * 5)
+                cost = _money(quantity * unit_cost)
+                purchased = shopping_list.status == 'completed'
+                actual_cost = _money(cost * Decimal(self.random.uniform(0.9, 1.1))) if purchased else None
+                estimated += cost
+                actual += actual_cost or 0
+                items.append(ShoppingItem(
+                    shopping_list=shopping_list, name=name, quantity=quantity, unit=unit,
+                    estimated_cost=cost, actual_cost=actual_cost, is_purchased=purchased,
+                ))
+            shopping_list.total_estimated_cost = estimated
+            shopping_list.total_actual_cost = actual if shopping_list.status == 'completed' else None
+        ShoppingItem.objects.bulk_create(items, batch_size=BULK_BATCH_SIZE)
+        ShoppingList.objects.bulk_update(
+            lists, ['total_estimated_cost', 'total_actual_cost'], batch_size=BULK_BATCH_SIZE
+        )
+        self.counts.update(shopping_lists=len(lists), shopping_items=len(items))
+
+    def create_expenses(self, members):
+        staff = self.staff(members)
+        categories = ['groceries'] * 6 + ['supplies'] * 2 + ['utilities', 'equipment', 'other']
+        expenses = []
+        for day in self.weekdays():
+            for _ in range(self.random.choice([0, 0, 1, 1, 2])):
+                category = self.random.choice(categories)
+                status = self.random.choices(['approved', 'pending', 'rejected'], [8, 3, 1])[0]
+                expenses.append(Expense(
+                    title=EXPENSE_TITLES[category], category=category, date=day, status=status,
+                    amount=_money(self.random.lognormvariate(4.5, 0.6)) + Decimal('0.01'),
+                    submitted_by=self.random.choice(members),
+                    approved_by=self.random.choice(staff) if status == 'approved' else None,
+                ))
+        expenses = Expense.objects.bulk_create(expenses, batch_size=BULK_BATCH_SIZE)
+        self.counts['expenses'] = len(expenses)
+
+    def create_budgets(self, members):
+        budgets = []
+        for month in _month_starts(self.start_date, self.end_date):
+            month_end = (month + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+            total = _money(self.member_count * self.random.uniform(1800, 2600))
+            budgets.append(Budget(
+                name=f'{month:%B %Y} canteen', total_amount=total, start_date=month, end_date=month_end,
+                spent_amount=_money(total * Decimal(self.random.uniform(0.3, 1.0))),
+                created_by=members[0],
+            ))
+        self.counts['budgets'] = len(Budget.objects.bulk_create(budgets))
+
+
+def seed_office(members, days, end_date=None, seed=0, prefix=SEED_USERNAME_PREFIX):
+    """Create a synthetic office (see OfficeSeeder); returns row counts per table"""
+    return OfficeSeeder(members, days, end_date=end_date, seed=seed, prefix=prefix).run()
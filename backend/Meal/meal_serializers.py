@@ -1,13 +1,18 @@
 # auth_serializers.py
 from rest_framework import serializers
 from django.contrib.auth.models import User
+from django.db import models
 from .models import (Member, Meal, Ingredient, ShoppingList, ShoppingItem, 
-                     Expense, Budget, MonthlyDeposit, DailyMealCost, MemberMealTracking)
+                     Expense, Budget, MonthlyDeposit, DailyMealCost, MemberMealTracking,
+                     MemberMonthlySummary)
 from .auth_serializers import MemberSerializer
-from datetime import datetime, timedelta
+from .meal_fieldsets import SparseFieldsetMixin
+from .meal_pricing import rate_resolver
+from datetime import datetime
+from decimal import Decimal
 
 
-class MonthlyDepositSerializer(serializers.ModelSerializer):
+class MonthlyDepositSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     member = MemberSerializer(read_only=True)
     member_name = serializers.SerializerMethodField()
     month_display = serializers.SerializerMethodField()
@@ -17,6 +22,7 @@ class MonthlyDepositSerializer(serializers.ModelSerializer):
         fields = ['id', 'member', 'member_name', 'amount', 'month', 'month_display', 
                  'deposit_date', 'notes']
         read_only_fields = ['id', 'member', 'deposit_date']
+        field_relations = {'member_name': ['member__user']}
     
     def get_member_name(self, obj):
         return obj.member.user.get_full_name() or obj.member.user.username
@@ -30,7 +36,7 @@ class MonthlyDepositSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
-class DailyMealCostSerializer(serializers.ModelSerializer):
+class DailyMealCostSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     lunch_cost_per_person = serializers.ReadOnlyField()
     dinner_cost_per_person = serializers.ReadOnlyField()
     total_cost = serializers.SerializerMethodField()
@@ -49,19 +55,35 @@ class DailyMealCostSerializer(serializers.ModelSerializer):
         return obj.lunch_participants + obj.dinner_participants
 
 
-class MemberMealTrackingSerializer(serializers.ModelSerializer):
+class MemberMealTrackingListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        # Resolve the daily rates of the whole page in at most one query
+        items = list(data.all() if isinstance(data, models.Manager) else data)
+        if 'daily_cost' in self.child.fields:
+            self.child.page_rates = rate_resolver.get_many(item.date for item in items)
+        return super().to_representation(items)
+
+
+class MemberMealTrackingSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     member = MemberSerializer(read_only=True)
     member_name = serializers.SerializerMethodField()
-    daily_cost = DailyMealCostSerializer(source='date', read_only=True)
+    daily_cost = serializers.SerializerMethodField()
     
     class Meta:
         model = MemberMealTracking
         fields = ['id', 'member', 'member_name', 'date', 'lunch_count', 'dinner_count',
                  'lunch_cost', 'dinner_cost', 'total_cost', 'is_paid', 'notes', 'daily_cost']
         read_only_fields = ['id', 'member', 'lunch_cost', 'dinner_cost', 'total_cost']
+        list_serializer_class = MemberMealTrackingListSerializer
+        field_relations = {'member_name': ['member__user']}
     
     def get_member_name(self, obj):
         return obj.member.user.get_full_name() or obj.member.user.username
+    
+    def get_daily_cost(self, obj):
+        rate = getattr(self, 'page_rates', {}).get(obj.date) or rate_resolver.get(obj.date)
+        daily_cost = rate.to_daily_cost()
+        return DailyMealCostSerializer(daily_cost).data if daily_cost else None
 
 
 class MemberMealTrackingBulkSerializer(serializers.Serializer):
@@ -83,6 +105,76 @@ class MemberMealTrackingBulkSerializer(serializers.Serializer):
         return value
 
 
+class ImportRowSerializer(serializers.Serializer):
+    """One CSV line of a bulk import; the member is given by id or username"""
+    member_id = serializers.IntegerField(required=False, allow_null=True)
+    username = serializers.CharField(required=False, allow_blank=True)
+    notes = serializers.CharField(required=False, allow_blank=True, default='')
+    
+    def to_internal_value(self, data):
+        # Empty CSV cells mean "not given"
+        data = {key: value for key, value in data.items() if key and value not in ('', None)}
+        return super().to_internal_value(data)
+    
+    def validate(self, attrs):
+        if not attrs.get('member_id') and not attrs.get('username'):
+            raise serializers.ValidationError("member_id or username is required")
+        return attrs
+
+
+class DepositImportRowSerializer(ImportRowSerializer):
+    amount = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal('0.01'))
+    month = serializers.DateField(input_formats=['%Y-%m', '%Y-%m-%d'])
+    
+    def validate_month(self, value):
+        return value.replace(day=1)
+
+
+class TrackingImportRowSerializer(ImportRowSerializer):
+    date = serializers.DateField()
+    lunch_count = serializers.ChoiceField(choices=[0, 1, 2])
+    dinner_count = serializers.ChoiceField(choices=[0, 1, 2])
+
+
+class ShoppingItemPurchaseSerializer(serializers.Serializer):
+    item_id = serializers.IntegerField()
+    actual_cost = serializers.DecimalField(
+        max_digits=8, decimal_places=2, min_value=Decimal('0'), required=False, allow_null=True
+    )
+
+
+class ShoppingPurchaseSerializer(serializers.Serializer):
+    items = ShoppingItemPurchaseSerializer(many=True, allow_empty=False)
+
+
+class DateRangeSerializer(serializers.Serializer):
+    start_date = serializers.DateField()
+    end_date = serializers.DateField(required=False)
+    
+    def validate(self, attrs):
+        attrs.setdefault('end_date', attrs['start_date'])
+        if attrs['end_date'] < attrs['start_date']:
+            raise serializers.ValidationError("end_date must not be before start_date")
+        return attrs
+
+
+class PaymentSettlementSerializer(serializers.Serializer):
+    date = serializers.DateField(required=False)
+    start_date = serializers.DateField(required=False)
+    end_date = serializers.DateField(required=False)
+    dry_run = serializers.BooleanField(default=False)
+    
+    def validate(self, attrs):
+        start_date = attrs.get('start_date') or attrs.get('date')
+        if not start_date:
+            raise serializers.ValidationError("Date is required")
+        attrs['start_date'] = start_date
+        attrs['end_date'] = attrs.get('end_date') or start_date
+        if attrs['end_date'] < attrs['start_date']:
+            raise serializers.ValidationError("end_date must not be before start_date")
+        return attrs
+
+
 class MemberDetailSerializer(MemberSerializer):
     current_month_deposit = serializers.SerializerMethodField()
     current_month_consumption = serializers.SerializerMethodField()
@@ -94,46 +186,62 @@ class MemberDetailSerializer(MemberSerializer):
             'current_month_deposit', 'current_month_consumption', 'recent_meal_tracking'
         ]
     
-    def get_current_month_deposit(self, obj):
+    def get_current_month_summary(self, obj):
         from datetime import date
         current_month = date.today().replace(day=1)
-        try:
-            deposit = obj.deposits.get(month=current_month)
-            return MonthlyDepositSerializer(deposit).data
-        except MonthlyDeposit.DoesNotExist:
+        if getattr(self, '_summary_member_id', None) != obj.pk:
+            self._summary_member_id = obj.pk
+            self._summary = obj.monthly_summaries.filter(month=current_month).first()
+        return self._summary
+    
+    def get_current_month_deposit(self, obj):
+        summary = self.get_current_month_summary(obj)
+        if summary is None or not summary.deposit_amount:
+            return None  # No deposit this month, known without querying deposits
+        deposit = obj.deposits.filter(month=summary.month).first()
+        if deposit is None:
             return None
+        deposit.member = obj
+        return MonthlyDepositSerializer(deposit).data
     
     def get_current_month_consumption(self, obj):
-        from datetime import date
-        current_month = date.today().replace(day=1)
-        next_month = (current_month.replace(day=28) + timedelta(days=4)).replace(day=1)
-        
-        tracking = obj.meal_tracking.filter(
-            date__gte=current_month,
-            date__lt=next_month
-        )
-        
-        total_cost = sum(t.total_cost for t in tracking)
-        total_meals = sum(t.lunch_count + t.dinner_count for t in tracking)
-        
+        summary = self.get_current_month_summary(obj)
+        if summary is None:
+            return {'total_cost': 0, 'total_meals': 0, 'days_with_meals': 0}
         return {
-            'total_cost': total_cost,
-            'total_meals': total_meals,
-            'days_with_meals': tracking.count()
+            'total_cost': summary.total_cost,
+            'total_meals': summary.total_meals,
+            'days_with_meals': summary.days_with_meals
         }
     
     def get_recent_meal_tracking(self, obj):
-        recent_tracking = obj.meal_tracking.all()[:7]  # Last 7 days
+        recent_tracking = obj.meal_tracking.select_related('member__user')[:7]  # Last 7 days
         return MemberMealTrackingSerializer(recent_tracking, many=True).data
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class MemberMonthlySummarySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    member_name = serializers.SerializerMethodField()
+    total_meals = serializers.ReadOnlyField()
+    
+    class Meta:
+        model = MemberMonthlySummary
+        fields = ['id', 'member', 'member_name', 'month', 'lunch_meals', 'dinner_meals',
+                 'total_meals', 'days_with_meals', 'total_cost', 'paid_amount',
+                 'unpaid_amount', 'deposit_amount', 'updated_at']
+        read_only_fields = fields
+        field_relations = {'member_name': ['member__user']}
+    
+    def get_member_name(self, obj):
+        return obj.member.user.get_full_name() or obj.member.user.username
+
+
+class IngredientSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Ingredient
         fields = ['id', 'name', 'quantity', 'unit', 'estimated_cost']
 
 
-class MealSerializer(serializers.ModelSerializer):
+class MealSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     ingredients = IngredientSerializer(many=True, read_only=True)
     created_by = MemberSerializer(read_only=True)
     created_by_name = serializers.SerializerMethodField()
@@ -144,6 +252,7 @@ class MealSerializer(serializers.ModelSerializer):
                  'estimated_cost', 'actual_cost', 'status', 'ingredients',
                  'created_by', 'created_by_name', 'created_at', 'updated_at']
         read_only_fields = ['id', 'created_by', 'created_at', 'updated_at']
+        field_relations = {'created_by_name': ['created_by__user']}
     
     def get_created_by_name(self, obj):
         return obj.created_by.user.get_full_name() or obj.created_by.user.username
@@ -175,35 +284,59 @@ class MealCreateSerializer(serializers.ModelSerializer):
         return meal
 
 
-class ShoppingItemSerializer(serializers.ModelSerializer):
+class ShoppingItemSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = ShoppingItem
         fields = ['id', 'name', 'quantity', 'unit', 'estimated_cost', 
-                 'actual_cost', 'is_purchased', 'notes']
+                 'actual_cost', 'is_purchased', 'notes', 'from_meals']
+        read_only_fields = ['from_meals']
 
 
-class ShoppingListSerializer(serializers.ModelSerializer):
+# Formats summed costs the way DecimalFields render
+COST_TOTAL_FIELD = serializers.DecimalField(max_digits=12, decimal_places=2)
+
+
+class ShoppingListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     items = ShoppingItemSerializer(many=True, read_only=True)
     created_by = MemberSerializer(read_only=True)
     created_by_name = serializers.SerializerMethodField()
     items_count = serializers.SerializerMethodField()
     purchased_items_count = serializers.SerializerMethodField()
+    items_estimated_cost = serializers.SerializerMethodField()
+    items_actual_cost = serializers.SerializerMethodField()
     
     class Meta:
         model = ShoppingList
         fields = ['id', 'name', 'date_created', 'date_needed', 'status',
                  'total_estimated_cost', 'total_actual_cost', 'created_by',
-                 'created_by_name', 'items', 'items_count', 'purchased_items_count']
+                 'created_by_name', 'items', 'items_count', 'purchased_items_count',
+                 'items_estimated_cost', 'items_actual_cost']
         read_only_fields = ['id', 'date_created', 'created_by']
+        field_relations = {'created_by_name': ['created_by__user']}
     
     def get_created_by_name(self, obj):
         return obj.created_by.user.get_full_name() or obj.created_by.user.username
     
+    # The counters are annotated by ShoppingListViewSet in the query that
+    # loads the lists; other callers fall back to aggregating the items.
+    def _item_totals(self, obj):
+        if not hasattr(obj, 'items_count'):
+            obj.__dict__.update(obj.item_totals())
+        return obj
+    
     def get_items_count(self, obj):
-        return obj.items.count()
+        return self._item_totals(obj).items_count
     
     def get_purchased_items_count(self, obj):
-        return obj.items.filter(is_purchased=True).count()
+        return self._item_totals(obj).purchased_items_count
+    
+    def get_items_estimated_cost(self, obj):
+        total = self._item_totals(obj).items_estimated_cost
+        return COST_TOTAL_FIELD.to_representation(total or 0)
+    
+    def get_items_actual_cost(self, obj):
+        total = self._item_totals(obj).items_actual_cost
+        return COST_TOTAL_FIELD.to_representation(total) if total is not None else None
     
     def create(self, validated_data):
         request = self.context.get('request')
@@ -236,7 +369,7 @@ class ShoppingListCreateSerializer(serializers.ModelSerializer):
         return shopping_list
 
 
-class ExpenseSerializer(serializers.ModelSerializer):
+class ExpenseSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     submitted_by = MemberSerializer(read_only=True)
     approved_by = MemberSerializer(read_only=True)
     submitted_by_name = serializers.SerializerMethodField()
@@ -248,6 +381,10 @@ class ExpenseSerializer(serializers.ModelSerializer):
                  'status', 'receipt', 'submitted_by', 'approved_by',
                  'submitted_by_name', 'approved_by_name', 'created_at']
         read_only_fields = ['id', 'submitted_by', 'approved_by', 'created_at']
+        field_relations = {
+            'submitted_by_name': ['submitted_by__user'],
+            'approved_by_name': ['approved_by__user'],
+        }
     
     def get_submitted_by_name(self, obj):
         return obj.submitted_by.user.get_full_name() or obj.submitted_by.user.username
@@ -263,7 +400,7 @@ class ExpenseSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
-class BudgetSerializer(serializers.ModelSerializer):
+class BudgetSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     created_by = MemberSerializer(read_only=True)
     created_by_name = serializers.SerializerMethodField()
     remaining_amount = serializers.ReadOnlyField()
@@ -275,6 +412,7 @@ class BudgetSerializer(serializers.ModelSerializer):
                  'utilization_percentage', 'start_date', 'end_date', 'created_by',
                  'created_by_name', 'created_at']
         read_only_fields = ['id', 'created_by', 'created_at', 'spent_amount']
+        field_relations = {'created_by_name': ['created_by__user']}
     
     def get_created_by_name(self, obj):
         return obj.created_by.user.get_full_name() or obj.created_by.user.username
@@ -285,6 +423,36 @@ class BudgetSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
+class MealSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Meal
+        fields = ['id', 'name', 'meal_type', 'date', 'time', 'status', 'estimated_cost', 'created_at']
+
+
+class ExpenseSummarySerializer(serializers.ModelSerializer):
+    submitted_by_name = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = Expense
+        fields = ['id', 'title', 'amount', 'category', 'date', 'status',
+                 'submitted_by_name', 'created_at']
+    
+    def get_submitted_by_name(self, obj):
+        return obj.submitted_by.user.get_full_name() or obj.submitted_by.user.username
+
+
+class MemberMealTrackingSummarySerializer(serializers.ModelSerializer):
+    member_name = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = MemberMealTracking
+        fields = ['id', 'member_id', 'member_name', 'date', 'lunch_count', 'dinner_count',
+                 'total_cost', 'is_paid']
+    
+    def get_member_name(self, obj):
+        return obj.member.user.get_full_name() or obj.member.user.username
+
+
 class DashboardStatsSerializer(serializers.Serializer):
     total_members = serializers.IntegerField()
     active_members = serializers.IntegerField()
@@ -297,7 +465,8 @@ class DashboardStatsSerializer(serializers.Serializer):
     spent_budget = serializers.DecimalField(max_digits=12, decimal_places=2)
     total_deposits_this_month = serializers.DecimalField(max_digits=12, decimal_places=2)
     total_meal_costs_this_month = serializers.DecimalField(max_digits=12, decimal_places=2)
-    recent_meals = MealSerializer(many=True)
-    recent_expenses = ExpenseSerializer(many=True)
-    recent_meal_tracking = MemberMealTrackingSerializer(many=True)
+    recent_meals = MealSummarySerializer(many=True)
+    recent_expenses = ExpenseSummarySerializer(many=True)
+    recent_meal_tracking = MemberMealTrackingSummarySerializer(many=True)
     budget_utilization = serializers.DecimalField(max_digits=5, decimal_places=2)
+    computed_at = serializers.DateTimeField()
@@ -0,0 +1,464 @@
+# meal_services.py:
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import (Q, F, Count, Case, When, Value, DecimalField, CharField, Subquery,
+                              Exists, OuterRef, Min, Sum)
+from django.db.models.functions import Coalesce, Lower, Trim
+from .models import (Member, DailyMealCost, MemberMealTracking, MonthlyDeposit, Meal, Ingredient,
+                     ShoppingList, ShoppingItem)
+from .meal_pricing import MealRate, meal_cost, rate_resolver
+from .meal_signals import bulk_changed
+from .meal_summaries import months_between, refresh_monthly_summaries
+
+
+BULK_BATCH_SIZE = 500
+# Members per settlement UPDATE; each costs two or three bound parameters
+SETTLEMENT_MEMBERS_PER_STATEMENT = 300
+# Each priced date adds ~24 bound parameters to the UPDATE; keep a month of
+# dates per statement, well below SQLite's 999 variable limit.
+REPRICE_DATES_PER_STATEMENT = 31
+
+
+def _count_cost_case(count_field, rates):
+    """SQL CASE mapping (date, 0/1/2 meal count) to its rounded cost"""
+    whens = []
+    for date, per_person_rate in rates:
+        for count in (1, 2):
+            whens.append(When(
+                date=date, **{count_field: count},
+                then=Value(meal_cost(per_person_rate, count))
+            ))
+    return Case(
+        *whens,
+        default=Value(Decimal('0.00')),
+        output_field=DecimalField(max_digits=8, decimal_places=2),
+    )
+
+
+def _cost_updates(rates):
+    lunch_cost = _count_cost_case(
+        'lunch_count', [(rate.date, rate.lunch_per_person) for rate in rates]
+    )
+    dinner_cost = _count_cost_case(
+        'dinner_count', [(rate.date, rate.dinner_per_person) for rate in rates]
+    )
+    return {
+        'lunch_cost': lunch_cost,
+        'dinner_cost': dinner_cost,
+        'total_cost': lunch_cost + dinner_cost,
+    }
+
+
+def reprice_tracking(start_date, end_date=None, rates=None):
+    """
+    Recompute lunch, dinner and total cost of every tracking row between
+    ``start_date`` and ``end_date`` (inclusive) with database-side CASE
+    expressions instead of per-row saves.
+
+    Rates come from the shared rate resolver. A month or less is repriced in
+    a single UPDATE; longer ranges are split into one statement per month of
+    priced dates. Rows on dates without a DailyMealCost are reset to zero.
+    ``rates`` can be passed when the caller already holds the MealRates of
+    the range. Returns the number of tracking rows updated.
+    """
+    end_date = end_date or start_date
+    if rates is None:
+        rates = rate_resolver.get_range(start_date, end_date).values()
+    rates = sorted((rate for rate in rates if rate.exists), key=lambda rate: rate.date)
+    chunks = [
+        rates[i:i + REPRICE_DATES_PER_STATEMENT]
+        for i in range(0, len(rates), REPRICE_DATES_PER_STATEMENT)
+    ] or [[]]
+
+    updated = 0
+    in_range = MemberMealTracking.objects.filter(date__range=[start_date, end_date])
+    with transaction.atomic():
+        for index, chunk in enumerate(chunks):
+            rows = in_range
+            if index > 0:
+                rows = rows.filter(date__gt=chunks[index - 1][-1].date)
+            if index < len(chunks) - 1:
+                rows = rows.filter(date__lte=chunk[-1].date)
+            updated += rows.update(**_cost_updates(chunk))
+        if updated:
+            # Only members with rows in the range can have changed totals
+            refresh_monthly_summaries(
+                months=months_between(start_date, end_date),
+                member_ids=list(in_range.order_by().values_list('member_id', flat=True).distinct()),
+            )
+    bulk_changed(MemberMealTracking)
+    return updated
+
+
+def adjust_balances(amounts):
+    """
+    Add ``{member_id: amount}`` to member balances (negative to charge) with
+    one UPDATE of F() arithmetic per chunk of members, so concurrent changes
+    to the same balances are never overwritten.
+    """
+    items = [(member_id, amount) for member_id, amount in amounts.items() if amount]
+    for i in range(0, len(items), SETTLEMENT_MEMBERS_PER_STATEMENT):
+        chunk = items[i:i + SETTLEMENT_MEMBERS_PER_STATEMENT]
+        Member.objects.filter(id__in=[member_id for member_id, _ in chunk]).update(
+            current_balance=F('current_balance') + Case(
+                *[When(id=member_id, then=Value(amount)) for member_id, amount in chunk],
+                output_field=DecimalField(max_digits=10, decimal_places=2),
+            )
+        )
+
+
+def recount_participants(dates):
+    """
+    Refresh the lunch and dinner participant counts of the DailyMealCost rows
+    of ``dates`` from one grouped aggregate and a batched UPDATE. Returns the
+    MealRates of the dates that have a DailyMealCost.
+    """
+    costs = list(DailyMealCost.objects.filter(date__in=set(dates)))
+    if not costs:
+        return []
+    counts = {
+        row['date']: row
+        for row in MemberMealTracking.objects.filter(
+            date__in=[cost.date for cost in costs]
+        ).values('date').annotate(
+            lunch=Count('id', filter=Q(lunch_count__gt=0)),
+            dinner=Count('id', filter=Q(dinner_count__gt=0)),
+        ).order_by()
+    }
+    for cost in costs:
+        row = counts.get(cost.date, {})
+        cost.lunch_participants = row.get('lunch', 0)
+        cost.dinner_participants = row.get('dinner', 0)
+    DailyMealCost.objects.bulk_update(
+        costs, ['lunch_participants', 'dinner_participants'], batch_size=BULK_BATCH_SIZE
+    )
+    bulk_changed(DailyMealCost)
+    return [MealRate.from_daily_cost(cost) for cost in costs]
+
+
+def _upsert_tracking_rows(rows, update_fields=('lunch_count', 'dinner_count')):
+    MemberMealTracking.objects.bulk_create(
+        rows,
+        batch_size=BULK_BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=['member', 'date'],
+        update_fields=list(update_fields),
+    )
+
+
+def bulk_upsert_tracking(date, member_tracking):
+    """
+    Upsert the meal counts of many members for one date.
+
+    Runs a fixed number of queries regardless of how many members are
+    submitted: one to validate the member ids, one to find the rows that
+    already exist, batched upserts, one conditional aggregate for the
+    participant counts and a single UPDATE that prices every row of the day
+    from one DailyMealCost fetch.
+    Returns a dict with ``created``, ``updated`` and ``skipped`` counts plus
+    the ids of the unknown members that were skipped.
+    """
+    # Later entries for the same member win, like the old sequential loop
+    submitted = {item['member_id']: item for item in member_tracking}
+
+    with transaction.atomic():
+        valid_ids = set(
+            Member.objects.filter(id__in=submitted).values_list('id', flat=True)
+        )
+        existing_ids = set(
+            MemberMealTracking.objects.filter(
+                date=date, member_id__in=valid_ids
+            ).values_list('member_id', flat=True)
+        )
+
+        rows = [
+            MemberMealTracking(
+                member_id=member_id,
+                date=date,
+                lunch_count=item['lunch_count'],
+                dinner_count=item['dinner_count'],
+            )
+            for member_id, item in submitted.items()
+            if member_id in valid_ids
+        ]
+        _upsert_tracking_rows(rows)
+
+        # Update daily meal cost participant counts, then price the whole day
+        reprice_tracking(date, rates=recount_participants([date]))
+
+    skipped_ids = sorted(set(submitted) - valid_ids)
+    return {
+        'created': len(rows) - len(existing_ids),
+        'updated': len(existing_ids),
+        'skipped': len(skipped_ids),
+        'skipped_member_ids': skipped_ids,
+    }
+
+
+def settle_payments(start_date, end_date=None, dry_run=False):
+    """
+    Pay unpaid tracking rows between ``start_date`` and ``end_date`` out of
+    each member's ``current_balance``.
+
+    Every member's unpaid days are settled oldest first for as long as the
+    balance covers them. The whole run is one transaction: the affected
+    members are locked (SELECT ... FOR UPDATE where the backend supports it,
+    SQLite serializes writers anyway), their unpaid rows are read in one
+    query, and the results are written with one UPDATE for the rows and one
+    for the balances per chunk of members. Balances are decremented with F()
+    expressions so concurrent deposits are never overwritten.
+
+    With ``dry_run`` nothing is written; the result still lists who is short.
+    """
+    end_date = end_date or start_date
+    unpaid_rows = MemberMealTracking.objects.filter(
+        date__range=[start_date, end_date], is_paid=False
+    )
+
+    with transaction.atomic():
+        members = {
+            member['id']: member
+            for member in Member.objects.select_for_update(of=('self',)).filter(
+                id__in=Subquery(unpaid_rows.values('member_id'))
+            ).order_by('id').values(
+                'id', 'current_balance', 'user__username', 'user__first_name', 'user__last_name'
+            )
+        }
+        rows = list(
+            unpaid_rows.order_by('member_id', 'date').values_list('member_id', 'date', 'total_cost')
+        )
+
+        dues = {}         # member_id -> total unpaid in the range
+        settlements = {}  # member_id -> (last paid date, amount, rows paid)
+        short = set()
+        for member_id, date, total_cost in rows:
+            due = dues[member_id] = dues.get(member_id, Decimal(0)) + total_cost
+            if member_id in short:
+                continue
+            if due <= members[member_id]['current_balance']:
+                paid = settlements.get(member_id, (None, None, 0))[2]
+                settlements[member_id] = (date, due, paid + 1)
+            else:
+                short.add(member_id)
+
+        if not dry_run:
+            settled_items = list(settlements.items())
+            for i in range(0, len(settled_items), SETTLEMENT_MEMBERS_PER_STATEMENT):
+                chunk = settled_items[i:i + SETTLEMENT_MEMBERS_PER_STATEMENT]
+                paid_rows = Q()
+                for member_id, (last_date, _, _) in chunk:
+                    paid_rows |= Q(member_id=member_id, date__lte=last_date)
+                unpaid_rows.filter(paid_rows).update(is_paid=True)
+                adjust_balances({member_id: -amount for member_id, (_, amount, _) in chunk})
+            refresh_monthly_summaries(
+                months=months_between(start_date, end_date), member_ids=list(settlements)
+            )
+            bulk_changed(MemberMealTracking, Member)
+
+    short_members = []
+    for member_id in sorted(short):
+        member = members[member_id]
+        full_name = f"{member['user__first_name']} {member['user__last_name']}".strip()
+        short_members.append({
+            'member_id': member_id,
+            'member_name': full_name or member['user__username'],
+            'current_balance': member['current_balance'],
+            'amount_due': dues[member_id],
+            'shortfall': dues[member_id] - member['current_balance'],
+        })
+
+    return {
+        'total_records': len(rows),
+        'processed_count': sum(paid for _, _, paid in settlements.values()),
+        'settled_members': len(settlements),
+        'settled_amount': sum((amount for _, amount, _ in settlements.values()), Decimal(0)),
+        'short_members': short_members,
+        'dry_run': dry_run,
+    }
+
+
+def import_tracking_rows(rows, update_notes=True):
+    """
+    Write validated import rows (dicts with ``member_id``, ``date``,
+    ``lunch_count``, ``dinner_count`` and ``notes``) in one transaction:
+    batched upserts, one participant recount over every imported date and
+    one repricing pass over the imported date range. An existing row of the
+    same member and date takes the imported counts, and the imported notes
+    unless ``update_notes`` is false, so exported rows import back unchanged.
+    Returns a dict with ``created`` and ``updated`` counts.
+    """
+    if not rows:
+        return {'created': 0, 'updated': 0}
+    dates = {row['date'] for row in rows}
+    keys = {(row['member_id'], row['date']) for row in rows}
+
+    with transaction.atomic():
+        existing = sum(
+            1 for key in MemberMealTracking.objects.filter(
+                member_id__in={member_id for member_id, _ in keys}, date__in=dates
+            ).values_list('member_id', 'date')
+            if key in keys
+        )
+        _upsert_tracking_rows(
+            [MemberMealTracking(**row) for row in rows],
+            update_fields=('lunch_count', 'dinner_count') + (('notes',) if update_notes else ()),
+        )
+        recount_participants(dates)
+        reprice_tracking(min(dates), max(dates))
+
+    return {'created': len(rows) - existing, 'updated': existing}
+
+
+def import_deposit_rows(rows):
+    """
+    Insert validated import rows (dicts with ``member_id``, ``month``,
+    ``amount`` and ``notes``) with batched INSERTs and credit each member's
+    balance with their total in one UPDATE per chunk of members, all in one
+    transaction. Returns the number of deposits created.
+    """
+    if not rows:
+        return 0
+    totals = {}
+    for row in rows:
+        totals[row['member_id']] = totals.get(row['member_id'], Decimal(0)) + row['amount']
+
+    with transaction.atomic():
+        MonthlyDeposit.objects.bulk_create(
+            [MonthlyDeposit(**row) for row in rows], batch_size=BULK_BATCH_SIZE
+        )
+        adjust_balances(totals)
+        refresh_monthly_summaries(
+            months={row['month'] for row in rows}, member_ids=list(totals)
+        )
+    bulk_changed(MonthlyDeposit, Member)
+    return len(rows)
+
+
+def generate_shopping_items(shopping_list, start_date, end_date):
+    """
+    Replace the unpurchased items ``shopping_list`` got from meals with the
+    ingredients of the approved meals between ``start_date`` and ``end_date``.
+
+    Ingredients are summed per name (trimmed, case-insensitive) and unit in
+    one grouped query and inserted with one bulk INSERT, so running it again
+    gives the same list instead of duplicating items. Generated items that
+    were already purchased are kept: their ingredient only gets an item for
+    the quantity still missing, with the cost scaled to match, or none when
+    the purchase covers it. Items added by hand are kept and count towards
+    the list's estimated total.
+    Returns ``(items generated, meals used)``.
+    """
+    meals = Meal.objects.filter(status='approved', date__range=[start_date, end_date])
+    totals = Ingredient.objects.filter(
+        meal__status='approved', meal__date__range=[start_date, end_date]
+    ).values(name_key=Lower(Trim('name')), unit_key=F('unit')).annotate(
+        display_name=Min(Trim('name')),
+        total_quantity=Sum('quantity'),
+        total_cost=Sum('estimated_cost'),
+    ).order_by('name_key', 'unit_key')
+    generated = shopping_list.items.filter(from_meals=True)
+
+    with transaction.atomic():
+        purchased = {
+            (row['name_key'], row['unit_key']): row['quantity']
+            for row in generated.filter(is_purchased=True).values(
+                name_key=Lower(Trim('name')), unit_key=F('unit')
+            ).annotate(quantity=Sum('quantity')).order_by()
+        }
+        items = []
+        for row in totals:
+            quantity = row['total_quantity'] - purchased.get((row['name_key'], row['unit_key']), 0)
+            if quantity <= 0:
+                continue
+            items.append(ShoppingItem(
+                shopping_list=shopping_list,
+                name=row['display_name'],
+                quantity=quantity,
+                unit=row['unit_key'],
+                estimated_cost=(row['total_cost'] * quantity / row['total_quantity']).quantize(Decimal('0.01')),
+                from_meals=True,
+            ))
+        # Only unpurchased items go, which never count in total_actual_cost
+        generated.filter(is_purchased=False).delete()
+        ShoppingItem.objects.bulk_create(items, batch_size=BULK_BATCH_SIZE)
+        counts = shopping_list.items.aggregate(
+            total=Sum('estimated_cost'),
+            purchased=Count('id', filter=Q(is_purchased=True)),
+            unpurchased=Count('id', filter=Q(is_purchased=False)),
+        )
+        shopping_list.total_estimated_cost = counts['total'] or 0
+        shopping_list.refresh_from_db(fields=['status'])
+        # New items to buy reopen a completed list; a list left with only
+        # purchased items is complete, as after mark_items_purchased()
+        if counts['unpurchased'] and shopping_list.status == 'completed':
+            shopping_list.status = 'in_progress'
+        elif counts['purchased'] and not counts['unpurchased']:
+            shopping_list.status = 'completed'
+        shopping_list.save(update_fields=['total_estimated_cost', 'status'])
+    bulk_changed(ShoppingItem, ShoppingList)
+
+    return len(items), meals.count()
+
+
+def mark_items_purchased(shopping_list, purchases):
+    """
+    Mark many items of ``shopping_list`` purchased in one transaction.
+
+    ``purchases`` is a list of dicts with ``item_id`` and an optional
+    ``actual_cost`` (the item keeps its current one when omitted). The items
+    are locked and read in one query and written with one UPDATE. The list's
+    ``total_actual_cost`` is moved by the difference with F() arithmetic
+    rather than re-summed, and its status becomes ``completed`` in the same
+    statement once no unpurchased item is left.
+    Returns a dict with the ``purchased`` count and ``skipped_item_ids``.
+    """
+    # Later entries for the same item win
+    submitted = {purchase['item_id']: purchase for purchase in purchases}
+
+    with transaction.atomic():
+        items = {
+            item['id']: item
+            for item in ShoppingItem.objects.select_for_update().filter(
+                shopping_list=shopping_list, id__in=submitted
+            ).values('id', 'is_purchased', 'actual_cost')
+        }
+
+        delta = Decimal(0)
+        actual_costs = {}
+        for item_id, item in items.items():
+            actual_cost = submitted[item_id].get('actual_cost')
+            if actual_cost is None:
+                # Omitted or null keeps the item's cost; an explicit 0 is a cost
+                actual_cost = item['actual_cost']
+            actual_costs[item_id] = actual_cost
+            if item['is_purchased'] and item['actual_cost'] is not None:
+                delta -= item['actual_cost']
+            if actual_cost is not None:
+                delta += actual_cost
+
+        if items:
+            cost_field = ShoppingItem._meta.get_field('actual_cost')
+            ShoppingItem.objects.filter(id__in=items).update(
+                is_purchased=True,
+                actual_cost=Case(
+                    *[When(id=item_id, then=Value(cost)) for item_id, cost in actual_costs.items()],
+                    output_field=cost_field,
+                ),
+            )
+            unpurchased = ShoppingItem.objects.filter(
+                shopping_list=OuterRef('pk'), is_purchased=False
+            )
+            ShoppingList.objects.filter(pk=shopping_list.pk).update(
+                total_actual_cost=Coalesce(F('total_actual_cost'), Value(Decimal(0))) + Value(delta),
+                status=Case(
+                    When(~Exists(unpurchased), then=Value('completed')),
+                    default=F('status'),
+                    output_field=CharField(),
+                ),
+            )
+            shopping_list.refresh_from_db(fields=['total_actual_cost', 'status'])
+    if items:
+        bulk_changed(ShoppingItem, ShoppingList)
+
+    skipped_ids = sorted(set(submitted) - set(items))
+    return {'purchased': len(items), 'skipped_item_ids': skipped_ids}
@@ -0,0 +1,113 @@
+# meal_signals.py:
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver, Signal
+from .models import (Member, Meal, Ingredient, ShoppingList, ShoppingItem, Expense, Budget,
+                     MonthlyDeposit, DailyMealCost, MemberMealTracking, MemberMonthlySummary)
+from .auth_authentication import invalidate_all_principals, invalidate_principal
+from .meal_cache import invalidate_dashboard_stats
+from .meal_pricing import rate_resolver
+from .meal_summaries import record_tracking_change, record_deposit_change
+from .meal_versions import bump_versions
+
+
+# Sent with the model class as sender after queryset.update()/bulk_create()
+# writes, which bypass post_save and post_delete.
+models_bulk_changed = Signal()
+
+DASHBOARD_MODELS = [User, Member, Meal, Expense, Budget, MonthlyDeposit, MemberMealTracking]
+
+# Tables with a CollectionVersion counter for conditional GETs
+VERSIONED_MODELS = [User, Member, Meal, Ingredient, ShoppingList, ShoppingItem, Expense, Budget,
+                    MonthlyDeposit, DailyMealCost, MemberMealTracking, MemberMonthlySummary]
+
+
+def bulk_changed(*models):
+    for model in models:
+        models_bulk_changed.send(sender=model)
+
+
+def _now_and_on_commit(func):
+    """Run ``func`` now and again on commit, so readers racing the write
+    cannot re-cache the old state"""
+    func()
+    transaction.on_commit(func)
+
+
+@receiver([post_save, post_delete], sender=DailyMealCost)
+def invalidate_meal_rate(sender, instance, **kwargs):
+    _now_and_on_commit(lambda: rate_resolver.invalidate(instance.date, pk=instance.pk))
+
+
+@receiver(models_bulk_changed, sender=DailyMealCost)
+def clear_meal_rates(sender, **kwargs):
+    _now_and_on_commit(rate_resolver.clear)
+
+
+def invalidate_dashboard(sender, **kwargs):
+    _now_and_on_commit(invalidate_dashboard_stats)
+
+
+# Connected per model: a receiver for every sender would stop Django from
+# fast-deleting (a single DELETE) rows of any model
+for model in DASHBOARD_MODELS:
+    for signal in (post_save, post_delete, models_bulk_changed):
+        signal.connect(invalidate_dashboard, sender=model)
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_user_principal(sender, instance, **kwargs):
+    _now_and_on_commit(lambda: invalidate_principal(instance.pk))
+
+
+@receiver([post_save, post_delete], sender=Member)
+def invalidate_member_principal(sender, instance, **kwargs):
+    _now_and_on_commit(lambda: invalidate_principal(instance.user_id))
+
+
+@receiver(models_bulk_changed, sender=User)
+@receiver(models_bulk_changed, sender=Member)
+def invalidate_principals(sender, **kwargs):
+    # Balances and statuses changed with queryset.update(), rows unknown
+    _now_and_on_commit(invalidate_all_principals)
+
+
+@receiver(post_save, sender=MemberMealTracking)
+def update_tracking_summary(sender, instance, created, **kwargs):
+    record_tracking_change(instance, created=created)
+
+
+@receiver(post_delete, sender=MemberMealTracking)
+def remove_tracking_summary(sender, instance, **kwargs):
+    record_tracking_change(instance, deleted=True)
+
+
+@receiver(post_save, sender=MonthlyDeposit)
+def update_deposit_summary(sender, instance, created, **kwargs):
+    record_deposit_change(instance, created=created)
+
+
+@receiver(post_delete, sender=MonthlyDeposit)
+def remove_deposit_summary(sender, instance, **kwargs):
+    record_deposit_change(instance, deleted=True)
+
+
+def bump_collection_version(sender, update_fields=None, **kwargs):
+    # Logging in only touches last_login, which no response shows
+    if sender is User and update_fields == frozenset({'last_login'}):
+        return
+    bump_versions(sender)
+
+
+# Ingredients and shopping items are only deleted with their meal or list
+# (which bumps that table) or in bulk paths that send models_bulk_changed.
+# Leaving out post_delete keeps those deletes a single fast DELETE instead
+# of one counter UPDATE per row.
+CHILD_MODELS = [Ingredient, ShoppingItem]
+
+for model in VERSIONED_MODELS:
+    for signal in (post_save, post_delete, models_bulk_changed):
+        if signal is post_delete and model in CHILD_MODELS:
+            continue
+        signal.connect(bump_collection_version, sender=model)
@@ -0,0 +1,170 @@
+# meal_statements.py:
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import timedelta
+from decimal import Decimal
+import django
+from django.db import connections, transaction
+from django.db.models import Q, Sum
+from .models import Member, MonthlyDeposit, MemberMealTracking, MonthlyStatement
+from .meal_summaries import month_of
+
+
+STATEMENT_CHUNK_SIZE = 200
+STATEMENT_BATCH_SIZE = 500
+
+ZERO = Decimal('0.00')
+
+
+def next_month(month):
+    return (month_of(month) + timedelta(days=32)).replace(day=1)
+
+
+def _sums_by_member(queryset, field):
+    return dict(
+        queryset.values('member_id').annotate(total=Sum(field)).order_by().values_list('member_id', 'total')
+    )
+
+
+def compute_statements(month, member_ids):
+    """
+    MonthlyStatement field values of ``member_ids`` for ``month``, from five
+    grouped aggregates over the chunk.
+
+    Balances follow the same ledger as ``current_balance``: deposits add to
+    it and settled (paid) meals are taken out of it, per the month of the
+    deposit and of the meal. The closing balance is today's balance with
+    every later deposit and payment undone; the opening balance is that
+    minus the month's own movement.
+    """
+    start, end = month, next_month(month)
+    balances = dict(Member.objects.filter(id__in=member_ids).values_list('id', 'current_balance'))
+    tracking = MemberMealTracking.objects.filter(member_id__in=member_ids)
+    deposits = MonthlyDeposit.objects.filter(member_id__in=member_ids)
+
+    meals = {
+        row['member_id']: row
+        for row in tracking.filter(date__gte=start, date__lt=end).values('member_id').annotate(
+            lunch_meals=Sum('lunch_count'),
+            dinner_meals=Sum('dinner_count'),
+            lunch_charges=Sum('lunch_cost'),
+            dinner_charges=Sum('dinner_cost'),
+            paid_amount=Sum('total_cost', filter=Q(is_paid=True)),
+            unpaid_amount=Sum('total_cost', filter=Q(is_paid=False)),
+        ).order_by()
+    }
+    month_deposits = _sums_by_member(deposits.filter(month__gte=start, month__lt=end), 'amount')
+    later_deposits = _sums_by_member(deposits.filter(month__gte=end), 'amount')
+    later_payments = _sums_by_member(tracking.filter(date__gte=end, is_paid=True), 'total_cost')
+
+    statements = []
+    for member_id in member_ids:
+        if member_id not in balances:
+            continue  # Deleted since the chunk was planned
+        row = meals.get(member_id, {})
+        paid = row.get('paid_amount') or ZERO
+        deposited = month_deposits.get(member_id) or ZERO
+        closing = (balances[member_id] - (later_deposits.get(member_id) or ZERO)
+                   + (later_payments.get(member_id) or ZERO))
+        statements.append({
+            'member_id': member_id,
+            'month': month,
+            'opening_balance': closing - deposited + paid,
+            'deposits': deposited,
+            'lunch_meals': row.get('lunch_meals') or 0,
+            'dinner_meals': row.get('dinner_meals') or 0,
+            'lunch_charges': row.get('lunch_charges') or ZERO,
+            'dinner_charges': row.get('dinner_charges') or ZERO,
+            'paid_amount': paid,
+            'unpaid_amount': row.get('unpaid_amount') or ZERO,
+            'closing_balance': closing,
+        })
+    return statements
+
+
+def _init_worker():
+    # Spawned workers start without Django; forked ones must not share the
+    # parent's database connections
+    django.setup()
+    connections.close_all()
+
+
+def _compute_chunk(month, member_ids):
+    started = time.perf_counter()
+    statements = compute_statements(month, member_ids)
+    connections.close_all()
+    return statements, time.perf_counter() - started
+
+
+def close_month(month, workers=None, chunk_size=STATEMENT_CHUNK_SIZE, force=False, progress=None):
+    """
+    Write a MonthlyStatement of ``month`` for every member.
+
+    Members are split in chunks of ``chunk_size``; ``workers`` processes
+    (one per CPU by default, none with 1) compute the chunks while this
+    process writes each finished chunk with bulk inserts in its own
+    transaction, so the database only ever has one writer. Members that
+    already have a statement for the month are skipped, which makes the
+    run idempotent and lets an interrupted run pick up where it stopped.
+    ``force`` deletes the month's statements first and recomputes all.
+
+    Returns the counts and a timing breakdown in seconds.
+    """
+    started = time.perf_counter()
+    month = month_of(month)
+    workers = workers or os.cpu_count() or 1
+    statements = MonthlyStatement.objects.filter(month=month)
+
+    replaced = statements.delete()[0] if force else 0
+    closed = set(statements.values_list('member_id', flat=True))
+    pending = [member_id for member_id in Member.objects.order_by('id').values_list('id', flat=True)
+               if member_id not in closed]
+    chunks = [pending[i:i + chunk_size] for i in range(0, len(pending), chunk_size)]
+
+    result = {
+        'month': month.isoformat(),
+        'members': len(closed) + len(pending),
+        'created': 0,
+        'skipped': len(closed),
+        'replaced': replaced,
+        'chunks': len(chunks),
+        'workers': min(workers, len(chunks)) if workers > 1 and len(chunks) > 1 else 1,
+        'seconds': {'compute': 0.0, 'write': 0.0},
+    }
+
+    def write(chunk_statements, compute_seconds):
+        write_started = time.perf_counter()
+        member_ids = [values['member_id'] for values in chunk_statements]
+        with transaction.atomic():
+            # Members closed by a concurrent run of the same month since planning
+            existing = set(statements.filter(member_id__in=member_ids).values_list('member_id', flat=True))
+            MonthlyStatement.objects.bulk_create(
+                [MonthlyStatement(**values) for values in chunk_statements
+                 if values['member_id'] not in existing],
+                batch_size=STATEMENT_BATCH_SIZE, ignore_conflicts=True,
+            )
+            # ignore_conflicts reports no count; conflicts still race the check above
+            created = statements.filter(member_id__in=member_ids).count() - len(existing)
+        result['created'] += created
+        result['skipped'] += len(chunk_statements) - created
+        result['seconds']['compute'] += compute_seconds
+        result['seconds']['write'] += time.perf_counter() - write_started
+        if progress:
+            progress(f"{result['created']} of {len(pending)} statements written")
+
+    if result['workers'] > 1:
+        # Children open their own connections
+        connections.close_all()
+        with ProcessPoolExecutor(result['workers'], initializer=_init_worker) as pool:
+            futures = [pool.submit(_compute_chunk, month, chunk) for chunk in chunks]
+            for future in as_completed(futures):
+                write(*future.result())
+    else:
+        for chunk in chunks:
+            compute_started = time.perf_counter()
+            write(compute_statements(month, chunk), time.perf_counter() - compute_started)
+
+    result['seconds'] = {name: round(value, 3) for name, value in result['seconds'].items()}
+    result['seconds']['total'] = round(time.perf_counter() - started, 3)
+    return result
@@ -0,0 +1,182 @@
+# meal_summaries.py:
+from datetime import timedelta
+from decimal import Decimal
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q, Count, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+from .models import MonthlyDeposit, MemberMealTracking, MemberMonthlySummary
+
+
+SUMMARY_FIELDS = ['lunch_meals', 'dinner_meals', 'days_with_meals', 'total_cost',
+                  'paid_amount', 'unpaid_amount', 'deposit_amount']
+
+
+def month_of(date):
+    return date.replace(day=1)
+
+
+def months_between(start_date, end_date):
+    """First days of every month touched by the range, in order"""
+    months = []
+    month = month_of(start_date)
+    while month <= end_date:
+        months.append(month)
+        month = (month + timedelta(days=32)).replace(day=1)
+    return months
+
+
+def _tracking_contribution(values):
+    total_cost = values['total_cost']
+    paid = total_cost if values['is_paid'] else Decimal(0)
+    return (values['member_id'], month_of(values['date'])), {
+        'lunch_meals': values['lunch_count'],
+        'dinner_meals': values['dinner_count'],
+        'days_with_meals': 1,
+        'total_cost': total_cost,
+        'paid_amount': paid,
+        'unpaid_amount': total_cost - paid,
+    }
+
+
+def _deposit_contribution(values):
+    return (values['member_id'], month_of(values['month'])), {'deposit_amount': values['amount']}
+
+
+def _negate(fields):
+    return {field: -value for field, value in fields.items()}
+
+
+def _apply(key, fields, create_missing):
+    """Add ``fields`` to the summary row of ``key`` with F() arithmetic"""
+    changes = {field: F(field) + value for field, value in fields.items() if value}
+    if not changes:
+        return
+    member_id, month = key
+    rows = MemberMonthlySummary.objects.filter(member_id=member_id, month=month)
+    changes['updated_at'] = timezone.now()
+    if rows.update(**changes) or not create_missing:
+        return
+    try:
+        with transaction.atomic():
+            MemberMonthlySummary.objects.create(member_id=member_id, month=month, **fields)
+    except IntegrityError:
+        # Created concurrently since our UPDATE; add to that row instead
+        rows.update(**changes)
+
+
+def _record_change(instance, fields, contribution, deleted):
+    current = {field: getattr(instance, field) for field in fields}
+    loaded = getattr(instance, '_loaded_values', None)
+    if loaded is not None and not set(fields) <= set(loaded):
+        loaded = None
+
+    if loaded is None and not deleted and not getattr(instance, '_summary_created', False):
+        # An update of a row we never saw loaded: recompute its slice instead
+        key, _ = contribution(current)
+        refresh_monthly_summaries(months=[key[1]], member_ids=[key[0]])
+    else:
+        with transaction.atomic():
+            if loaded is not None:
+                key, old = contribution(loaded)
+                _apply(key, _negate(old), create_missing=False)
+            elif deleted:
+                key, old = contribution(current)
+                _apply(key, _negate(old), create_missing=False)
+            if not deleted:
+                key, new = contribution(current)
+                _apply(key, new, create_missing=True)
+
+    instance._loaded_values = None if deleted else current
+    _summaries_changed()
+
+
+def _summaries_changed():
+    from .meal_signals import bulk_changed
+    bulk_changed(MemberMonthlySummary)
+
+
+def record_tracking_change(instance, created=False, deleted=False):
+    """Apply the delta of one saved or deleted MemberMealTracking row"""
+    instance._summary_created = created
+    _record_change(
+        instance, ['member_id', 'date', 'lunch_count', 'dinner_count', 'total_cost', 'is_paid'],
+        _tracking_contribution, deleted
+    )
+
+
+def record_deposit_change(instance, created=False, deleted=False):
+    """Apply the delta of one saved or deleted MonthlyDeposit row"""
+    instance._summary_created = created
+    _record_change(instance, ['member_id', 'month', 'amount'], _deposit_contribution, deleted)
+
+
+def refresh_monthly_summaries(months=None, member_ids=None):
+    """
+    Recompute summary rows from the source tables with grouped aggregates.
+
+    Used after set-based writes, which bypass the per-row signals, and by the
+    rebuild_monthly_summaries command. ``months`` and ``member_ids`` narrow the
+    slice that is recomputed; ``None`` means all of them. Returns the number
+    of summary rows written.
+    """
+    tracking = MemberMealTracking.objects.annotate(summary_month=TruncMonth('date'))
+    deposits = MonthlyDeposit.objects.annotate(summary_month=TruncMonth('month'))
+    summaries = MemberMonthlySummary.objects.all()
+    if months is not None:
+        months = {month_of(month) for month in months}
+        tracking = tracking.filter(summary_month__in=months)
+        deposits = deposits.filter(summary_month__in=months)
+        summaries = summaries.filter(month__in=months)
+    if member_ids is not None:
+        tracking = tracking.filter(member_id__in=member_ids)
+        deposits = deposits.filter(member_id__in=member_ids)
+        summaries = summaries.filter(member_id__in=member_ids)
+
+    totals = {}
+    for row in tracking.values('member_id', 'summary_month').annotate(
+        summary_lunch=Sum('lunch_count'),
+        summary_dinner=Sum('dinner_count'),
+        summary_days=Count('id'),
+        summary_cost=Sum('total_cost'),
+        summary_paid=Sum('total_cost', filter=Q(is_paid=True)),
+        summary_unpaid=Sum('total_cost', filter=Q(is_paid=False)),
+    ).order_by():
+        totals[(row['member_id'], row['summary_month'])] = {
+            'lunch_meals': row['summary_lunch'],
+            'dinner_meals': row['summary_dinner'],
+            'days_with_meals': row['summary_days'],
+            'total_cost': row['summary_cost'],
+            'paid_amount': row['summary_paid'],
+            'unpaid_amount': row['summary_unpaid'],
+        }
+    for row in deposits.values('member_id', 'summary_month').annotate(
+        summary_deposit=Sum('amount')
+    ).order_by():
+        key = (row['member_id'], row['summary_month'])
+        totals.setdefault(key, {})['deposit_amount'] = row['summary_deposit']
+
+    rows = [
+        MemberMonthlySummary(
+            member_id=member_id, month=month,
+            **{field: values.get(field) or 0 for field in SUMMARY_FIELDS}
+        )
+        for (member_id, month), values in totals.items()
+    ]
+    with transaction.atomic():
+        stale_ids = [
+            summary_id
+            for summary_id, member_id, month in summaries.values_list('id', 'member_id', 'month')
+            if (member_id, month) not in totals
+        ]
+        if stale_ids:
+            MemberMonthlySummary.objects.filter(id__in=stale_ids).delete()
+        MemberMonthlySummary.objects.bulk_create(
+            rows,
+            batch_size=500,
+            update_conflicts=True,
+            unique_fields=['member', 'month'],
+            update_fields=SUMMARY_FIELDS + ['updated_at'],
+        )
+    _summaries_changed()
+    return len(rows)
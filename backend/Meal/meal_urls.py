@@ -1,6 +1,7 @@
 # meal_urls.py
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
+from .meal_async import dashboard_stats_view
 from .meal_views import (
     MemberViewSet,
     MealViewSet,
@@ -8,9 +9,11 @@ from .meal_views import (
     ExpenseViewSet,
     BudgetViewSet,
     DashboardStatsView,
+    ResponseCacheStatsView,
     MonthlyDepositViewSet,
     DailyMealCostViewSet,
-    MemberMealTrackingViewSet
+    MemberMealTrackingViewSet,
+    MemberMonthlySummaryViewSet
 )
 
 router = DefaultRouter()
@@ -22,8 +25,11 @@ router.register(r'budgets', BudgetViewSet)
 router.register(r'deposits', MonthlyDepositViewSet)
 router.register(r'daily-costs', DailyMealCostViewSet)
 router.register(r'meal-tracking', MemberMealTrackingViewSet)
+router.register(r'monthly-summaries', MemberMonthlySummaryViewSet)
 
 urlpatterns = [
     path('', include(router.urls)),
     path('dashboard/stats/', DashboardStatsView.as_view(), name='dashboard_stats'),
+    path('dashboard/stats/live/', dashboard_stats_view, name='dashboard_stats_live'),
+    path('cache/stats/', ResponseCacheStatsView.as_view(), name='response_cache_stats'),
 ]
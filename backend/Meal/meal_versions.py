@@ -0,0 +1,107 @@
+# meal_versions.py:
+import hashlib
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from rest_framework.response import Response
+from .models import CollectionVersion
+from .meal_cache import cache_response, get_cached_response, response_cache_key
+
+
+def bump_versions(*models):
+    """Move the change counter of every model in ``models`` forward"""
+    now = timezone.now()
+    for model in models:
+        name = model._meta.label
+        rows = CollectionVersion.objects.filter(name=name)
+        if rows.update(version=F('version') + 1, updated_at=now):
+            continue
+        try:
+            with transaction.atomic():
+                CollectionVersion.objects.create(name=name, version=1, updated_at=now)
+        except IntegrityError:
+            # Created concurrently since our UPDATE
+            rows.update(version=F('version') + 1, updated_at=now)
+
+
+def get_versions(models):
+    """``{label: (version, updated_at)}`` of ``models`` in one query"""
+    names = [model._meta.label for model in models]
+    versions = {name: (0, None) for name in names}
+    versions.update(
+        (name, (version, updated_at))
+        for name, version, updated_at in CollectionVersion.objects.filter(
+            name__in=names
+        ).values_list('name', 'version', 'updated_at')
+    )
+    return versions
+
+
+class ConditionalGetMixin:
+    """
+    Answers ``If-None-Match`` and ``If-Modified-Since`` on list and retrieve
+    with 304 Not Modified after one lookup of the change counters of
+    ``conditional_models``, before the main query or the serializer run.
+
+    The ETag covers the counters of every listed model (the resource and the
+    relations its serializers embed), the full request path with its query
+    string, the negotiated format and today's date, since some responses
+    depend on it. Last-Modified is the latest change to any of the models.
+    Counters are read before the data, so a response is never labelled
+    newer than what it contains.
+
+    Viewsets that set ``response_cache = True`` also keep the data of full
+    responses in the response cache under the user and the ETag, so a
+    repeated read costs the counter lookup alone (see meal_cache).
+    """
+    conditional_models = []
+    response_cache = False
+
+    def conditional_validators(self, request):
+        versions = get_versions(self.conditional_models)
+        key = '|'.join([
+            request.get_full_path(),
+            getattr(request, 'accepted_renderer', None) and request.accepted_renderer.format or '',
+            timezone.localdate().isoformat(),
+        ] + [f'{name}:{version}' for name, (version, _) in sorted(versions.items())])
+        etag = '"%s"' % hashlib.md5(key.encode()).hexdigest()
+        changes = [updated_at for _, updated_at in versions.values() if updated_at is not None]
+        last_modified = int(max(changes).timestamp()) if changes else None
+        return etag, last_modified
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        etag, last_modified = self.conditional_validators(request)
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = self.cached_response(etag, handler, request, *args, **kwargs)
+        if 200 <= response.status_code < 300 or response.status_code == 304:
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+            # Cache privately but revalidate every time, which is what sends
+            # the conditional headers back
+            patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    def cached_response(self, etag, handler, request, *args, **kwargs):
+        if not self.response_cache:
+            return handler(request, *args, **kwargs)
+        key = response_cache_key(request.user.pk, etag)
+        data = get_cached_response(key)
+        if data is not None:
+            response = Response(data)
+            response['X-Cache'] = 'HIT'
+            return response
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache_response(key, response.data)
+            response['X-Cache'] = 'MISS'
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(super().retrieve, request, *args, **kwargs)
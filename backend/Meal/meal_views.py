@@ -3,24 +3,42 @@ from rest_framework import viewsets, permissions, status, filters, serializers
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from django.contrib.auth.models import User
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q, Count, Sum
 from django.utils import timezone
-from datetime import datetime, timedelta
-from .models import Member, Meal, ShoppingList, ShoppingItem, Expense, Budget, MonthlyDeposit, DailyMealCost, MemberMealTracking
+from datetime import datetime
+from .models import (Member, Meal, Ingredient, ShoppingList, ShoppingItem, Expense, Budget,
+                     MonthlyDeposit, DailyMealCost, MemberMealTracking, MemberMonthlySummary)
 from .meal_serializers import (
     MealSerializer, MealCreateSerializer,
     ShoppingListSerializer, ShoppingListCreateSerializer, ShoppingItemSerializer,
-    ExpenseSerializer, BudgetSerializer, DashboardStatsSerializer,
+    ExpenseSerializer, BudgetSerializer,
     MonthlyDepositSerializer, DailyMealCostSerializer, MemberMealTrackingSerializer,
-    MemberMealTrackingBulkSerializer, MemberDetailSerializer
+    MemberMealTrackingBulkSerializer, MemberDetailSerializer, DateRangeSerializer,
+    PaymentSettlementSerializer, MemberMonthlySummarySerializer, ShoppingItemPurchaseSerializer,
+    ShoppingPurchaseSerializer
 )
 from .auth_serializers import MemberSerializer
+from .meal_cache import get_dashboard_stats, response_cache_stats
+from .meal_dashboard import compute_dashboard_stats
+from .meal_db import WriteRetryMixin
+from .meal_exports import StreamingExportMixin
+from .meal_fieldsets import SparseFieldsetViewMixin
+from .meal_imports import CSVImportMixin
+from .meal_pagination import MealPagination
+from .meal_services import (adjust_balances, bulk_upsert_tracking, generate_shopping_items,
+                            mark_items_purchased, reprice_tracking, settle_payments)
+from .meal_signals import bulk_changed
+from .meal_versions import ConditionalGetMixin
 
 
-class MemberViewSet(viewsets.ModelViewSet):
-    queryset = Member.objects.all()
+class MemberViewSet(WriteRetryMixin, ConditionalGetMixin, SparseFieldsetViewMixin, viewsets.ModelViewSet):
+    queryset = Member.objects.select_related('user')
     serializer_class = MemberSerializer
+    # Member detail reads the current month's deposit, summary and recent tracking
+    conditional_models = [Member, User, MemberMonthlySummary, MonthlyDeposit, MemberMealTracking,
+                          DailyMealCost]
+    response_cache = True
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['role', 'status', 'member_type']
@@ -65,8 +83,10 @@ class MemberViewSet(viewsets.ModelViewSet):
         serializer.save(user=self.get_object().user)
 
 
-class MealViewSet(viewsets.ModelViewSet):
-    queryset = Meal.objects.all()
+class MealViewSet(WriteRetryMixin, ConditionalGetMixin, SparseFieldsetViewMixin, viewsets.ModelViewSet):
+    queryset = Meal.objects.select_related('created_by__user').prefetch_related('ingredients')
+    conditional_models = [Meal, Ingredient, Member, User]
+    response_cache = True
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['meal_type', 'status', 'date']
@@ -80,7 +100,7 @@ class MealViewSet(viewsets.ModelViewSet):
         return MealSerializer
     
     def get_queryset(self):
-        queryset = Meal.objects.all()
+        queryset = super().get_queryset()
         
         # Filter by date range
         start_date = self.request.query_params.get('start_date')
@@ -116,134 +136,190 @@ class MealViewSet(viewsets.ModelViewSet):
         return Response({'error': 'Meal cannot be completed'}, status=status.HTTP_400_BAD_REQUEST)
 
 
-class MonthlyDepositViewSet(viewsets.ModelViewSet):
-    queryset = MonthlyDeposit.objects.all()
+class MonthlyDepositViewSet(WriteRetryMixin, ConditionalGetMixin, CSVImportMixin, StreamingExportMixin,
+                            SparseFieldsetViewMixin, viewsets.ModelViewSet):
+    queryset = MonthlyDeposit.objects.select_related('member__user')
     serializer_class = MonthlyDepositSerializer
+    conditional_models = [MonthlyDeposit, Member, User]
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['member', 'month']
     search_fields = ['member__user__first_name', 'member__user__last_name']
     ordering_fields = ['month', 'deposit_date', 'amount']
-    ordering = ['-month']
+    ordering = ['-month', '-id']
+    pagination_class = MealPagination
+    keyset_ordering = ('-month', '-id')
+    export_filename = 'deposits'
+    import_kind = 'deposits'
+    export_columns = [
+        ('id', 'id'), ('member_id', 'member_id'), ('username', 'member__user__username'),
+        ('first_name', 'member__user__first_name'), ('last_name', 'member__user__last_name'),
+        ('month', 'month'), ('amount', 'amount'), ('deposit_date', 'deposit_date'), ('notes', 'notes'),
+    ]
+    
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        
+        # Filter by month range
+        start_date = self.request.query_params.get('start_date')
+        end_date = self.request.query_params.get('end_date')
+        
+        if start_date:
+            queryset = queryset.filter(month__gte=start_date)
+        if end_date:
+            queryset = queryset.filter(month__lte=end_date)
+        
+        return queryset
     
     def perform_create(self, serializer):
         deposit = serializer.save()
-        # Update member's current balance
-        member = deposit.member
-        member.current_balance += deposit.amount
-        member.save()
+        # Update member's current balance without re-saving the whole row
+        adjust_balances({deposit.member_id: deposit.amount})
+        bulk_changed(Member)
 
 
-class DailyMealCostViewSet(viewsets.ModelViewSet):
+class DailyMealCostViewSet(WriteRetryMixin, ConditionalGetMixin, SparseFieldsetViewMixin,
+                           viewsets.ModelViewSet):
     queryset = DailyMealCost.objects.all()
     serializer_class = DailyMealCostSerializer
+    conditional_models = [DailyMealCost]
+    response_cache = True
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ['date']
     ordering_fields = ['date']
     ordering = ['-date']
     
+    def perform_create(self, serializer):
+        daily_cost = serializer.save()
+        reprice_tracking(daily_cost.date)
+    
     def perform_update(self, serializer):
+        previous_date = serializer.instance.date
         daily_cost = serializer.save()
-        # Update all member meal tracking for this date
-        tracking_records = MemberMealTracking.objects.filter(date=daily_cost.date)
-        for tracking in tracking_records:
-            tracking.save()  # This will trigger the cost recalculation
+        # Update all member meal tracking for this date in one statement
+        reprice_tracking(daily_cost.date)
+        if previous_date != daily_cost.date:
+            reprice_tracking(previous_date)
+    
+    def perform_destroy(self, instance):
+        date = instance.date
+        instance.delete()
+        reprice_tracking(date)
+    
+    @action(detail=False, methods=['post'])
+    def reprice_range(self, request):
+        """Recompute meal tracking costs for every date in a range"""
+        serializer = DateRangeSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        start_date = serializer.validated_data['start_date']
+        end_date = serializer.validated_data['end_date']
+        
+        repriced_count = reprice_tracking(start_date, end_date)
+        return Response({
+            'message': f'Repriced {repriced_count} meal tracking records',
+            'repriced_count': repriced_count,
+            'start_date': start_date,
+            'end_date': end_date,
+        })
 
 
-class MemberMealTrackingViewSet(viewsets.ModelViewSet):
-    queryset = MemberMealTracking.objects.all()
+class MemberMealTrackingViewSet(WriteRetryMixin, ConditionalGetMixin, CSVImportMixin, StreamingExportMixin,
+                                SparseFieldsetViewMixin, viewsets.ModelViewSet):
+    queryset = MemberMealTracking.objects.select_related('member__user')
     serializer_class = MemberMealTrackingSerializer
+    conditional_models = [MemberMealTracking, Member, User, DailyMealCost]
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['member', 'date', 'is_paid']
     search_fields = ['member__user__first_name', 'member__user__last_name']
     ordering_fields = ['date', 'total_cost']
-    ordering = ['-date']
+    ordering = ['-date', '-id']
+    pagination_class = MealPagination
+    keyset_ordering = ('-date', '-id')
+    export_filename = 'meal-tracking'
+    import_kind = 'tracking'
+    export_columns = [
+        ('id', 'id'), ('member_id', 'member_id'), ('username', 'member__user__username'),
+        ('first_name', 'member__user__first_name'), ('last_name', 'member__user__last_name'),
+        ('date', 'date'), ('lunch_count', 'lunch_count'), ('dinner_count', 'dinner_count'),
+        ('lunch_cost', 'lunch_cost'), ('dinner_cost', 'dinner_cost'), ('total_cost', 'total_cost'),
+        ('is_paid', 'is_paid'), ('notes', 'notes'),
+    ]
+    
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        
+        # Filter by date range
+        start_date = self.request.query_params.get('start_date')
+        end_date = self.request.query_params.get('end_date')
+        
+        if start_date:
+            queryset = queryset.filter(date__gte=start_date)
+        if end_date:
+            queryset = queryset.filter(date__lte=end_date)
+        
+        return queryset
     
     @action(detail=False, methods=['post'])
     def bulk_update(self, request):
         """Bulk update meal tracking for multiple members on a specific date"""
         serializer = MemberMealTrackingBulkSerializer(data=request.data)
         if serializer.is_valid():
-            date = serializer.validated_data['date']
-            member_tracking = serializer.validated_data['member_tracking']
-            
-            updated_records = []
-            for item in member_tracking:
-                member_id = item['member_id']
-                lunch_count = item['lunch_count']
-                dinner_count = item['dinner_count']
-                
-                try:
-                    member = Member.objects.get(id=member_id)
-                    tracking, created = MemberMealTracking.objects.get_or_create(
-                        member=member,
-                        date=date,
-                        defaults={
-                            'lunch_count': lunch_count,
-                            'dinner_count': dinner_count
-                        }
-                    )
-                    
-                    if not created:
-                        tracking.lunch_count = lunch_count
-                        tracking.dinner_count = dinner_count
-                        tracking.save()
-                    
-                    updated_records.append(tracking)
-                    
-                except Member.DoesNotExist:
-                    continue
-            
-            # Update daily meal cost participant counts
-            try:
-                daily_cost = DailyMealCost.objects.get(date=date)
-                daily_cost.lunch_participants = MemberMealTracking.objects.filter(
-                    date=date, lunch_count__gt=0
-                ).count()
-                daily_cost.dinner_participants = MemberMealTracking.objects.filter(
-                    date=date, dinner_count__gt=0
-                ).count()
-                daily_cost.save()
-            except DailyMealCost.DoesNotExist:
-                pass
+            result = bulk_upsert_tracking(
+                serializer.validated_data['date'],
+                serializer.validated_data['member_tracking']
+            )
             
             return Response({
-                'message': f'Updated {len(updated_records)} meal tracking records',
-                'updated_count': len(updated_records)
+                'message': (f"Saved {result['created'] + result['updated']} meal tracking records "
+                            f"({result['created']} created, {result['updated']} updated, "
+                            f"{result['skipped']} skipped)"),
+                'created_count': result['created'],
+                'updated_count': result['updated'],
+                'skipped_count': result['skipped'],
+                'skipped_member_ids': result['skipped_member_ids'],
             })
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
     @action(detail=False, methods=['post'])
     def process_payments(self, request):
-        """Process payments and update member balances"""
-        date = request.data.get('date')
-        if not date:
-            return Response({'error': 'Date is required'}, status=status.HTTP_400_BAD_REQUEST)
-        
-        tracking_records = MemberMealTracking.objects.filter(date=date, is_paid=False)
-        processed_count = 0
-        
-        for tracking in tracking_records:
-            member = tracking.member
-            if member.current_balance >= tracking.total_cost:
-                member.current_balance -= tracking.total_cost
-                member.save()
-                tracking.is_paid = True
-                tracking.save()
-                processed_count += 1
+        """Settle unpaid meals for a date or date range from member balances"""
+        serializer = PaymentSettlementSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         
+        result = settle_payments(
+            serializer.validated_data['start_date'],
+            serializer.validated_data['end_date'],
+            dry_run=serializer.validated_data['dry_run']
+        )
+        verb = 'Would process' if result['dry_run'] else 'Processed'
         return Response({
-            'message': f'Processed payments for {processed_count} members',
-            'processed_count': processed_count,
-            'total_records': tracking_records.count()
+            'message': f"{verb} payments for {result['settled_members']} members",
+            **result
         })
 
 
-class ShoppingListViewSet(viewsets.ModelViewSet):
-    queryset = ShoppingList.objects.all()
+class MemberMonthlySummaryViewSet(ConditionalGetMixin, SparseFieldsetViewMixin,
+                                  viewsets.ReadOnlyModelViewSet):
+    queryset = MemberMonthlySummary.objects.select_related('member__user')
+    serializer_class = MemberMonthlySummarySerializer
+    conditional_models = [MemberMonthlySummary, Member, User]
+    response_cache = True
+    permission_classes = [permissions.IsAuthenticated]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filterset_fields = ['member', 'month']
+    ordering_fields = ['month', 'total_cost', 'unpaid_amount']
+    ordering = ['-month']
+
+
+class ShoppingListViewSet(WriteRetryMixin, ConditionalGetMixin, SparseFieldsetViewMixin, viewsets.ModelViewSet):
+    queryset = ShoppingList.objects.select_related('created_by__user').prefetch_related('items').annotate(
+        **ShoppingList.item_totals_annotations()
+    )
+    conditional_models = [ShoppingList, ShoppingItem, Member, User]
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['status', 'date_needed']
@@ -258,91 +334,84 @@ class ShoppingListViewSet(viewsets.ModelViewSet):
     
     @action(detail=True, methods=['post'])
     def mark_item_purchased(self, request, pk=None):
-        shopping_list = self.get_object()
-        item_id = request.data.get('item_id')
-        actual_cost = request.data.get('actual_cost')
+        serializer = ShoppingItemPurchaseSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         
-        try:
-            item = shopping_list.items.get(id=item_id)
-            item.is_purchased = True
-            if actual_cost:
-                item.actual_cost = actual_cost
-            item.save()
-            
-            # Update shopping list total actual cost
-            total_actual = shopping_list.items.filter(
-                is_purchased=True, 
-                actual_cost__isnull=False
-            ).aggregate(Sum('actual_cost'))['actual_cost__sum'] or 0
-            
-            shopping_list.total_actual_cost = total_actual
-            shopping_list.save()
-            
-            return Response({'message': 'Item marked as purchased'})
-        except ShoppingItem.DoesNotExist:
+        shopping_list = self.get_object()
+        result = mark_items_purchased(shopping_list, [serializer.validated_data])
+        if not result['purchased']:
             return Response({'error': 'Item not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response({'message': 'Item marked as purchased'})
+    
+    @action(detail=True, methods=['post'])
+    def purchase_items(self, request, pk=None):
+        """Mark many items purchased, with their actual costs, in one request"""
+        serializer = ShoppingPurchaseSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        shopping_list = self.get_object()
+        result = mark_items_purchased(shopping_list, serializer.validated_data['items'])
+        return Response({
+            'message': f"Marked {result['purchased']} items as purchased",
+            'purchased_count': result['purchased'],
+            'skipped_item_ids': result['skipped_item_ids'],
+            'total_actual_cost': shopping_list.total_actual_cost,
+            'status': shopping_list.status,
+        })
     
     @action(detail=True, methods=['post'])
     def generate_from_meals(self, request, pk=None):
         """Generate shopping list from approved meals"""
-        start_date = request.data.get('start_date')
-        end_date = request.data.get('end_date')
-        
-        if not start_date or not end_date:
-            return Response({'error': 'Start and end dates are required'}, 
-                          status=status.HTTP_400_BAD_REQUEST)
-        
-        # Get approved meals in date range
-        meals = Meal.objects.filter(
-            status='approved',
-            date__range=[start_date, end_date]
-        ).prefetch_related('ingredients')
+        serializer = DateRangeSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         
         shopping_list = self.get_object()
+        items_count, meals_count = generate_shopping_items(
+            shopping_list,
+            serializer.validated_data['start_date'],
+            serializer.validated_data['end_date']
+        )
         
-        # Aggregate ingredients
-        ingredient_totals = {}
-        for meal in meals:
-            for ingredient in meal.ingredients.all():
-                key = f"{ingredient.name}_{ingredient.unit}"
-                if key in ingredient_totals:
-                    ingredient_totals[key]['quantity'] += ingredient.quantity
-                    ingredient_totals[key]['cost'] += ingredient.estimated_cost
-                else:
-                    ingredient_totals[key] = {
-                        'name': ingredient.name,
-                        'quantity': ingredient.quantity,
-                        'unit': ingredient.unit,
-                        'cost': ingredient.estimated_cost
-                    }
-        
-        # Create shopping items
-        total_cost = 0
-        for item_data in ingredient_totals.values():
-            ShoppingItem.objects.create(
-                shopping_list=shopping_list,
-                name=item_data['name'],
-                quantity=item_data['quantity'],
-                unit=item_data['unit'],
-                estimated_cost=item_data['cost']
-            )
-            total_cost += item_data['cost']
-        
-        shopping_list.total_estimated_cost = total_cost
-        shopping_list.save()
-        
-        return Response({'message': f'Generated {len(ingredient_totals)} items from {meals.count()} meals'})
+        return Response({'message': f'Generated {items_count} items from {meals_count} meals'})
 
 
-class ExpenseViewSet(viewsets.ModelViewSet):
-    queryset = Expense.objects.all()
+class ExpenseViewSet(WriteRetryMixin, ConditionalGetMixin, StreamingExportMixin, SparseFieldsetViewMixin,
+                     viewsets.ModelViewSet):
+    queryset = Expense.objects.select_related('submitted_by__user', 'approved_by__user')
     serializer_class = ExpenseSerializer
+    conditional_models = [Expense, Member, User]
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['category', 'status', 'date']
     search_fields = ['title', 'description']
     ordering_fields = ['date', 'amount', 'created_at']
-    ordering = ['-date']
+    ordering = ['-date', '-id']
+    pagination_class = MealPagination
+    keyset_ordering = ('-date', '-id')
+    export_filename = 'expenses'
+    export_columns = [
+        ('id', 'id'), ('title', 'title'), ('description', 'description'), ('amount', 'amount'),
+        ('category', 'category'), ('date', 'date'), ('status', 'status'), ('receipt', 'receipt'),
+        ('submitted_by', 'submitted_by__user__username'),
+        ('approved_by', 'approved_by__user__username'), ('created_at', 'created_at'),
+    ]
+    
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        
+        # Filter by date range
+        start_date = self.request.query_params.get('start_date')
+        end_date = self.request.query_params.get('end_date')
+        
+        if start_date:
+            queryset = queryset.filter(date__gte=start_date)
+        if end_date:
+            queryset = queryset.filter(date__lte=end_date)
+        
+        return queryset
     
     @action(detail=True, methods=['post'])
     def approve(self, request, pk=None):
@@ -365,9 +434,11 @@ class ExpenseViewSet(viewsets.ModelViewSet):
         return Response({'error': 'Expense cannot be rejected'}, status=status.HTTP_400_BAD_REQUEST)
 
 
-class BudgetViewSet(viewsets.ModelViewSet):
-    queryset = Budget.objects.all()
+class BudgetViewSet(WriteRetryMixin, ConditionalGetMixin, SparseFieldsetViewMixin, viewsets.ModelViewSet):
+    queryset = Budget.objects.select_related('created_by__user')
     serializer_class = BudgetSerializer
+    conditional_models = [Budget, Member, User]
+    response_cache = True
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['name']
@@ -375,7 +446,7 @@ class BudgetViewSet(viewsets.ModelViewSet):
     ordering = ['-start_date']
     
     def get_queryset(self):
-        queryset = Budget.objects.all()
+        queryset = super().get_queryset()
         
         # Filter by active budgets
         active_only = self.request.query_params.get('active_only')
@@ -391,75 +462,15 @@ class DashboardStatsView(APIView):
     
     def get(self, request):
         today = timezone.now().date()
-        week_start = today - timedelta(days=today.weekday())
-        month_start = today.replace(day=1)
-        
-        # Member stats
-        total_members = Member.objects.count()
-        active_members = Member.objects.filter(status='active').count()
-        employee_members = Member.objects.filter(member_type='employee').count()
-        guest_members = Member.objects.filter(member_type='guest').count()
-        
-        # Meal stats
-        total_meals_this_week = Meal.objects.filter(
-            date__gte=week_start,
-            date__lte=today
-        ).count()
-        
-        total_meals_this_month = Meal.objects.filter(
-            date__gte=month_start,
-            date__lte=today
-        ).count()
-        
-        # Expense stats
-        pending_expenses = Expense.objects.filter(status='pending').count()
-        
-        # Budget stats
-        current_budgets = Budget.objects.filter(
-            start_date__lte=today,
-            end_date__gte=today
-        )
-        
-        total_budget = current_budgets.aggregate(Sum('total_amount'))['total_amount__sum'] or 0
-        spent_budget = current_budgets.aggregate(Sum('spent_amount'))['spent_amount__sum'] or 0
-        
-        budget_utilization = 0
-        if total_budget > 0:
-            budget_utilization = (spent_budget / total_budget) * 100
-        
-        # Deposit and meal cost stats
-        total_deposits_this_month = MonthlyDeposit.objects.filter(
-            month__year=today.year,
-            month__month=today.month
-        ).aggregate(Sum('amount'))['amount__sum'] or 0
-        
-        total_meal_costs_this_month = MemberMealTracking.objects.filter(
-            date__gte=month_start,
-            date__lte=today
-        ).aggregate(Sum('total_cost'))['total_cost__sum'] or 0
-        
-        # Recent data
-        recent_meals = Meal.objects.order_by('-created_at')[:5]
-        recent_expenses = Expense.objects.order_by('-created_at')[:5]
-        recent_meal_tracking = MemberMealTracking.objects.order_by('-date')[:5]
-        
-        stats_data = {
-            'total_members': total_members,
-            'active_members': active_members,
-            'employee_members': employee_members,
-            'guest_members': guest_members,
-            'total_meals_this_week': total_meals_this_week,
-            'total_meals_this_month': total_meals_this_month,
-            'pending_expenses': pending_expenses,
-            'total_budget': total_budget,
-            'spent_budget': spent_budget,
-            'total_deposits_this_month': total_deposits_this_month,
-            'total_meal_costs_this_month': total_meal_costs_this_month,
-            'budget_utilization': budget_utilization,
-            'recent_meals': recent_meals,
-            'recent_expenses': recent_expenses,
-            'recent_meal_tracking': recent_meal_tracking,
-        }
-        
-        serializer = DashboardStatsSerializer(stats_data)
-        return Response(serializer.data)
+        return Response(get_dashboard_stats(today, lambda: self.compute_stats(today)))
+    
+    def compute_stats(self, today):
+        return compute_dashboard_stats(today)
+
+
+class ResponseCacheStatsView(APIView):
+    """Hit and miss counters of the API response cache"""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        return Response(response_cache_stats())
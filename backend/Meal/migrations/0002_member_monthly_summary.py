@@ -0,0 +1,34 @@
+# Generated by Django 4.2.7 on 2026-10-17 01:58
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Meal', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MemberMonthlySummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('lunch_meals', models.IntegerField(default=0)),
+                ('dinner_meals', models.IntegerField(default=0)),
+                ('days_with_meals', models.IntegerField(default=0)),
+                ('total_cost', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('paid_amount', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('unpaid_amount', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('deposit_amount', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('member', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_summaries', to='Meal.member')),
+            ],
+            options={
+                'ordering': ['-month'],
+                'unique_together': {('member', 'month')},
+            },
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 4.2.7 on 2026-10-17 02:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Meal', '0002_member_monthly_summary'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='budget',
+            index=models.Index(fields=['start_date', 'end_date'], name='budget_active_range_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['status', 'date'], name='expense_status_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['date'], name='expense_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['created_at'], name='expense_created_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='meal',
+            index=models.Index(fields=['status', 'date'], name='meal_status_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='meal',
+            index=models.Index(fields=['date', 'time'], name='meal_date_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='meal',
+            index=models.Index(fields=['created_at'], name='meal_created_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='membermealtracking',
+            index=models.Index(fields=['date'], name='tracking_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='membermealtracking',
+            index=models.Index(fields=['date', 'lunch_count', 'dinner_count'], name='tracking_date_counts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='membermealtracking',
+            index=models.Index(condition=models.Q(('is_paid', False)), fields=['date', 'member'], name='tracking_unpaid_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='monthlydeposit',
+            index=models.Index(fields=['month'], name='deposit_month_idx'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.7 on 2026-10-17 02:12
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+VERSIONED_MODELS = [
+    'auth.User', 'Meal.Member', 'Meal.Meal', 'Meal.Ingredient', 'Meal.ShoppingList',
+    'Meal.ShoppingItem', 'Meal.Expense', 'Meal.Budget', 'Meal.MonthlyDeposit',
+    'Meal.DailyMealCost', 'Meal.MemberMealTracking', 'Meal.MemberMonthlySummary',
+]
+
+
+def create_versions(apps, schema_editor):
+    # Start every counter so bumps are always a single UPDATE
+    CollectionVersion = apps.get_model('Meal', 'CollectionVersion')
+    now = timezone.now()
+    CollectionVersion.objects.bulk_create(
+        [CollectionVersion(name=name, version=1, updated_at=now) for name in VERSIONED_MODELS],
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Meal', '0004_shopping_item_from_meals'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CollectionVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('version', models.PositiveBigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.RunPython(create_versions, migrations.RunPython.noop),
+    ]
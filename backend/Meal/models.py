@@ -5,6 +5,17 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator
 from decimal import Decimal
+from .meal_pricing import per_person, rate_resolver
+
+
+class LoadedValuesMixin:
+    """Remember the field values a row was loaded with, for delta bookkeeping"""
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
 
 
 class Member(models.Model):
@@ -41,7 +52,7 @@ class Member(models.Model):
         return f"{self.user.get_full_name() or self.user.username} ({self.role})"
 
 
-class MonthlyDeposit(models.Model):
+class MonthlyDeposit(LoadedValuesMixin, models.Model):
     member = models.ForeignKey(Member, on_delete=models.CASCADE, related_name='deposits')
     amount = models.DecimalField(max_digits=10, decimal_places=2, validators=[MinValueValidator(Decimal('0.01'))])
     month = models.DateField()  # First day of the month
@@ -51,6 +62,9 @@ class MonthlyDeposit(models.Model):
     class Meta:
         unique_together = ['member', 'month']
         ordering = ['-month']
+        indexes = [
+            models.Index(fields=['month'], name='deposit_month_idx'),
+        ]
     
     def __str__(self):
         return f"{self.member.user.username} - {self.month.strftime('%B %Y')} - ${self.amount}"
@@ -69,17 +83,17 @@ class DailyMealCost(models.Model):
     
     @property
     def lunch_cost_per_person(self):
-        return self.lunch_cost / self.lunch_participants if self.lunch_participants > 0 else 0
+        return per_person(self.lunch_cost, self.lunch_participants)
     
     @property
     def dinner_cost_per_person(self):
-        return self.dinner_cost / self.dinner_participants if self.dinner_participants > 0 else 0
+        return per_person(self.dinner_cost, self.dinner_participants)
     
     def __str__(self):
         return f"{self.date} - Lunch: ${self.lunch_cost}, Dinner: ${self.dinner_cost}"
 
 
-class MemberMealTracking(models.Model):
+class MemberMealTracking(LoadedValuesMixin, models.Model):
     MEAL_COUNT_CHOICES = [
         (0, 'No Meal'),
         (1, 'One Meal'),
@@ -99,24 +113,84 @@ class MemberMealTracking(models.Model):
     class Meta:
         unique_together = ['member', 'date']
         ordering = ['-date']
+        indexes = [
+            # Keyset pagination walks (date, rowid) in order
+            models.Index(fields=['date'], name='tracking_date_idx'),
+            # Participant recount in bulk_update reads only the index
+            models.Index(fields=['date', 'lunch_count', 'dinner_count'], name='tracking_date_counts_idx'),
+            # Settlement only ever looks for unpaid rows
+            models.Index(fields=['date', 'member'], condition=models.Q(is_paid=False),
+                         name='tracking_unpaid_date_idx'),
+        ]
     
     def save(self, *args, **kwargs):
-        try:
-            daily_cost = DailyMealCost.objects.get(date=self.date)
-            self.lunch_cost = self.lunch_count * daily_cost.lunch_cost_per_person
-            self.dinner_cost = self.dinner_count * daily_cost.dinner_cost_per_person
-            self.total_cost = self.lunch_cost + self.dinner_cost
-        except DailyMealCost.DoesNotExist:
-            self.lunch_cost = 0
-            self.dinner_cost = 0
-            self.total_cost = 0
-        
+        # Cached per date and checked against the shared DailyMealCost counter
+        # every MEAL_RATE_VERSION_INTERVAL seconds, so high-volume writes
+        # usually run no query for the rate
+        self.lunch_cost, self.dinner_cost, self.total_cost = rate_resolver.get(self.date).price(
+            self.lunch_count, self.dinner_count
+        )
         super().save(*args, **kwargs)
     
     def __str__(self):
         return f"{self.member.user.username} - {self.date} - ${self.total_cost}"
 
 
+class MemberMonthlySummary(models.Model):
+    """Per member, per month rollup of tracking and deposits (see meal_summaries)"""
+    member = models.ForeignKey(Member, on_delete=models.CASCADE, related_name='monthly_summaries')
+    month = models.DateField()  # First day of the month
+    lunch_meals = models.IntegerField(default=0)
+    dinner_meals = models.IntegerField(default=0)
+    days_with_meals = models.IntegerField(default=0)
+    total_cost = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    paid_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    unpaid_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    deposit_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ['member', 'month']
+        ordering = ['-month']
+    
+    @property
+    def total_meals(self):
+        return self.lunch_meals + self.dinner_meals
+    
+    def __str__(self):
+        return f"{self.member.user.username} - {self.month.strftime('%B %Y')} - ${self.total_cost}"
+
+
+class MonthlyStatement(models.Model):
+    """A member's closed month: balance movement and meal charges (see meal_statements)"""
+    member = models.ForeignKey(Member, on_delete=models.CASCADE, related_name='statements')
+    month = models.DateField()  # First day of the month
+    opening_balance = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    deposits = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    lunch_meals = models.IntegerField(default=0)
+    dinner_meals = models.IntegerField(default=0)
+    lunch_charges = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    dinner_charges = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    paid_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    unpaid_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    closing_balance = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        unique_together = ['member', 'month']
+        ordering = ['-month']
+        indexes = [
+            models.Index(fields=['month'], name='statement_month_idx'),
+        ]
+    
+    @property
+    def meal_charges(self):
+        return self.lunch_charges + self.dinner_charges
+    
+    def __str__(self):
+        return f"{self.member.user.username} - {self.month.strftime('%B %Y')} statement"
+
+
 class Meal(models.Model):
     MEAL_TYPE_CHOICES = [
         ('breakfast', 'Breakfast'),
@@ -146,6 +220,11 @@ class Meal(models.Model):
     
     class Meta:
         ordering = ['-date', '-time']
+        indexes = [
+            models.Index(fields=['status', 'date'], name='meal_status_date_idx'),
+            models.Index(fields=['date', 'time'], name='meal_date_time_idx'),
+            models.Index(fields=['created_at'], name='meal_created_at_idx'),
+        ]
     
     def __str__(self):
         return f"{self.name} - {self.date} ({self.meal_type})"
@@ -191,6 +270,20 @@ class ShoppingList(models.Model):
     class Meta:
         ordering = ['-date_created']
     
+    @staticmethod
+    def item_totals_annotations():
+        """Item counters and cost totals, computed in the query loading lists"""
+        purchased = models.Q(items__is_purchased=True)
+        return {
+            'items_count': models.Count('items'),
+            'purchased_items_count': models.Count('items', filter=purchased),
+            'items_estimated_cost': models.Sum('items__estimated_cost'),
+            'items_actual_cost': models.Sum('items__actual_cost', filter=purchased),
+        }
+    
+    def item_totals(self):
+        return ShoppingList.objects.filter(pk=self.pk).aggregate(**self.item_totals_annotations())
+    
     def __str__(self):
         return f"{self.name} - {self.date_needed}"
 
@@ -204,6 +297,8 @@ class ShoppingItem(models.Model):
     actual_cost = models.DecimalField(max_digits=8, decimal_places=2, null=True, blank=True)
     is_purchased = models.BooleanField(default=False)
     notes = models.TextField(blank=True)
+    # Created by generate_from_meals, which replaces these on every run
+    from_meals = models.BooleanField(default=False, editable=False)
     
     def __str__(self):
         return f"{self.name} - {self.quantity} {self.unit}"
@@ -237,6 +332,11 @@ class Expense(models.Model):
     
     class Meta:
         ordering = ['-date']
+        indexes = [
+            models.Index(fields=['status', 'date'], name='expense_status_date_idx'),
+            models.Index(fields=['date'], name='expense_date_idx'),
+            models.Index(fields=['created_at'], name='expense_created_at_idx'),
+        ]
     
     def __str__(self):
         return f"{self.title} - ${self.amount}"
@@ -263,6 +363,19 @@ class Budget(models.Model):
     
     class Meta:
         ordering = ['-start_date']
+        indexes = [
+            models.Index(fields=['start_date', 'end_date'], name='budget_active_range_idx'),
+        ]
     
     def __str__(self):
         return f"{self.name} - ${self.total_amount}"
+
+
+class CollectionVersion(models.Model):
+    """Change counter of one table, bumped on every write to it (see meal_versions)"""
+    name = models.CharField(max_length=100, unique=True)  # Model label, e.g. "Meal.meal"
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField()
+    
+    def __str__(self):
+        return f"{self.name} v{self.version}"
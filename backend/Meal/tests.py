@@ -1,3 +1,1735 @@
-from django.test import TestCase
+import asyncio
+import base64
+import io
+import json
+import os
+import random
+import tempfile
+import time as time_module
+import uuid
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock, skipUnless
+from asgiref.sync import async_to_sync, sync_to_async
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connection
+from django.db.models import Sum
+from django.test import AsyncClient
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase, APITransactionTestCase
+from rest_framework.utils.serializer_helpers import ReturnDict, ReturnList
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+from .models import (Member, Meal, Ingredient, ShoppingList, ShoppingItem, Expense, Budget,
+                     MonthlyDeposit, DailyMealCost, MemberMealTracking, MemberMonthlySummary,
+                     CollectionVersion, MonthlyStatement)
+from .auth_tokens import IndexedRefreshToken, blacklist_index
+from .meal_benchmarks import EndpointBenchmark, MixedLoad, benchmark_cases
+from .meal_cache import response_cache
+from .meal_db import sqlite_pragmas
+from . import meal_json
+from .meal_json import FastJSONParser, FastJSONRenderer
+from .meal_metrics import metrics_registry
+from .meal_pagination import MealPagination
+from .meal_pricing import rate_resolver
+from .meal_seed import seed_office
+from .meal_signals import bulk_changed
+from .meal_services import reprice_tracking, settle_payments
+from .meal_statements import close_month, compute_statements
+from .meal_summaries import _apply
+from .meal_versions import bump_versions
+from .meal_views import ExpenseViewSet
 
-# Create your tests here.
+
+class MealAPITestCase(APITestCase):
+    """Shared fixtures: an authenticated admin member and row factories"""
+
+    def setUp(self):
+        cache.clear()
+        response_cache().clear()
+        rate_resolver.clear()
+        blacklist_index.reset()
+        self.user, self.member = self.make_member('admin', role='admin')
+        self.client.force_authenticate(self.user)
+        self.today = date.today()
+        self._counter = 0
+
+    def make_member(self, username, **kwargs):
+        user = User.objects.create(
+            username=username, email=f'{username}@example.com',
+            first_name=username.title(), last_name='Tester'
+        )
+        return user, Member.objects.create(user=user, **kwargs)
+
+    def next_id(self):
+        self._counter += 1
+        return self._counter
+
+    def make_meal(self):
+        meal = Meal.objects.create(
+            name=f'Meal {self.next_id()}', meal_type='lunch', date=self.today,
+            time=time(12, 0), estimated_cost=Decimal('25.00'), status='approved',
+            created_by=self.member
+        )
+        for name in ('Rice', 'Lentils'):
+            Ingredient.objects.create(
+                meal=meal, name=name, quantity=Decimal('1.50'), unit='kg',
+                estimated_cost=Decimal('3.00')
+            )
+        return meal
+
+    def make_tracking(self):
+        _, member = self.make_member(f'tracked{self.next_id()}')
+        day = self.today - timedelta(days=self._counter)
+        DailyMealCost.objects.create(date=day, lunch_cost=Decimal('90.00'), lunch_participants=3)
+        return MemberMealTracking.objects.create(member=member, date=day, lunch_count=1, dinner_count=1)
+
+    def make_deposit(self):
+        _, member = self.make_member(f'depositor{self.next_id()}')
+        return MonthlyDeposit.objects.create(
+            member=member, amount=Decimal('500.00'), month=self.today.replace(day=1)
+        )
+
+    def make_daily_cost(self):
+        return DailyMealCost.objects.create(
+            date=self.today - timedelta(days=self.next_id()), lunch_cost=Decimal('80.00')
+        )
+
+    def make_shopping_list(self):
+        shopping_list = ShoppingList.objects.create(
+            name=f'List {self.next_id()}', date_needed=self.today, created_by=self.member
+        )
+        for name, purchased in (('Oil', True), ('Salt', False)):
+            ShoppingItem.objects.create(
+                shopping_list=shopping_list, name=name, quantity=Decimal('1.00'), unit='l',
+                estimated_cost=Decimal('4.00'), is_purchased=purchased
+            )
+        return shopping_list
+
+    def make_expense(self):
+        _, approver = self.make_member(f'approver{self.next_id()}')
+        return Expense.objects.create(
+            title='Groceries', amount=Decimal('40.00'), category='groceries', date=self.today,
+            status='approved', submitted_by=self.member, approved_by=approver
+        )
+
+    def make_budget(self):
+        return Budget.objects.create(
+            name=f'Budget {self.next_id()}', total_amount=Decimal('1000.00'),
+            start_date=self.today - timedelta(days=10), end_date=self.today + timedelta(days=10),
+            created_by=self.member
+        )
+
+
+class QueryBudgetTests(MealAPITestCase):
+    """
+    Every endpoint must run a fixed number of queries, however many rows it
+    serializes. Each case renders the endpoint with a few rows and with a
+    full page and expects the same budget both times. Viewset budgets include
+    the change-counter lookup for conditional GETs.
+    """
+
+    def assertQueryBudget(self, url, factory, budget, *, list_key='results'):
+        for rows in (2, 20):
+            while self._rows_created < rows:
+                factory()
+                self._rows_created += 1
+            cache.clear()
+            rate_resolver.clear()
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, response.content)
+            if list_key:
+                self.assertGreaterEqual(len(response.data[list_key]), min(rows, 20) - 1)
+            self.assertEqual(
+                len(queries), budget,
+                f'{url} with {rows} rows ran {len(queries)} queries:\n'
+                + '\n'.join(query['sql'] for query in queries.captured_queries)
+            )
+
+    def setUp(self):
+        super().setUp()
+        self._rows_created = 0
+
+    def test_members_list(self):
+        self.assertQueryBudget(
+            '/api/meal/members/', lambda: self.make_member(f'm{self.next_id()}'), 3
+        )
+
+    def test_member_detail(self):
+        def add_tracking():
+            day = self.today - timedelta(days=self.next_id())
+            DailyMealCost.objects.create(date=day, lunch_cost=Decimal('30.00'), lunch_participants=1)
+            MemberMealTracking.objects.create(member=self.member, date=day, lunch_count=1)
+
+        # versions, member, current month summary, recent tracking, the daily-rate
+        # counter and their daily rates
+        self.assertQueryBudget(f'/api/meal/members/{self.member.id}/', add_tracking, 6, list_key=None)
+
+    def test_meals_list(self):
+        self.assertQueryBudget('/api/meal/meals/', self.make_meal, 4)
+
+    def test_deposits_list(self):
+        self.assertQueryBudget('/api/meal/deposits/', self.make_deposit, 3)
+
+    def test_daily_costs_list(self):
+        self.assertQueryBudget('/api/meal/daily-costs/', self.make_daily_cost, 3)
+
+    def test_meal_tracking_list(self):
+        self.assertQueryBudget('/api/meal/meal-tracking/', self.make_tracking, 5)
+
+    def test_monthly_summaries_list(self):
+        self.assertQueryBudget('/api/meal/monthly-summaries/', self.make_deposit, 3)
+
+    def test_shopping_lists_list(self):
+        self.assertQueryBudget('/api/meal/shopping-lists/', self.make_shopping_list, 4)
+
+    def test_expenses_list(self):
+        self.assertQueryBudget('/api/meal/expenses/', self.make_expense, 3)
+
+    def test_budgets_list(self):
+        self.assertQueryBudget('/api/meal/budgets/', self.make_budget, 3)
+
+    def test_dashboard_stats(self):
+        def add_activity():
+            self.make_meal()
+            self.make_expense()
+            self.make_tracking()
+
+        self.assertQueryBudget('/api/meal/dashboard/stats/', add_activity, 9, list_key=None)
+
+    def test_dashboard_stats_cached(self):
+        self.make_expense()
+        self.client.get('/api/meal/dashboard/stats/')
+        with self.assertNumQueries(0):
+            self.client.get('/api/meal/dashboard/stats/')
+
+    def test_bulk_update_is_constant(self):
+        DailyMealCost.objects.create(date=self.today, lunch_cost=Decimal('100.00'))
+        counts = []
+        for size in (3, 30):
+            members = [self.make_member(f'bulk{self.next_id()}')[1] for _ in range(size)]
+            payload = {
+                'date': str(self.today),
+                'member_tracking': [
+                    {'member_id': member.id, 'lunch_count': 1, 'dinner_count': 0}
+                    for member in members
+                ],
+            }
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post(
+                    '/api/meal/meal-tracking/bulk_update/', payload, format='json'
+                )
+            self.assertEqual(response.data['created_count'], size)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+
+class MemberDetailTests(MealAPITestCase):
+    def test_current_month_deposit_is_serialized_deposit(self):
+        deposit = MonthlyDeposit.objects.create(
+            member=self.member, amount=Decimal('500.00'), month=self.today.replace(day=1), notes='Cash'
+        )
+        data = self.client.get(f'/api/meal/members/{self.member.id}/').data['current_month_deposit']
+        self.assertEqual(data['id'], deposit.id)
+        self.assertEqual(data['amount'], '500.00')
+        self.assertEqual(data['month'], self.today.replace(day=1).isoformat())
+        self.assertEqual(data['notes'], 'Cash')
+        self.assertEqual(data['member']['id'], self.member.id)
+        self.assertEqual(data['member_name'], 'Admin Tester')
+
+    def test_current_month_deposit_is_none_without_deposit(self):
+        MonthlyDeposit.objects.create(
+            member=self.member, amount=Decimal('500.00'),
+            month=(self.today.replace(day=1) - timedelta(days=1)).replace(day=1)
+        )
+        response = self.client.get(f'/api/meal/members/{self.member.id}/')
+        self.assertIsNone(response.data['current_month_deposit'])
+
+
+class MonthlySummaryTests(MealAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.day = date(2026, 3, 10)
+        self.month = date(2026, 3, 1)
+        DailyMealCost.objects.create(date=self.day, lunch_cost=Decimal('90.00'), lunch_participants=3)
+        _, self.other = self.make_member('other')
+
+    def summary(self, member=None, month=None):
+        return MemberMonthlySummary.objects.filter(
+            member=member or self.member, month=month or self.month
+        ).values('lunch_meals', 'dinner_meals', 'days_with_meals', 'total_cost',
+                 'paid_amount', 'unpaid_amount', 'deposit_amount').first()
+
+    def assertSummary(self, expected, member=None, month=None):
+        summary = self.summary(member, month)
+        self.assertEqual({field: summary[field] for field in expected}, expected)
+
+    def test_apply_adds_to_existing_row_only_unless_asked(self):
+        _apply((self.member.id, self.month), {'lunch_meals': 2}, create_missing=False)
+        self.assertIsNone(self.summary())
+        _apply((self.member.id, self.month), {'lunch_meals': 2}, create_missing=True)
+        _apply((self.member.id, self.month), {'lunch_meals': 3, 'total_cost': Decimal(0)}, create_missing=False)
+        self.assertSummary({'lunch_meals': 5, 'total_cost': Decimal('0.00')})
+
+    def test_tracking_create_adds_its_contribution(self):
+        MemberMealTracking.objects.create(member=self.member, date=self.day, lunch_count=1, dinner_count=1)
+        self.assertSummary({
+            'lunch_meals': 1, 'dinner_meals': 1, 'days_with_meals': 1,
+            'total_cost': Decimal('30.00'), 'paid_amount': Decimal('0.00'), 'unpaid_amount': Decimal('30.00'),
+        })
+
+    def test_tracking_update_applies_the_difference(self):
+        tracking = MemberMealTracking.objects.create(member=self.member, date=self.day, lunch_count=1)
+        tracking.lunch_count = 2
+        tracking.save()
+        self.assertSummary({'lunch_meals': 2, 'days_with_meals': 1, 'total_cost': Decimal('60.00'),
+                            'unpaid_amount': Decimal('60.00')})
+        tracking.is_paid = True
+        tracking.save()
+        self.assertSummary({'days_with_meals': 1, 'paid_amount': Decimal('60.00'),
+                            'unpaid_amount': Decimal('0.00')})
+
+    def test_tracking_update_of_unloaded_row_recomputes_its_slice(self):
+        tracking = MemberMealTracking.objects.create(member=self.member, date=self.day, lunch_count=1)
+        MemberMealTracking(id=tracking.id, member=self.member, date=self.day, lunch_count=3).save()
+        self.assertSummary({'lunch_meals': 3, 'days_with_meals': 1, 'total_cost': Decimal('90.00')})
+
+    def test_tracking_reassignment_moves_the_contribution(self):
+        tracking = MemberMealTracking.objects.create(member=self.member, date=self.day, lunch_count=1)
+        tracking = MemberMealTracking.objects.get(pk=tracking.pk)
+        tracking.member = self.other
+        tracking.save()
+        self.assertSummary({'lunch_meals': 0, 'days_with_meals': 0, 'total_cost': Decimal('0.00')})
+        self.assertSummary({'lunch_meals': 1, 'days_with_meals': 1, 'total_cost': Decimal('30.00')},
+                           member=self.other)
+
+        tracking.date = date(2026, 4, 2)
+        tracking.save()
+        self.assertSummary({'lunch_meals': 0, 'days_with_meals': 0}, member=self.other)
+        self.assertSummary({'lunch_meals': 1, 'days_with_meals': 1, 'total_cost': Decimal('0.00')},
+                           member=self.other, month=date(2026, 4, 1))
+
+    def test_tracking_delete_removes_the_contribution(self):
+        tracking = MemberMealTracking.objects.create(member=self.member, date=self.day, lunch_count=1)
+        MemberMealTracking.objects.create(member=self.member, date=date(2026, 3, 11), lunch_count=1)
+        tracking.delete()
+        self.assertSummary({'lunch_meals': 1, 'days_with_meals': 1, 'total_cost': Decimal('0.00')})
+
+    def test_deposit_changes_apply_the_difference(self):
+        deposit = MonthlyDeposit.objects.create(member=self.member, amount=Decimal('500.00'), month=self.month)
+        deposit.amount = Decimal('650.00')
+        deposit.save()
+        self.assertSummary({'deposit_amount': Decimal('650.00')})
+        deposit.member = self.other
+        deposit.save()
+        self.assertSummary({'deposit_amount': Decimal('0.00')})
+        self.assertSummary({'deposit_amount': Decimal('650.00')}, member=self.other)
+        deposit.delete()
+        self.assertSummary({'deposit_amount': Decimal('0.00')}, member=self.other)
+
+    def test_reprice_refreshes_only_members_in_the_range(self):
+        MemberMealTracking.objects.create(member=self.member, date=self.day, lunch_count=1)
+        MemberMealTracking.objects.create(member=self.other, date=date(2026, 3, 20), lunch_count=1)
+        # Summaries out of step with their rows, as only a refresh would fix
+        MemberMonthlySummary.objects.update(lunch_meals=9)
+        DailyMealCost.objects.filter(date=self.day).update(lunch_cost=Decimal('120.00'))
+
+        self.assertEqual(reprice_tracking(self.day), 1)
+        self.assertSummary({'lunch_meals': 1, 'total_cost': Decimal('40.00')})
+        self.assertSummary({'lunch_meals': 9}, member=self.other)
+
+
+class RepriceRangeTests(MealAPITestCase):
+    url = '/api/meal/daily-costs/reprice_range/'
+
+    def setUp(self):
+        super().setUp()
+        self.days = [date(2026, 3, 31), date(2026, 4, 1), date(2026, 4, 2)]
+        _, self.diner = self.make_member('diner', current_balance=Decimal('100.00'))
+        for day in self.days:
+            DailyMealCost.objects.create(date=day, lunch_cost=Decimal('30.00'), lunch_participants=1)
+            MemberMealTracking.objects.create(member=self.diner, date=day, lunch_count=1)
+        # Rates changed behind the tracking rows' back
+        DailyMealCost.objects.update(lunch_cost=Decimal('45.00'))
+
+    def costs(self):
+        return list(MemberMealTracking.objects.order_by('date').values_list('total_cost', flat=True))
+
+    def test_reprices_rows_in_range(self):
+        response = self.client.post(self.url, {
+            'start_date': '2026-03-31', 'end_date': '2026-04-01',
+        }, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.data['repriced_count'], 2)
+        self.assertEqual(response.data['message'], 'Repriced 2 meal tracking records')
+        self.assertEqual(self.costs(), [Decimal('45.00'), Decimal('45.00'), Decimal('30.00')])
+
+        summaries = dict(MemberMonthlySummary.objects.filter(member=self.diner).values_list('month', 'unpaid_amount'))
+        self.assertEqual(summaries, {date(2026, 3, 1): Decimal('45.00'), date(2026, 4, 1): Decimal('75.00')})
+        # Repricing only changes what is owed; balances move when payments settle
+        self.diner.refresh_from_db(fields=['current_balance'])
+        self.assertEqual(self.diner.current_balance, Decimal('100.00'))
+
+    def test_end_date_defaults_to_start_date(self):
+        response = self.client.post(self.url, {'start_date': '2026-04-02'}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.data['repriced_count'], 1)
+        self.assertEqual(self.costs(), [Decimal('30.00'), Decimal('30.00'), Decimal('45.00')])
+
+    def test_reversed_range_is_rejected(self):
+        response = self.client.post(self.url, {
+            'start_date': '2026-04-02', 'end_date': '2026-03-31',
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['non_field_errors'], ['end_date must not be before start_date'])
+        self.assertEqual(self.costs(), [Decimal('30.00')] * 3)
+
+    def test_invalid_dates_are_rejected(self):
+        for payload in ({}, {'start_date': 'yesterday'}, {'start_date': '2026-04-01', 'end_date': '2026-02-30'}):
+            response = self.client.post(self.url, payload, format='json')
+            self.assertEqual(response.status_code, 400, payload)
+        self.assertEqual(self.costs(), [Decimal('30.00')] * 3)
+
+
+class BulkUpdateTrackingTests(MealAPITestCase):
+    url = '/api/meal/meal-tracking/bulk_update/'
+
+    def setUp(self):
+        super().setUp()
+        DailyMealCost.objects.create(date=self.today, lunch_cost=Decimal('90.00'), dinner_cost=Decimal('60.00'))
+        _, self.existing = self.make_member('existing')
+        _, self.added = self.make_member('added')
+        _, self.bystander = self.make_member('bystander')
+        MemberMealTracking.objects.create(member=self.existing, date=self.today, lunch_count=1, notes='Kept')
+        MemberMealTracking.objects.create(member=self.bystander, date=self.today, lunch_count=1, dinner_count=1)
+
+    def post(self, member_tracking):
+        return self.client.post(self.url, {
+            'date': self.today.isoformat(), 'member_tracking': member_tracking,
+        }, format='json')
+
+    def costs(self, member):
+        tracking = MemberMealTracking.objects.get(member=member, date=self.today)
+        return tracking.lunch_cost, tracking.dinner_cost, tracking.total_cost
+
+    def test_counts_created_updated_and_skipped(self):
+        response = self.post([
+            {'member_id': self.existing.id, 'lunch_count': 1, 'dinner_count': 1},
+            {'member_id': self.added.id, 'lunch_count': 1, 'dinner_count': 0},
+            {'member_id': 9999, 'lunch_count': 1, 'dinner_count': 1},
+            {'member_id': 9998, 'lunch_count': 1, 'dinner_count': 1},
+        ])
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data['created_count'], 1)
+        # Rows that already existed only, not every row saved
+        self.assertEqual(response.data['updated_count'], 1)
+        self.assertEqual(response.data['skipped_count'], 2)
+        self.assertEqual(response.data['skipped_member_ids'], [9998, 9999])
+        self.assertEqual(response.data['message'],
+                         'Saved 2 meal tracking records (1 created, 1 updated, 2 skipped)')
+        self.assertEqual(MemberMealTracking.objects.filter(date=self.today).count(), 3)
+        self.assertEqual(MemberMealTracking.objects.get(member=self.existing).notes, 'Kept')
+
+    def test_later_duplicate_entries_win(self):
+        response = self.post([
+            {'member_id': self.added.id, 'lunch_count': 2, 'dinner_count': 0},
+            {'member_id': self.added.id, 'lunch_count': 0, 'dinner_count': 1},
+            {'member_id': 9999, 'lunch_count': 1, 'dinner_count': 1},
+            {'member_id': 9999, 'lunch_count': 1, 'dinner_count': 1},
+        ])
+        self.assertEqual((response.data['created_count'], response.data['skipped_count']), (1, 1))
+        self.assertEqual(response.data['skipped_member_ids'], [9999])
+        tracking = MemberMealTracking.objects.get(member=self.added)
+        self.assertEqual((tracking.lunch_count, tracking.dinner_count), (0, 1))
+
+    def test_recounts_participants_and_prices_the_day(self):
+        self.post([
+            {'member_id': self.existing.id, 'lunch_count': 1, 'dinner_count': 1},
+            {'member_id': self.added.id, 'lunch_count': 0, 'dinner_count': 2},
+        ])
+        daily_cost = DailyMealCost.objects.get(date=self.today)
+        # existing and bystander had lunch; all three had dinner
+        self.assertEqual((daily_cost.lunch_participants, daily_cost.dinner_participants), (2, 3))
+        self.assertEqual(self.costs(self.existing), (Decimal('45.00'), Decimal('20.00'), Decimal('65.00')))
+        self.assertEqual(self.costs(self.added), (Decimal('0.00'), Decimal('40.00'), Decimal('40.00')))
+        # Rows left out of the payload are repriced with the new counts too
+        self.assertEqual(self.costs(self.bystander), (Decimal('45.00'), Decimal('20.00'), Decimal('65.00')))
+
+
+class SettlePaymentsTests(MealAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.days = [date(2026, 3, day) for day in (10, 11, 12)]
+        for day in self.days:
+            DailyMealCost.objects.create(date=day, lunch_cost=Decimal('30.00'), lunch_participants=1)
+        _, self.partial = self.make_member('partial', current_balance=Decimal('70.00'))
+        _, self.blocked = self.make_member('blocked', current_balance=Decimal('50.00'))
+        _, self.covered = self.make_member('covered', current_balance=Decimal('100.00'))
+        for day in reversed(self.days):
+            MemberMealTracking.objects.create(member=self.partial, date=day, lunch_count=1)
+        MemberMealTracking.objects.create(member=self.blocked, date=self.days[0], lunch_count=2)
+        MemberMealTracking.objects.create(member=self.blocked, date=self.days[1], lunch_count=1)
+        MemberMealTracking.objects.create(member=self.covered, date=self.days[0], lunch_count=1)
+
+    def paid_days(self, member):
+        return list(MemberMealTracking.objects.filter(member=member, is_paid=True)
+                    .order_by('date').values_list('date', flat=True))
+
+    def balance(self, member):
+        member.refresh_from_db(fields=['current_balance'])
+        return member.current_balance
+
+    def test_settles_oldest_first_and_stops_at_first_shortfall(self):
+        result = settle_payments(self.days[0], self.days[-1])
+
+        self.assertEqual(self.paid_days(self.partial), self.days[:2])
+        self.assertEqual(self.balance(self.partial), Decimal('10.00'))
+        # The cheaper later day is left unpaid once an earlier one is short
+        self.assertEqual(self.paid_days(self.blocked), [])
+        self.assertEqual(self.balance(self.blocked), Decimal('50.00'))
+        self.assertEqual(self.paid_days(self.covered), self.days[:1])
+        self.assertEqual(self.balance(self.covered), Decimal('70.00'))
+
+        self.assertEqual(result['total_records'], 6)
+        self.assertEqual(result['processed_count'], 3)
+        self.assertEqual(result['settled_members'], 2)
+        self.assertEqual(result['settled_amount'], Decimal('90.00'))
+        self.assertFalse(result['dry_run'])
+
+    def test_partially_settled_member_is_short(self):
+        short = {row['member_id']: row for row in settle_payments(self.days[0], self.days[-1])['short_members']}
+        self.assertEqual(set(short), {self.partial.id, self.blocked.id})
+        self.assertEqual(short[self.partial.id], {
+            'member_id': self.partial.id,
+            'member_name': 'Partial Tester',
+            'current_balance': Decimal('70.00'),
+            'amount_due': Decimal('90.00'),
+            'shortfall': Decimal('20.00'),
+        })
+        self.assertEqual(short[self.blocked.id]['shortfall'], Decimal('40.00'))
+
+    def test_dry_run_writes_nothing(self):
+        rows = list(MemberMealTracking.objects.order_by('id').values())
+        summaries = list(MemberMonthlySummary.objects.order_by('id').values())
+
+        result = settle_payments(self.days[0], self.days[-1], dry_run=True)
+
+        self.assertTrue(result['dry_run'])
+        self.assertEqual(result['processed_count'], 3)
+        self.assertEqual(len(result['short_members']), 2)
+        self.assertEqual(list(MemberMealTracking.objects.order_by('id').values()), rows)
+        self.assertEqual(list(MemberMonthlySummary.objects.order_by('id').values()), summaries)
+        self.assertEqual(
+            [self.balance(member) for member in (self.partial, self.blocked, self.covered)],
+            [Decimal('70.00'), Decimal('50.00'), Decimal('100.00')]
+        )
+
+    def test_endpoint_settles_a_single_date(self):
+        response = self.client.post('/api/meal/meal-tracking/process_payments/', {
+            'date': self.days[0].isoformat(),
+        }, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.data['message'], 'Processed payments for 2 members')
+        self.assertEqual(self.paid_days(self.partial), self.days[:1])
+        self.assertEqual(self.paid_days(self.covered), self.days[:1])
+        self.assertEqual(self.paid_days(self.blocked), [])
+
+
+class MealRateCacheTests(MealAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.day = self.today - timedelta(days=1)
+        self.daily_cost = DailyMealCost.objects.create(
+            date=self.day, lunch_cost=Decimal('90.00'), lunch_participants=3
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(rate_resolver.get(self.day).lunch_per_person, Decimal('30'))
+
+    def track(self):
+        _, member = self.make_member(f'diner{self.next_id()}')
+        return MemberMealTracking.objects.create(member=member, date=self.day, lunch_count=1)
+
+    def later(self):
+        """Past the change-counter interval, as seen by the resolver"""
+        return mock.patch('Meal.meal_pricing.time.monotonic',
+                          return_value=time_module.monotonic() + rate_resolver.version_interval + 1)
+
+    def edit_elsewhere(self, day, lunch_cost):
+        # update() sends no signal, like a write made by another worker:
+        # only the shared change counter tells this process about it
+        DailyMealCost.objects.filter(date=day).update(lunch_cost=lunch_cost)
+        bump_versions(DailyMealCost)
+
+    def test_cached_rate_is_reused(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(rate_resolver.get(self.day).lunch_per_person, Decimal('30'))
+
+    def test_tracking_save_on_a_hit_runs_no_rate_query(self):
+        _, member = self.make_member('diner')
+        with CaptureQueriesContext(connection) as queries:
+            MemberMealTracking.objects.create(member=member, date=self.day, lunch_count=1)
+        rate_reads = [
+            query['sql'] for query in queries.captured_queries
+            if query['sql'].startswith('SELECT')
+            and ('"Meal_dailymealcost"' in query['sql'] or '"Meal_collectionversion"' in query['sql'])
+        ]
+        self.assertEqual(rate_reads, [])
+
+    def test_edit_invalidates_cache(self):
+        self.daily_cost.lunch_cost = Decimal('120.00')
+        self.daily_cost.save()
+        self.assertEqual(rate_resolver.get(self.day).lunch_per_person, Decimal('40'))
+        self.assertEqual(self.track().lunch_cost, Decimal('40.00'))
+
+    def test_edit_in_another_process_invalidates_cache(self):
+        self.edit_elsewhere(self.day, Decimal('120.00'))
+        with self.later():
+            tracking = self.track()
+        self.assertEqual(tracking.lunch_cost, Decimal('40.00'))
+        self.assertEqual(tracking.total_cost, Decimal('40.00'))
+
+    def test_stale_dates_are_reloaded_with_the_misses(self):
+        other_day = self.day - timedelta(days=1)
+        DailyMealCost.objects.create(date=other_day, lunch_cost=Decimal('50.00'), lunch_participants=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            rate_resolver.get(other_day)
+        self.edit_elsewhere(self.day, Decimal('120.00'))
+        with self.later():
+            with self.assertNumQueries(2), self.captureOnCommitCallbacks(execute=True):
+                # The counter, then both dates at once
+                self.assertEqual(rate_resolver.get(other_day).lunch_per_person, Decimal('50'))
+            with self.assertNumQueries(0):
+                self.assertEqual(rate_resolver.get(self.day).lunch_per_person, Decimal('40'))
+
+    def test_rates_read_before_a_change_are_not_cached(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            rate_resolver.clear()
+            rate_resolver.get(self.day)
+        self.edit_elsewhere(self.day, Decimal('120.00'))
+        with self.later():
+            self.assertEqual(rate_resolver.get(self.day).lunch_per_person, Decimal('40'))
+            for callback in callbacks:
+                callback()
+            self.assertEqual(self.track().lunch_cost, Decimal('40.00'))
+
+
+class KeysetPaginationTests(MealAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        # Several rows per date so the id tie-breaker matters
+        for offset in range(15):
+            day = self.today - timedelta(days=offset // 3)
+            _, member = self.make_member(f'keyset{offset}')
+            MemberMealTracking.objects.create(member=member, date=day, lunch_count=1)
+        self.expected = list(
+            MemberMealTracking.objects.order_by('-date', '-id').values_list('id', flat=True)
+        )
+
+    def walk(self, url):
+        ids, pages = [], []
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append(response.data)
+            ids.extend(row['id'] for row in response.data['results'])
+            # versions, one keyset-range SELECT and the page's daily rates, no
+            # COUNT (the daily-rate counter was read recently by setUp's saves)
+            self.assertEqual(len(queries), 3)
+            url = response.data['next']
+        return ids, pages
+
+    def test_forward_walk_is_complete_and_ordered(self):
+        with mock.patch.object(MealPagination, 'page_size', 4):
+            ids, pages = self.walk('/api/meal/meal-tracking/?pagination=cursor')
+        self.assertEqual(ids, self.expected)
+        self.assertEqual(len(pages), 4)
+        self.assertNotIn('count', pages[0])
+        self.assertIsNone(pages[0]['previous'])
+
+    def test_previous_link_returns_prior_page(self):
+        with mock.patch.object(MealPagination, 'page_size', 4):
+            first = self.client.get('/api/meal/meal-tracking/?pagination=cursor').data
+            second = self.client.get(first['next']).data
+            back = self.client.get(second['previous']).data
+        self.assertEqual(
+            [row['id'] for row in back['results']], [row['id'] for row in first['results']]
+        )
+
+    def test_count_is_opt_in(self):
+        response = self.client.get('/api/meal/meal-tracking/?pagination=cursor&count=true')
+        self.assertEqual(response.data['count'], 15)
+
+    def test_tampered_cursor_is_not_found(self):
+        for values in (['garbage', 1], [{'a': 1}, 1], ['2026-09-01', 'x'], [None, None],
+                       ['2026-09-01'], 'garbage'):
+            payload = json.dumps({'v': values, 'r': False}).encode()
+            cursor = base64.urlsafe_b64encode(payload).decode()
+            response = self.client.get('/api/meal/meal-tracking/', {'cursor': cursor})
+            self.assertEqual(response.status_code, 404, values)
+            self.assertEqual(response.data['detail'], 'Invalid cursor')
+        response = self.client.get('/api/meal/meal-tracking/', {'cursor': 'not base64!'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_page_numbers_remain_the_default(self):
+        response = self.client.get('/api/meal/meal-tracking/')
+        self.assertEqual(response.data['count'], 15)
+        self.assertEqual([row['id'] for row in response.data['results']], self.expected)
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN output is SQLite specific')
+class QueryPlanTests(MealAPITestCase):
+    """
+    Run each hot endpoint, EXPLAIN QUERY PLAN every statement it sent to the
+    hot tables and fail on a bare ``SCAN <table>`` (a full table scan).
+    """
+    HOT_TABLES = ['Meal_membermealtracking', 'Meal_meal', 'Meal_expense',
+                  'Meal_monthlydeposit', 'Meal_budget']
+
+    def assertNoFullScans(self, method, url, data=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(url, data, format='json')
+        self.assertLess(response.status_code, 400, response.content)
+
+        checked = 0
+        for sql in (query['sql'] for query in queries.captured_queries):
+            tables = [table for table in self.HOT_TABLES if f'"{table}"' in sql]
+            if not tables or not sql.startswith(('SELECT', 'UPDATE', 'DELETE')):
+                continue
+            with connection.cursor() as cursor:
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                plan = [row[-1] for row in cursor.fetchall()]
+            for step in plan:
+                for table in tables:
+                    self.assertNotRegex(
+                        step, rf'^SCAN {table}( AS \w+)?$',
+                        f'Full scan of {table}:\n{sql}\n' + '\n'.join(plan)
+                    )
+            checked += 1
+        self.assertGreater(checked, 0)
+
+    def test_bulk_update(self):
+        DailyMealCost.objects.create(date=self.today, lunch_cost=Decimal('50.00'))
+        self.assertNoFullScans('post', '/api/meal/meal-tracking/bulk_update/', {
+            'date': str(self.today),
+            'member_tracking': [{'member_id': self.member.id, 'lunch_count': 1, 'dinner_count': 1}],
+        })
+
+    def test_process_payments(self):
+        self.make_tracking()
+        self.assertNoFullScans('post', '/api/meal/meal-tracking/process_payments/', {
+            'start_date': str(self.today - timedelta(days=30)), 'end_date': str(self.today),
+        })
+
+    def test_generate_from_meals(self):
+        self.make_meal()
+        shopping_list = self.make_shopping_list()
+        self.assertNoFullScans(
+            'post', f'/api/meal/shopping-lists/{shopping_list.id}/generate_from_meals/',
+            {'start_date': str(self.today), 'end_date': str(self.today)}
+        )
+
+    def test_dashboard_stats(self):
+        self.make_meal()
+        self.make_expense()
+        self.make_deposit()
+        self.make_budget()
+        self.make_tracking()
+        self.assertNoFullScans('get', '/api/meal/dashboard/stats/')
+
+    def test_tracking_keyset_page(self):
+        for _ in range(3):
+            self.make_tracking()
+        with mock.patch.object(MealPagination, 'page_size', 2):
+            first = self.client.get('/api/meal/meal-tracking/?pagination=cursor').data
+            self.assertNoFullScans('get', first['next'])
+
+
+class SparseFieldsetTests(MealAPITestCase):
+
+    def test_fields_limit_rows_and_skip_relations(self):
+        for _ in range(3):
+            self.make_tracking()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/meal/meal-tracking/?fields=id,date,lunch_count,total_cost')
+        self.assertEqual(
+            set(response.data['results'][0]), {'id', 'date', 'lunch_count', 'total_cost'}
+        )
+        # versions, COUNT and the page itself: no user join, no daily rate lookup
+        self.assertEqual(len(queries), 3)
+        self.assertNotIn('auth_user', queries.captured_queries[2]['sql'])
+
+    def test_dotted_fields_select_inside_nested_objects(self):
+        tracking = self.make_tracking()
+        response = self.client.get('/api/meal/meal-tracking/?fields=id,member.full_name')
+        self.assertEqual(response.data['results'][0], {
+            'id': tracking.id, 'member': {'full_name': tracking.member.user.get_full_name()},
+        })
+
+    def test_expand_picks_nested_objects(self):
+        self.make_expense()
+        row = self.client.get('/api/meal/expenses/?expand=submitted_by').data['results'][0]
+        self.assertIn('title', row)
+        self.assertIn('submitted_by_name', row)
+        self.assertNotIn('approved_by', row)
+        self.assertNotIn('user', row['submitted_by'])
+
+        row = self.client.get('/api/meal/expenses/?expand=submitted_by.user').data['results'][0]
+        self.assertEqual(row['submitted_by']['user']['username'], 'admin')
+
+    def test_unrequested_prefetch_is_skipped(self):
+        self.make_meal()
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/meal/meals/?fields=id,name')
+        self.assertEqual(set(response.data['results'][0]), {'id', 'name'})
+
+    def test_default_response_is_unchanged(self):
+        self.make_tracking()
+        row = self.client.get('/api/meal/meal-tracking/').data['results'][0]
+        self.assertIn('user', row['member'])
+        self.assertIn('daily_cost', row)
+
+
+class StreamingExportTests(MealAPITestCase):
+
+    def read(self, response):
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_export_honours_list_filters(self):
+        rows = [self.make_tracking() for _ in range(3)]
+        rows[0].is_paid = True
+        rows[0].save()
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/meal/meal-tracking/export/?is_paid=false')
+            lines = self.read(response).splitlines()
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertIn('meal-tracking.csv', response['Content-Disposition'])
+        self.assertEqual(lines[0].split(',')[:3], ['id', 'member_id', 'username'])
+        self.assertEqual([int(line.split(',')[0]) for line in lines[1:]], [rows[1].id, rows[2].id])
+
+    def test_ndjson_export(self):
+        deposit = self.make_deposit()
+        response = self.client.get('/api/meal/deposits/export/?file_format=ndjson')
+        lines = self.read(response).splitlines()
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual(len(lines), 1)
+        row = json.loads(lines[0])
+        self.assertEqual((row['id'], row['amount']), (deposit.id, '500.00'))
+
+    def test_expense_export_date_range(self):
+        expense = self.make_expense()
+        old = self.make_expense()
+        Expense.objects.filter(id=old.id).update(date=self.today - timedelta(days=400))
+        body = self.read(self.client.get(
+            f'/api/meal/expenses/export/?start_date={self.today - timedelta(days=30)}'
+        ))
+        self.assertEqual([line.split(',')[0] for line in body.splitlines()[1:]], [str(expense.id)])
+
+    def test_unknown_format_is_rejected(self):
+        response = self.client.get('/api/meal/expenses/export/?file_format=xml')
+        self.assertEqual(response.status_code, 400)
+
+    def test_asgi_export_is_an_async_stream(self):
+        rows = [self.make_tracking() for _ in range(3)]
+        headers = {'Authorization': f'Bearer {AccessToken.for_user(self.user)}'}
+
+        async def read():
+            response = await AsyncClient().get('/api/meal/meal-tracking/export/', headers=headers)
+            self.assertEqual(response.status_code, 200)
+            # Django streams async iterators under ASGI instead of reading them whole
+            self.assertTrue(response.is_async)
+            return b''.join([chunk async for chunk in response.streaming_content]).decode()
+
+        lines = async_to_sync(read)().splitlines()
+        self.assertEqual(lines[0].split(',')[:3], ['id', 'member_id', 'username'])
+        self.assertEqual(sorted(int(line.split(',')[0]) for line in lines[1:]), [row.id for row in rows])
+
+
+class CSVImportTests(MealAPITestCase):
+
+    def upload(self, url, text, **data):
+        file = SimpleUploadedFile('import.csv', text.encode(), content_type='text/csv')
+        return self.client.post(url, {'file': file, **data}, format='multipart')
+
+    def test_tracking_import_reports_line_errors_and_prices_rows(self):
+        _, other = self.make_member('other')
+        DailyMealCost.objects.create(date=self.today, lunch_cost=Decimal('60.00'))
+        response = self.upload('/api/meal/meal-tracking/import/', '\n'.join([
+            'member_id,username,date,lunch_count,dinner_count',
+            f'{self.member.id},,{self.today},1,0',
+            f',other,{self.today},1,1',
+            f',other,{self.today},0,0',
+            f'{self.member.id},,{self.today},5,0',
+            f',ghost,{self.today},1,0',
+        ]))
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data['created_count'], 2)
+        self.assertEqual([error['line'] for error in response.data['errors']], [4, 5, 6])
+
+        self.assertEqual(DailyMealCost.objects.get(date=self.today).lunch_participants, 2)
+        tracking = MemberMealTracking.objects.get(member=other, date=self.today)
+        self.assertEqual(tracking.lunch_cost, Decimal('30.00'))
+        summary = MemberMonthlySummary.objects.get(member=other)
+        self.assertEqual(summary.total_cost, Decimal('30.00'))
+
+    def test_unknown_or_mismatched_member_id_is_an_error(self):
+        _, other = self.make_member('other')
+        response = self.upload('/api/meal/meal-tracking/import/', '\n'.join([
+            'member_id,username,date,lunch_count,dinner_count',
+            f'{other.id + 100},other,{self.today},1,0',
+            f'{other.id},admin,{self.today},1,0',
+            f'{other.id},other,{self.today},1,0',
+        ]))
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data['errors'], [
+            {'line': 2, 'errors': {'member_id': ['Unknown member']}},
+            {'line': 3, 'errors': {'username': ['Does not match member_id']}},
+        ])
+        self.assertEqual(
+            list(MemberMealTracking.objects.values_list('member_id', flat=True)), [other.id]
+        )
+
+    def test_tracking_import_updates_notes(self):
+        tracking = MemberMealTracking.objects.create(
+            member=self.member, date=self.today, lunch_count=1, notes='Before'
+        )
+        response = self.upload('/api/meal/meal-tracking/import/', '\n'.join([
+            'member_id,date,lunch_count,dinner_count,notes',
+            f'{self.member.id},{self.today},2,1,After',
+        ]))
+        self.assertEqual(response.data['updated_count'], 1)
+        tracking.refresh_from_db()
+        self.assertEqual((tracking.lunch_count, tracking.dinner_count, tracking.notes), (2, 1, 'After'))
+
+    def test_tracking_import_without_notes_column_keeps_notes(self):
+        MemberMealTracking.objects.create(member=self.member, date=self.today, lunch_count=1, notes='Before')
+        response = self.upload('/api/meal/meal-tracking/import/', '\n'.join([
+            'member_id,date,lunch_count,dinner_count',
+            f'{self.member.id},{self.today},2,0',
+        ]))
+        self.assertEqual(response.data['updated_count'], 1)
+        tracking = MemberMealTracking.objects.get(member=self.member)
+        self.assertEqual((tracking.lunch_count, tracking.notes), (2, 'Before'))
+
+    def test_tracking_import_query_count_is_constant(self):
+        counts = []
+        for size in (3, 30):
+            members = [self.make_member(f'csv{self.next_id()}')[1] for _ in range(size)]
+            text = '\n'.join(['member_id,date,lunch_count,dinner_count'] + [
+                f'{member.id},{self.today},1,1' for member in members
+            ])
+            rate_resolver.clear()
+            with CaptureQueriesContext(connection) as queries:
+                self.upload('/api/meal/meal-tracking/import/', text)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_deposit_import_credits_balances_in_aggregate(self):
+        _, other = self.make_member('other')
+        month = self.today.replace(day=1)
+        MonthlyDeposit.objects.create(member=other, amount=Decimal('10.00'), month=month)
+        previous = month - timedelta(days=1)
+        response = self.upload('/api/meal/deposits/import/', '\n'.join([
+            'username,amount,month,notes',
+            f'admin,100.00,{month:%Y-%m},Bank',
+            f'admin,50.00,{previous:%Y-%m},',
+            f'other,20.00,{month:%Y-%m},',
+            'admin,-5,2024-01,',
+        ]))
+        self.assertEqual(response.data['created_count'], 2)
+        self.assertEqual([error['line'] for error in response.data['errors']], [4, 5])
+
+        self.member.refresh_from_db()
+        self.assertEqual(self.member.current_balance, Decimal('150.00'))
+        self.assertEqual(
+            MemberMonthlySummary.objects.get(member=self.member, month=month).deposit_amount,
+            Decimal('100.00')
+        )
+
+    def test_dry_run_writes_nothing(self):
+        response = self.upload(
+            '/api/meal/deposits/import/', f'member_id,amount,month\n{self.member.id},10,2024-01',
+            dry_run='true'
+        )
+        self.assertEqual(response.data['valid_rows'], 1)
+        self.assertFalse(MonthlyDeposit.objects.exists())
+
+    def test_missing_columns_are_rejected(self):
+        response = self.upload('/api/meal/deposits/import/', 'member_id,amount\n1,10')
+        self.assertEqual(response.status_code, 400)
+
+    def test_management_command(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as file:
+            file.write(f'member_id,amount,month\n{self.member.id},25.00,2024-03\n')
+        self.addCleanup(os.remove, file.name)
+        out = io.StringIO()
+        call_command('import_csv', 'deposits', file.name, stdout=out)
+        self.assertIn('Imported 1 of 1 rows', out.getvalue())
+        self.assertEqual(MonthlyDeposit.objects.get().month, date(2024, 3, 1))
+
+
+class GenerateFromMealsTests(MealAPITestCase):
+
+    def generate(self, shopping_list):
+        return self.client.post(
+            f'/api/meal/shopping-lists/{shopping_list.id}/generate_from_meals/',
+            {'start_date': str(self.today), 'end_date': str(self.today)}, format='json'
+        )
+
+    def test_groups_case_insensitively_and_is_idempotent(self):
+        self.make_meal()
+        meal = self.make_meal()
+        Ingredient.objects.create(
+            meal=meal, name=' rice', quantity=Decimal('0.50'), unit='kg', estimated_cost=Decimal('1.00')
+        )
+        shopping_list = self.make_shopping_list()
+
+        for _ in range(2):
+            response = self.generate(shopping_list)
+            self.assertEqual(response.data['message'], 'Generated 2 items from 2 meals')
+
+        generated = {
+            item.name: item for item in shopping_list.items.filter(from_meals=True)
+        }
+        self.assertEqual(set(generated), {'Rice', 'Lentils'})
+        self.assertEqual(generated['Rice'].quantity, Decimal('3.50'))
+        self.assertEqual(generated['Rice'].estimated_cost, Decimal('7.00'))
+        # Hand-added Oil and Salt are kept and counted in the total
+        self.assertEqual(shopping_list.items.count(), 4)
+        shopping_list.refresh_from_db()
+        self.assertEqual(shopping_list.total_estimated_cost, Decimal('21.00'))
+
+    def test_purchased_items_are_kept_and_merged(self):
+        self.make_meal()
+        shopping_list = self.make_shopping_list()
+        self.generate(shopping_list)
+        rice = shopping_list.items.get(from_meals=True, name='Rice')
+        self.client.post(
+            f'/api/meal/shopping-lists/{shopping_list.id}/mark_item_purchased/',
+            {'item_id': rice.id, 'actual_cost': '3.00'}, format='json'
+        )
+        self.make_meal()
+
+        for _ in range(2):
+            self.generate(shopping_list)
+            rows = list(shopping_list.items.filter(from_meals=True, name='Rice').order_by('id').values_list(
+                'id', 'quantity', 'estimated_cost', 'is_purchased'
+            ))
+            # The purchase covers half; only the rest is to buy
+            self.assertEqual(rows[0], (rice.id, Decimal('1.50'), Decimal('3.00'), True))
+            self.assertEqual(rows[1][1:], (Decimal('1.50'), Decimal('3.00'), False))
+            self.assertEqual(len(rows), 2)
+        self.assertEqual(shopping_list.items.get(name='Lentils').quantity, Decimal('3.00'))
+
+        # Nothing new to buy once the purchase covers the whole quantity
+        Meal.objects.filter(id=Meal.objects.order_by('-id').first().id).delete()
+        self.generate(shopping_list)
+        self.assertEqual(shopping_list.items.filter(from_meals=True, name='Rice').count(), 1)
+
+    def test_query_count_does_not_grow_with_meals(self):
+        shopping_list = self.make_shopping_list()
+        self.generate(shopping_list)
+        counts = []
+        for meals in (2, 20):
+            while Meal.objects.count() < meals:
+                self.make_meal()
+            with CaptureQueriesContext(connection) as queries:
+                self.generate(shopping_list)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+
+class ShoppingListCounterTests(MealAPITestCase):
+
+    def test_counters_are_annotated(self):
+        shopping_list = self.make_shopping_list()
+        ShoppingItem.objects.filter(shopping_list=shopping_list, is_purchased=True).update(
+            actual_cost=Decimal('3.50')
+        )
+        self.make_shopping_list()
+        fields = 'id,items_count,purchased_items_count,items_estimated_cost,items_actual_cost'
+        # versions, COUNT and the lists with their counters: no items are loaded
+        with self.assertNumQueries(3):
+            response = self.client.get(f'/api/meal/shopping-lists/?fields={fields}')
+        row = next(row for row in response.data['results'] if row['id'] == shopping_list.id)
+        self.assertEqual(dict(row), {
+            'id': shopping_list.id, 'items_count': 2, 'purchased_items_count': 1,
+            'items_estimated_cost': '8.00', 'items_actual_cost': '3.50',
+        })
+
+    def test_counters_without_annotation(self):
+        shopping_list = self.make_shopping_list()
+        from .meal_serializers import ShoppingListSerializer
+        data = ShoppingListSerializer(shopping_list).data
+        self.assertEqual((data['items_count'], data['purchased_items_count']), (2, 1))
+
+
+class PurchaseItemsTests(MealAPITestCase):
+
+    def test_batch_purchase_adjusts_totals_and_completes_list(self):
+        shopping_list = self.make_shopping_list()
+        oil, salt = shopping_list.items.order_by('id')
+        oil.actual_cost = Decimal('4.50')
+        oil.save()
+        ShoppingList.objects.filter(id=shopping_list.id).update(total_actual_cost=Decimal('4.50'))
+
+        response = self.client.post(
+            f'/api/meal/shopping-lists/{shopping_list.id}/purchase_items/',
+            {'items': [
+                {'item_id': oil.id, 'actual_cost': '5.00'},
+                {'item_id': salt.id, 'actual_cost': '1.25'},
+                {'item_id': 999999},
+            ]}, format='json'
+        )
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data['purchased_count'], 2)
+        self.assertEqual(response.data['skipped_item_ids'], [999999])
+        self.assertEqual(response.data['status'], 'completed')
+        self.assertEqual(response.data['total_actual_cost'], Decimal('6.25'))
+
+    def test_zero_actual_cost_is_kept(self):
+        shopping_list = self.make_shopping_list()
+        salt = shopping_list.items.get(name='Salt')
+        salt.actual_cost = Decimal('2.00')
+        salt.save()
+        self.client.post(
+            f'/api/meal/shopping-lists/{shopping_list.id}/mark_item_purchased/',
+            {'item_id': salt.id, 'actual_cost': '0.00'}, format='json'
+        )
+        salt.refresh_from_db()
+        self.assertEqual(salt.actual_cost, Decimal('0.00'))
+        shopping_list.refresh_from_db()
+        self.assertEqual(shopping_list.total_actual_cost, Decimal('0.00'))
+
+    def test_regenerating_after_purchase_keeps_totals(self):
+        self.make_meal()
+        shopping_list = ShoppingList.objects.create(
+            name='From meals', date_needed=self.today, created_by=self.member
+        )
+        dates = {'start_date': str(self.today), 'end_date': str(self.today)}
+        url = f'/api/meal/shopping-lists/{shopping_list.id}/'
+        self.client.post(f'{url}generate_from_meals/', dates, format='json')
+        self.client.post(f'{url}purchase_items/', {'items': [
+            {'item_id': item.id, 'actual_cost': '4.50'} for item in shopping_list.items.all()
+        ]}, format='json')
+        shopping_list.refresh_from_db()
+        self.assertEqual((shopping_list.status, shopping_list.total_actual_cost), ('completed', Decimal('9.00')))
+
+        # Same meals: the purchases still cover everything
+        self.client.post(f'{url}generate_from_meals/', dates, format='json')
+        shopping_list.refresh_from_db()
+        self.assertEqual((shopping_list.status, shopping_list.total_actual_cost), ('completed', Decimal('9.00')))
+        self.assertEqual(shopping_list.items.filter(is_purchased=True).count(), 2)
+        self.assertFalse(shopping_list.items.filter(is_purchased=False).exists())
+
+        # Another meal adds items to buy and reopens the list
+        self.make_meal()
+        self.client.post(f'{url}generate_from_meals/', dates, format='json')
+        shopping_list.refresh_from_db()
+        self.assertEqual(shopping_list.status, 'in_progress')
+        self.assertEqual(shopping_list.total_actual_cost, Decimal('9.00'))
+        self.assertEqual(
+            shopping_list.items.filter(is_purchased=True).aggregate(total=Sum('actual_cost'))['total'],
+            shopping_list.total_actual_cost
+        )
+        self.assertEqual(shopping_list.items.filter(is_purchased=False).count(), 2)
+
+    def test_partial_purchase_keeps_status(self):
+        shopping_list = self.make_shopping_list()
+        ShoppingItem.objects.create(
+            shopping_list=shopping_list, name='Sugar', quantity=Decimal('1.00'), unit='kg',
+            estimated_cost=Decimal('2.00')
+        )
+        salt = shopping_list.items.get(name='Salt')
+        response = self.client.post(
+            f'/api/meal/shopping-lists/{shopping_list.id}/mark_item_purchased/',
+            {'item_id': salt.id, 'actual_cost': '2.00'}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        shopping_list.refresh_from_db()
+        self.assertEqual(shopping_list.status, 'pending')
+        self.assertEqual(shopping_list.total_actual_cost, Decimal('2.00'))
+
+        response = self.client.post(
+            f'/api/meal/shopping-lists/{shopping_list.id}/mark_item_purchased/',
+            {'item_id': 999999}, format='json'
+        )
+        self.assertEqual(response.status_code, 404)
+
+
+class ConditionalGetTests(MealAPITestCase):
+
+    def test_unchanged_list_is_not_modified(self):
+        self.make_deposit()
+        response = self.client.get('/api/meal/deposits/')
+        etag = response['ETag']
+        self.assertIn('no-cache', response['Cache-Control'])
+
+        # Only the change counters are read
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/meal/deposits/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+        response = self.client.get('/api/meal/deposits/?page=1', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_writes_change_the_etag(self):
+        deposit = self.make_deposit()
+        etag = self.client.get(f'/api/meal/deposits/{deposit.id}/')['ETag']
+
+        # Embedded relations count too
+        deposit.member.user.first_name = 'Renamed'
+        deposit.member.user.save()
+        response = self.client.get(f'/api/meal/deposits/{deposit.id}/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+        etag = response['ETag']
+        MonthlyDeposit.objects.filter(id=deposit.id).update(amount=Decimal('1.00'))
+        response = self.client.get(f'/api/meal/deposits/{deposit.id}/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)  # update() bypasses signals...
+
+        bulk_changed(MonthlyDeposit)  # ...so bulk writers announce their changes
+        response = self.client.get(f'/api/meal/deposits/{deposit.id}/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_if_modified_since(self):
+        response = self.client.get('/api/meal/daily-costs/')
+        last_modified = response['Last-Modified']
+        response = self.client.get('/api/meal/daily-costs/', HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+        CollectionVersion.objects.filter(name='Meal.DailyMealCost').update(
+            updated_at=timezone.now() + timedelta(minutes=1)
+        )
+        response = self.client.get('/api/meal/daily-costs/', HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 200)
+
+
+class ResponseCacheTests(MealAPITestCase):
+
+    def test_repeated_reads_are_served_from_cache(self):
+        self.make_member('alice')
+        url = '/api/meal/members/?ordering=id'
+        response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+
+        # Only the change counters are read
+        with self.assertNumQueries(1):
+            cached = self.client.get(url)
+        self.assertEqual(cached['X-Cache'], 'HIT')
+        self.assertEqual(cached.data, response.data)
+        self.assertEqual(cached['ETag'], response['ETag'])
+
+        # Each page and filter is cached separately
+        self.assertEqual(self.client.get(url + '&page=1')['X-Cache'], 'MISS')
+
+        stats = self.client.get('/api/meal/cache/stats/').data
+        self.assertEqual((stats['hits'], stats['misses']), (1, 2))
+        self.assertEqual(stats['hit_ratio'], round(1 / 3, 4))
+
+    def test_saves_and_deletes_invalidate(self):
+        _, alice = self.make_member('alice')
+        url = '/api/meal/members/'
+        self.client.get(url)
+
+        alice.user.first_name = 'Alicia'
+        alice.user.save()
+        response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertIn('Alicia Tester', [row['full_name'] for row in response.data['results']])
+
+        alice.delete()
+        response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['count'], 1)
+
+    def test_entries_are_per_user(self):
+        other, _ = self.make_member('bob')
+        self.assertEqual(self.client.get('/api/meal/budgets/')['X-Cache'], 'MISS')
+
+        self.client.force_authenticate(other)
+        self.assertEqual(self.client.get('/api/meal/budgets/')['X-Cache'], 'MISS')
+        self.assertEqual(self.client.get('/api/meal/budgets/')['X-Cache'], 'HIT')
+
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.get('/api/meal/budgets/')['X-Cache'], 'HIT')
+
+    def test_uncached_viewsets(self):
+        response = self.client.get('/api/meal/expenses/')
+        self.assertNotIn('X-Cache', response)
+
+
+class SeedAndBenchmarkTests(MealAPITestCase):
+
+    def test_seeded_office_is_consistent(self):
+        counts = seed_office(12, 21, end_date=date(2024, 3, 29), seed=7)
+        self.assertEqual(counts['members'], 12)
+        self.assertEqual(counts['daily_costs'], 15)  # Weekdays only
+        self.assertEqual(MemberMealTracking.objects.count(), counts['tracking'])
+        self.assertTrue(Ingredient.objects.exists())
+
+        # Participants, prices and summaries went through the service layer
+        for cost in DailyMealCost.objects.all():
+            self.assertEqual(
+                cost.lunch_participants,
+                MemberMealTracking.objects.filter(date=cost.date, lunch_count__gt=0).count()
+            )
+        priced = MemberMealTracking.objects.filter(lunch_count__gt=0).first()
+        self.assertGreater(priced.total_cost, 0)
+        self.assertEqual(
+            MemberMonthlySummary.objects.aggregate(total=Sum('lunch_meals'))['total'],
+            MemberMealTracking.objects.aggregate(total=Sum('lunch_count'))['total'],
+        )
+
+        with self.assertRaises(ValueError):
+            seed_office(12, 21, seed=7)
+
+        # Same seed, same data
+        first = list(MemberMealTracking.objects.order_by('id').values_list('date', 'total_cost'))
+        for model in (DailyMealCost, User):
+            model.objects.all().delete()
+        self.assertEqual(seed_office(12, 21, end_date=date(2024, 3, 29), seed=7), counts)
+        self.assertEqual(
+            list(MemberMealTracking.objects.order_by('id').values_list('date', 'total_cost')), first
+        )
+
+    def test_every_endpoint_is_benchmarked(self):
+        seed_office(8, 10, seed=1)
+        cases = benchmark_cases()
+        results = EndpointBenchmark(self.user, iterations=2).run(cases)
+        self.assertEqual(set(results), {case.name for case in cases})
+        self.assertIn('meal-tracking bulk_update', results)
+        for name, result in results.items():
+            self.assertEqual(result['status'], 200, name)
+            self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+        # Write cases are rolled back
+        self.assertFalse(MemberMealTracking.objects.filter(is_paid=True).exists())
+
+    def test_mixed_load_requests(self):
+        seed_office(6, 5, seed=2)
+        load = MixedLoad(write_ratio=0.5)
+        rng = random.Random(3)
+        names = set()
+        for _ in range(30):
+            case = load.next_case(rng)
+            response = getattr(self.client, case.method)(case.url, case.data, format='json')
+            self.assertLess(response.status_code, 400, case.name)
+            names.add(case.name)
+        self.assertIn('meal-tracking bulk_update', names)
+        self.assertIn('dashboard stats', names)
+
+
+class RequestMetricsTests(MealAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        metrics_registry.clear()
+
+    def test_server_timing_header(self):
+        response = self.client.get('/api/meal/expenses/', HTTP_ORIGIN='http://localhost:3000')
+        timing = response['Server-Timing']
+        self.assertRegex(timing, r'^db;dur=[\d.]+;desc="2 queries", app;dur=[\d.]+, total;dur=[\d.]+$')
+        self.assertEqual(response['Timing-Allow-Origin'], 'http://localhost:3000')
+
+    def test_metrics_endpoint(self):
+        self.client.get('/api/meal/expenses/')
+        self.client.get('/api/meal/expenses/')
+        self.client.post('/api/meal/meal-tracking/bulk_update/', {}, format='json')
+
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        body = response.content.decode()
+        labels = 'route="api/meal/expenses/",action="list",method="GET"'
+        self.assertIn(f'meal_http_requests_total{{{labels},status="200"}} 2', body)
+        self.assertIn(f'meal_http_request_queries_bucket{{{labels},le="2"}} 2', body)
+        self.assertIn(f'meal_http_request_queries_bucket{{{labels},le="1"}} 0', body)
+        self.assertIn(f'meal_http_request_duration_seconds_count{{{labels}}} 2', body)
+        self.assertIn(f'meal_http_response_size_bytes_count{{{labels}}} 2', body)
+        self.assertIn(
+            'meal_http_requests_total{route="api/meal/meal-tracking/bulk_update/",'
+            'action="bulk_update",method="POST",status="400"} 1', body
+        )
+
+        response = self.client.get('/metrics', REMOTE_ADDR='203.0.113.5')
+        self.assertEqual(response.status_code, 403)
+
+
+class FastJSONTests(MealAPITestCase):
+    payload = {
+        'amount': Decimal('12.50'),
+        'rate': Decimal('0.333333333333'),
+        'day': date(2024, 3, 1),
+        'at': datetime(2024, 3, 1, 12, 30, 15, 123456, tzinfo=dt_timezone.utc),
+        'naive': datetime(2024, 3, 1, 12, 30),
+        'time': time(13, 0),
+        'uuid': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+        'lazy': gettext_lazy('Lunch'),
+        'text': 'Biryani   and   ৳',
+        'rows': ReturnList([ReturnDict({'id': 1, 'cost': Decimal('3')}, serializer=None)], serializer=None),
+        1: 'int key',
+        'huge': 2 ** 70,
+    }
+
+    def test_renderer_matches_stock_output(self):
+        expected = JSONRenderer().render(self.payload)
+        self.assertEqual(FastJSONRenderer().render(self.payload), expected)
+        small = {key: value for key, value in self.payload.items() if key != 'huge'}
+        self.assertEqual(FastJSONRenderer().render(small), JSONRenderer().render(small))
+        with mock.patch('Meal.meal_json.orjson', None):
+            self.assertEqual(FastJSONRenderer().render(small), JSONRenderer().render(small))
+        indented = FastJSONRenderer().render(small, 'application/json; indent=2')
+        self.assertEqual(indented, JSONRenderer().render(small, 'application/json; indent=2'))
+
+    def test_decimals_orjson_writes_differently_use_the_stock_renderer(self):
+        for value in (Decimal('1E+25'), Decimal('1E-7'), Decimal('12345678901234567890.5')):
+            data = {'amount': value}
+            self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data), value)
+        for value in (Decimal('NaN'), Decimal('Infinity')):
+            with self.assertRaises(ValueError):
+                JSONRenderer().render({'amount': value})
+            with self.assertRaises(ValueError):
+                FastJSONRenderer().render({'amount': value})
+
+    @skipUnless(meal_json.orjson, 'orjson is not installed')
+    def test_float_differences_are_as_documented(self):
+        self.assertEqual(FastJSONRenderer().render({'x': 1e20, 'y': 1e-05}), b'{"x":1e20,"y":0.00001}')
+        self.assertEqual(JSONRenderer().render({'x': 1e20, 'y': 1e-05}), b'{"x":1e+20,"y":1e-05}')
+        self.assertEqual(FastJSONRenderer().render({'x': float('nan')}), b'{"x":null}')
+        with self.assertRaises(ValueError):
+            JSONRenderer().render({'x': float('nan')})
+
+    def test_parser(self):
+        body = '{"date": "2024-03-01", "counts": [1, 2.5, -3e5], "name": "৳\\u2028"}'.encode()
+        self.assertEqual(FastJSONParser().parse(io.BytesIO(body)), JSONParser().parse(io.BytesIO(body)))
+        with self.assertRaisesMessage(ParseError, 'JSON parse error'):
+            FastJSONParser().parse(io.BytesIO(b'{"date": '))
+        with self.assertRaises(ParseError):
+            FastJSONParser().parse(io.BytesIO(b'{"cost": NaN}'))
+
+    def test_api_uses_fast_codecs(self):
+        self.make_deposit()
+        response = self.client.get('/api/meal/deposits/')
+        self.assertIsInstance(response.accepted_renderer, FastJSONRenderer)
+        self.assertEqual(response.content, JSONRenderer().render(response.data))
+
+        response = self.client.post('/api/meal/meal-tracking/bulk_update/', {
+            'date': self.today.isoformat(),
+            'member_tracking': [{'member_id': self.member.id, 'lunch_count': 1, 'dinner_count': 0}],
+        }, format='json')
+        self.assertEqual(response.data['created_count'], 1)
+
+
+class CachedPrincipalTests(MealAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(None)
+        self.authenticate()
+
+    def authenticate(self):
+        token = RefreshToken.for_user(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_user_and_member_come_from_cache(self):
+        with CaptureQueriesContext(connection) as first:
+            self.client.get('/api/auth/profile/')
+        # The profile reads request.user.member; it came with the user
+        with CaptureQueriesContext(connection) as second:
+            response = self.client.get('/api/auth/profile/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(second), len(first) - 1)
+        self.assertFalse(any('auth_user' in query['sql'] for query in second.captured_queries))
+
+    def test_changes_evict_the_principal(self):
+        self.client.get('/api/auth/profile/')
+        self.member.phone = '555-0100'
+        self.member.save()
+        self.assertEqual(self.client.get('/api/auth/profile/').data['user']['phone'], '555-0100')
+
+        Member.objects.filter(id=self.member.id).update(status='suspended')
+        bulk_changed(Member)
+        self.assertEqual(self.client.get('/api/auth/profile/').data['user']['status'], 'suspended')
+
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get('/api/auth/profile/').status_code, 401)
+
+    def test_unknown_user(self):
+        self.user.delete()
+        self.assertEqual(self.client.get('/api/auth/profile/').status_code, 401)
+
+
+class TokenBlacklistTests(MealAPITestCase):
+
+    def refresh(self, token):
+        return self.client.post('/api/auth/token/refresh/', {'refresh': str(token)}, format='json')
+
+    def test_rotated_and_logged_out_tokens_are_rejected(self):
+        token = IndexedRefreshToken.for_user(self.user)
+        blacklist_index.might_contain(token['jti'])  # Loads the index
+        with CaptureQueriesContext(connection) as queries:
+            response = self.refresh(token)
+        self.assertEqual(response.status_code, 200)
+        # The index answered; no lookup of the blacklist by jti
+        self.assertFalse(any(
+            'FROM "token_blacklist_blacklistedtoken" INNER JOIN' in query['sql']
+            for query in queries.captured_queries
+        ))
+        self.assertEqual(self.refresh(token).status_code, 401)
+
+        rotated = response.data['refresh']
+        response = self.client.post('/api/auth/logout/', {'refresh_token': rotated}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.refresh(rotated).status_code, 401)
+
+    def test_tokens_blacklisted_by_other_processes(self):
+        token = IndexedRefreshToken.for_user(self.user)
+        self.assertFalse(blacklist_index.might_contain(token['jti']))
+        BlacklistedToken.objects.create(token=OutstandingToken.objects.get(jti=token['jti']))
+        # Not synced yet, but rotating finds the existing blacklist row
+        self.assertEqual(self.refresh(token).status_code, 401)
+
+        other = IndexedRefreshToken.for_user(self.user)
+        BlacklistedToken.objects.create(token=OutstandingToken.objects.get(jti=other['jti']))
+        with self.settings(TOKEN_BLACKLIST_INDEX_SYNC_SECONDS=0):
+            self.assertTrue(blacklist_index.might_contain(other['jti']))
+
+    def test_prune_tokens(self):
+        live = IndexedRefreshToken.for_user(self.user)
+        past = timezone.now() - timedelta(days=1)
+        for index in range(3):
+            expired = OutstandingToken.objects.create(
+                user=self.user, jti=f'expired-{index}', token='x', expires_at=past
+            )
+            if index:
+                BlacklistedToken.objects.create(token=expired)
+
+        out = io.StringIO()
+        call_command('prune_tokens', '--batch-size', '2', stdout=out)
+        self.assertIn('Deleted 3 expired tokens (2 blacklisted)', out.getvalue())
+        self.assertEqual(list(OutstandingToken.objects.values_list('jti', flat=True)), [live['jti']])
+        self.assertFalse(BlacklistedToken.objects.exists())
+
+
+class MonthlyStatementTests(MealAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        _, self.diner = self.make_member('diner', current_balance=Decimal('400.00'))
+        for month, amount in ((date(2024, 3, 1), '300.00'), (date(2024, 4, 1), '200.00')):
+            MonthlyDeposit.objects.create(member=self.diner, amount=Decimal(amount), month=month)
+        for day, lunch, dinner, paid in ((date(2024, 3, 5), '30.00', '20.00', True),
+                                         (date(2024, 3, 6), '30.00', '0.00', False),
+                                         (date(2024, 4, 2), '40.00', '0.00', True)):
+            tracking = MemberMealTracking.objects.create(
+                member=self.diner, date=day, lunch_count=1, dinner_count=int(dinner != '0.00')
+            )
+            MemberMealTracking.objects.filter(pk=tracking.pk).update(
+                lunch_cost=Decimal(lunch), dinner_cost=Decimal(dinner),
+                total_cost=Decimal(lunch) + Decimal(dinner), is_paid=paid
+            )
+
+    def test_statement_balances(self):
+        result = close_month(date(2024, 3, 20), workers=1, chunk_size=1)
+        self.assertEqual((result['created'], result['chunks']), (2, 2))
+        statement = MonthlyStatement.objects.get(member=self.diner, month=date(2024, 3, 1))
+        # Today's 400 without April's deposit and payment
+        self.assertEqual(statement.closing_balance, Decimal('240.00'))
+        self.assertEqual(statement.opening_balance, Decimal('-10.00'))
+        self.assertEqual(statement.deposits, Decimal('300.00'))
+        self.assertEqual((statement.lunch_meals, statement.dinner_meals), (2, 1))
+        self.assertEqual((statement.lunch_charges, statement.dinner_charges), (Decimal('60.00'), Decimal('20.00')))
+        self.assertEqual((statement.paid_amount, statement.unpaid_amount), (Decimal('50.00'), Decimal('30.00')))
+        self.assertEqual(MonthlyStatement.objects.get(member=self.member).closing_balance, 0)
+
+        close_month(date(2024, 4, 1), workers=1)
+        april = MonthlyStatement.objects.get(member=self.diner, month=date(2024, 4, 1))
+        self.assertEqual(april.opening_balance, statement.closing_balance)
+        self.assertEqual(april.closing_balance, self.diner.current_balance)
+
+    def test_close_month_is_restartable(self):
+        close_month(date(2024, 3, 1), workers=1)
+        # An interrupted run left one member without a statement
+        MonthlyStatement.objects.filter(member=self.diner).delete()
+        out = io.StringIO()
+        call_command('close_month', '--month', '2024-03', '--workers', '1', stdout=out)
+        self.assertIn('2 members: 1 statements written, 1 already closed', out.getvalue())
+        self.assertIn('Closed March 2024', out.getvalue())
+        self.assertEqual(close_month(date(2024, 3, 1), workers=1)['created'], 0)
+
+        MonthlyStatement.objects.filter(member=self.diner).update(closing_balance=0)
+        result = close_month(date(2024, 3, 1), workers=1, force=True)
+        self.assertEqual((result['replaced'], result['created']), (2, 2))
+        self.assertEqual(MonthlyStatement.objects.get(member=self.diner).closing_balance, Decimal('240.00'))
+
+        with self.assertRaises(CommandError):
+            call_command('close_month', '--month', self.today.strftime('%Y-%m'))
+
+    def test_rows_written_concurrently_are_not_counted(self):
+        def compute_racing_another_run(month, member_ids):
+            computed = compute_statements(month, member_ids)
+            MonthlyStatement.objects.create(**computed[0])
+            return computed
+
+        with mock.patch('Meal.meal_statements.compute_statements', compute_racing_another_run):
+            result = close_month(date(2024, 3, 1), workers=1)
+        self.assertEqual((result['members'], result['created'], result['skipped']), (2, 1, 1))
+        self.assertEqual(MonthlyStatement.objects.count(), 2)
+
+
+class WriteRetryTests(APITransactionTestCase):
+    """Write retries need real transactions, which TestCase would wrap"""
+
+    def setUp(self):
+        cache.clear()
+        response_cache().clear()
+        user = User.objects.create(username='admin', email='admin@example.com')
+        Member.objects.create(user=user, role='admin')
+        self.client.force_authenticate(user)
+        self.attempts = 0
+        sleep = mock.patch('Meal.meal_db.time.sleep')
+        self.sleep = sleep.start()
+        self.addCleanup(sleep.stop)
+
+    def submit_expense(self, error, failures=1):
+        perform_create = ExpenseViewSet.perform_create
+
+        def flaky(view, serializer):
+            self.attempts += 1
+            perform_create(view, serializer)
+            if self.attempts <= failures:
+                raise OperationalError(error)
+
+        with mock.patch.object(ExpenseViewSet, 'perform_create', flaky):
+            return self.client.post('/api/meal/expenses/', {
+                'title': 'Rice', 'amount': '12.50', 'category': 'groceries', 'date': '2024-03-01',
+            }, format='json')
+
+    def test_sqlite_pragmas(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 1000)
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+
+    def test_sqlite_pragma_profile_is_configurable(self):
+        with self.settings(SQLITE_PRAGMA_PROFILE='default', SQLITE_BUSY_TIMEOUT=250):
+            self.assertEqual(sqlite_pragmas(), {'busy_timeout': 250})
+        with self.settings(SQLITE_PRAGMA_PROFILE=None, SQLITE_BUSY_TIMEOUT=None):
+            self.assertEqual(sqlite_pragmas(), {})
+        with self.settings(SQLITE_PRAGMA_PROFILE='fast'), self.assertRaises(ImproperlyConfigured):
+            sqlite_pragmas()
+
+    def test_locked_write_is_retried(self):
+        response = self.submit_expense('database is locked')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.attempts, 2)
+        self.sleep.assert_called_once()
+        # The first attempt was rolled back
+        self.assertEqual(Expense.objects.count(), 1)
+
+    def test_retries_are_bounded(self):
+        with self.settings(SQLITE_WRITE_RETRIES=2), self.assertRaises(OperationalError):
+            self.submit_expense('database is locked', failures=5)
+        self.assertEqual(self.attempts, 3)
+        self.assertFalse(Expense.objects.exists())
+
+    def test_csv_import_validates_under_the_write_lock(self):
+        file = SimpleUploadedFile('import.csv', b'username,amount,month\nadmin,10.00,2024-01\n',
+                                  content_type='text/csv')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/meal/deposits/import/', {'file': file}, format='multipart')
+        self.assertEqual(response.data['created_count'], 1)
+        statements = [query['sql'] for query in queries.captured_queries]
+        lock = statements.index('BEGIN IMMEDIATE')
+        checks = [index for index, sql in enumerate(statements)
+                  if sql.startswith('SELECT') and '"Meal_monthlydeposit"' in sql]
+        # The existing-deposit check runs in the locked transaction, before the write
+        self.assertTrue(checks and lock < checks[0])
+
+    def test_other_errors_are_not_retried(self):
+        with self.assertRaises(OperationalError):
+            self.submit_expense('no such table: meal_expense')
+        self.assertEqual(self.attempts, 1)
+        self.sleep.assert_not_called()
+
+
+class AsyncDashboardTests(APITransactionTestCase):
+    """The async view queries from worker threads, which only see committed rows"""
+
+    url = '/api/meal/dashboard/stats/live/'
+
+    def setUp(self):
+        cache.clear()
+        response_cache().clear()
+        self.user = User.objects.create(username='admin', email='admin@example.com')
+        self.member = Member.objects.create(user=self.user, role='admin')
+        self.client.force_authenticate(self.user)
+
+    def add_expense(self):
+        return Expense.objects.create(
+            title='Rice', amount=Decimal('12.50'), category='groceries', date=date.today(),
+            submitted_by=self.member
+        )
+
+    def test_same_stats_as_sync_view(self):
+        self.add_expense()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('ETag', response)
+        # Every concurrent query is timed
+        self.assertRegex(response['Server-Timing'], r'desc="(1\d|[2-9]\d) queries"')
+        live = json.loads(response.content)
+        cache.clear()
+        stats = self.client.get('/api/meal/dashboard/stats/').json()
+        live.pop('computed_at'), stats.pop('computed_at')
+        self.assertEqual(live, stats)
+        self.assertEqual(live['pending_expenses'], 1)
+
+    def test_requires_authentication(self):
+        self.client.force_authenticate(None)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 401)
+        self.assertIn('Bearer', response['WWW-Authenticate'])
+        self.assertEqual(self.client.post(self.url).status_code, 401)
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.post(self.url).status_code, 405)
+        self.assertEqual(self.client.get(self.url, {'wait': 'soon'}).status_code, 400)
+
+    def test_long_poll_times_out_unchanged(self):
+        etag = self.client.get(self.url)['ETag']
+        with self.settings(DASHBOARD_LONG_POLL_INTERVAL=0.05):
+            started = time_module.perf_counter()
+            response = self.client.get(self.url, {'wait': '0.2'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertGreaterEqual(time_module.perf_counter() - started, 0.2)
+
+    async def test_long_poll_returns_on_change(self):
+        headers = {'Authorization': f'Bearer {AccessToken.for_user(self.user)}'}
+        client = AsyncClient()
+        etag = (await client.get(self.url, headers=headers))['ETag']
+        with self.settings(DASHBOARD_LONG_POLL_INTERVAL=0.05):
+            poll = asyncio.create_task(
+                client.get(self.url, {'wait': '10'}, headers={**headers, 'If-None-Match': etag})
+            )
+            await asyncio.sleep(0.2)
+            self.assertFalse(poll.done())
+            await sync_to_async(self.add_expense)()
+            response = await asyncio.wait_for(poll, 5)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(json.loads(response.content)['pending_expenses'], 1)